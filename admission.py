@@ -0,0 +1,255 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing a request that is over a limit; retry_after is in whole seconds."""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int):
+        super().__init__(f"Too many {request_class} requests ({reason}); retry in {retry_after}s")
+        self.request_class = request_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """rate tokens per second up to burst. A request costing more than is left may still start while
+    at least one token remains; the shortfall is paid back before the next one, so a large bulk ingest
+    is admitted once and then throttles its namespace for as long as it cost."""
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self, cost: float = 1.0) -> float:
+        # Returns 0 once the tokens are taken, otherwise the seconds until a request could start.
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= cost
+            return 0.0
+
+    def refund(self, cost: float = 1.0) -> None:
+        # Gives back what take() charged a request that was then rejected.
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + cost)
+
+
+@dataclass
+class ClassLimits:
+    """Limits for one request class. rate/burst are per namespace; rate 0 disables the bucket."""
+
+    name: str
+    max_concurrency: int
+    max_queue: int
+    max_wait: float
+    rate: float = 0.0
+    burst: float = 0.0
+
+
+class _ClassState:
+    def __init__(self, limits: ClassLimits):
+        self.limits = limits
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.active = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self.wait_seconds = 0.0
+        # Moving average of how long a request holds its slot, for Retry-After when the queue is full.
+        self.hold_seconds = 0.0
+        self.buckets: Dict[Optional[str], TokenBucket] = {}
+
+
+class AdmissionController:
+    """Schedules requests of several classes onto max_concurrency shared slots.
+
+    classes are given in priority order: whenever a slot frees up, the highest-priority class with a
+    waiter and room under its own max_concurrency goes first, so a queue of ingests never delays a
+    query by more than the slots ingest already holds. A request is rejected with AdmissionRejected,
+    without waiting, when its namespace is over its token bucket or its class queue is full, and after
+    max_wait seconds in the queue. Used from the event loop only; other threads go through
+    asyncio.run_coroutine_threadsafe and release their Ticket with loop.call_soon_threadsafe.
+    """
+
+    def __init__(self, classes: Sequence[ClassLimits], max_concurrency: int, wait_histogram=None):
+        self.max_concurrency = max_concurrency
+        self._classes: Dict[str, _ClassState] = {limits.name: _ClassState(limits) for limits in classes}
+        self._order = [limits.name for limits in classes]
+        self._active = 0
+        # metrics.Histogram observed with (seconds, class) for every admitted request.
+        self._wait_histogram = wait_histogram
+
+    def _reject(self, state: _ClassState, reason: str, retry_after: float) -> AdmissionRejected:
+        state.rejected[reason] = state.rejected.get(reason, 0) + 1
+        return AdmissionRejected(state.limits.name, reason, max(1, math.ceil(retry_after)))
+
+    def check_rate(
+        self,
+        request_class: str,
+        namespace: Optional[str] = None,
+        cost: float = 1.0,
+        costs: Optional[Mapping[Optional[str], float]] = None,
+    ) -> None:
+        """Charges the namespace's token bucket without taking a slot; for work that is admitted later."""
+        self._check_rate(self._classes[request_class], costs if costs is not None else {namespace: cost})
+
+    def _check_rate(self, state: _ClassState, costs: Mapping[Optional[str], float]) -> List[Tuple[TokenBucket, float]]:
+        # Charges every namespace or none of them; returns the charges so a later rejection can refund them.
+        limits = state.limits
+        charged: List[Tuple[TokenBucket, float]] = []
+        if limits.rate <= 0:
+            return charged
+        for namespace, cost in costs.items():
+            bucket = state.buckets.get(namespace)
+            if bucket is None:
+                bucket = state.buckets[namespace] = TokenBucket(limits.rate, max(limits.burst, 1.0))
+            wait = bucket.take(cost)
+            if wait > 0:
+                self._refund(charged)
+                raise self._reject(state, "rate_limited", wait)
+            charged.append((bucket, cost))
+        return charged
+
+    @staticmethod
+    def _refund(charged: List[Tuple[TokenBucket, float]]) -> None:
+        for bucket, cost in charged:
+            bucket.refund(cost)
+
+    def _has_room(self, state: _ClassState) -> bool:
+        return self._active < self.max_concurrency and state.active < state.limits.max_concurrency
+
+    def _grant(self, state: _ClassState) -> None:
+        self._active += 1
+        state.active += 1
+        state.admitted += 1
+
+    def _dispatch(self) -> None:
+        for name in self._order:
+            state = self._classes[name]
+            while state.waiters and self._has_room(state):
+                waiter = state.waiters.popleft()
+                if not waiter.done():
+                    self._grant(state)
+                    waiter.set_result(None)
+
+    def _release(self, state: _ClassState, held: float) -> None:
+        self._active -= 1
+        state.active -= 1
+        state.hold_seconds = held if not state.hold_seconds else 0.9 * state.hold_seconds + 0.1 * held
+        self._dispatch()
+
+    @staticmethod
+    def _forget(state: _ClassState, waiter: asyncio.Future) -> None:
+        try:
+            state.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _queue_retry_after(self, state: _ClassState) -> float:
+        return (len(state.waiters) + 1) * (state.hold_seconds or 1.0) / max(1, state.limits.max_concurrency)
+
+    async def acquire(
+        self,
+        request_class: str,
+        namespace: Optional[str] = None,
+        cost: float = 1.0,
+        background: bool = False,
+        costs: Optional[Mapping[Optional[str], float]] = None,
+    ) -> "Ticket":
+        """Waits for a slot and returns a Ticket that must be released; admit() does both.
+
+        costs charges a request that spans several namespaces, {namespace: tokens}, in place of
+        namespace and cost. A request rejected for its queue gets its tokens back. background is for
+        queued work that was charged with check_rate() when it was accepted: it skips the token
+        bucket and waits for its slot without the class's max_queue or max_wait.
+        """
+        state = self._classes[request_class]
+        charged = [] if background else self._check_rate(state, costs if costs is not None else {namespace: cost})
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        # Granted at once unless requests of this class, or of a higher-priority one, are ahead of it.
+        self._dispatch()
+        if not waiter.done():
+            if not background and len(state.waiters) > state.limits.max_queue:
+                state.waiters.pop()
+                self._refund(charged)
+                raise self._reject(state, "queue_full", self._queue_retry_after(state))
+            try:
+                await asyncio.wait_for(waiter, None if background else state.limits.max_wait)
+            except asyncio.TimeoutError:
+                self._forget(state, waiter)
+                self._refund(charged)
+                raise self._reject(state, "queue_timeout", self._queue_retry_after(state)) from None
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # Cancelled (client gone) just after the slot was granted: hand it back.
+                    self._release(state, 0.0)
+                else:
+                    self._forget(state, waiter)
+                    self._refund(charged)
+                raise
+        waited = time.perf_counter() - started
+        state.wait_seconds += waited
+        if self._wait_histogram is not None:
+            self._wait_histogram.observe(waited, request_class)
+        return Ticket(self, state)
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        request_class: str,
+        namespace: Optional[str] = None,
+        cost: float = 1.0,
+        costs: Optional[Mapping[Optional[str], float]] = None,
+    ) -> AsyncIterator[None]:
+        ticket = await self.acquire(request_class, namespace, cost, costs=costs)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Dict]:
+        result = {}
+        for name in self._order:
+            state = self._classes[name]
+            limits = state.limits
+            result[name] = {
+                "in_flight": state.active,
+                "queued": len(state.waiters),
+                "admitted": state.admitted,
+                "rejected": dict(state.rejected),
+                "avg_wait_ms": round(state.wait_seconds / state.admitted * 1000, 3) if state.admitted else 0.0,
+                "max_concurrency": limits.max_concurrency,
+                "max_queue": limits.max_queue,
+                "rate_per_namespace": limits.rate or None,
+            }
+        return result
+
+
+class Ticket:
+    __slots__ = ("_controller", "_state", "_started", "_released")
+
+    def __init__(self, controller: AdmissionController, state: _ClassState):
+        self._controller = controller
+        self._state = state
+        self._started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self._state, time.perf_counter() - self._started)
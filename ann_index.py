@@ -0,0 +1,137 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, np.float32(1.0), norms)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, block: int = 4096) -> np.ndarray:
+    # Blocked so a large batch against thousands of centroids never materializes one huge score matrix.
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        assignments[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, n_iter: int = 15, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = _nearest(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=k)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        non_empty = counts > 0
+        sums = np.add.reduceat(vectors[order], starts[non_empty], axis=0)
+        centroids[non_empty] = sums
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+        centroids = _normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over the rows of an external, L2-normalized vector matrix.
+
+    Rows are bucketed by their nearest k-means centroid; a query scores only the rows in the
+    nprobe closest buckets. New rows are assigned to existing centroids without retraining.
+    """
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 15,
+        max_train_sample: int = 100_000,
+        seed: int = 0,
+    ):
+        if nprobe < 1:
+            raise ValueError("nprobe must be at least 1.")
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.max_train_sample = max_train_sample
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_count = 0
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _reserve(self, needed: int) -> None:
+        if needed > len(self.assignments):
+            grown = np.zeros(max(needed, len(self.assignments) * 2, 64), dtype=np.int32)
+            grown[: len(self.assignments)] = self.assignments
+            self.assignments = grown
+
+    def train(self, vectors: np.ndarray) -> None:
+        count = len(vectors)
+        nlist = self.nlist or int(4 * np.sqrt(count))
+        nlist = max(1, min(nlist, count))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(count, max(nlist * 64, 10_000), self.max_train_sample)
+        sample = vectors[np.sort(rng.choice(count, size=sample_size, replace=False))] if sample_size < count else vectors
+        self.centroids = spherical_kmeans(np.asarray(sample, dtype=np.float32), nlist, n_iter=self.n_iter, seed=self.seed)
+        self.trained_count = count
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.set_rows(np.arange(count), vectors)
+
+    def set_rows(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if not self.trained or not len(rows):
+            return
+        self._reserve(int(rows.max()) + 1)
+        self.assignments[rows] = _nearest(np.asarray(vectors, dtype=np.float32), self.centroids)
+        self._order = None
+
+    def move_row(self, source: int, target: int) -> None:
+        if self.trained:
+            self.assignments[target] = self.assignments[source]
+            self._order = None
+
+    def _buckets(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._order is None or len(self._order) != count:
+            active = self.assignments[:count]
+            self._order = np.argsort(active, kind="stable").astype(np.int64)
+            self._offsets = np.concatenate(([0], np.cumsum(np.bincount(active, minlength=len(self.centroids)))))
+        return self._order, self._offsets
+
+    def search(
+        self, vectors: np.ndarray, count: int, query: np.ndarray, top_k: int, nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Returns (rows, scores) sorted by descending cosine score.
+        nlist = len(self.centroids)
+        nprobe = min(nprobe or self.nprobe, nlist)
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < nlist else np.arange(nlist)
+        order, offsets = self._buckets(count)
+        candidates = np.concatenate([order[offsets[bucket]:offsets[bucket + 1]] for bucket in probes])
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+        scores = vectors[candidates] @ query
+        if top_k < len(candidates):
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return candidates[best], scores[best]
+
+    def state(self, count: int) -> Dict[str, np.ndarray]:
+        return {
+            "centroids": self.centroids,
+            "assignments": self.assignments[:count],
+            "trained_count": np.asarray(self.trained_count),
+        }
+
+    def load_state(self, state) -> None:
+        self.centroids = np.asarray(state["centroids"], dtype=np.float32)
+        self.assignments = np.array(state["assignments"], dtype=np.int32)
+        self.trained_count = int(state["trained_count"])
+        self._order = None
@@ -0,0 +1,114 @@
+"""
+A patch-day re-ingest next to live traffic: POST /ingest/bulk requests keep arriving while NPC
+questions are sent to POST /query at a steady concurrency, with admission control off and on.
+Without it every bulk ingest runs at once and competes with queries for threads and the inference
+client. With it, ingests wait for one of INGEST_MAX_CONCURRENCY slots, queries go first, and ingests
+over the queue limit get a 429. Reports query latency percentiles, ingest outcomes and queue waits.
+Run with: python -m benchmarks.bench_admission --queries 600 --ingests 24 --ingest-docs 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+import httpx
+
+from admission import AdmissionController, ClassLimits
+from benchmarks.bench_chunking import lore
+from benchmarks.bench_suite import percentile
+from benchmarks.stubs import StubInferenceClient, StubPineconeIndex, load_pipeline
+
+
+async def drive(app, args) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    query_errors = 0
+    ingest_status: Dict[int, int] = {}
+    base = lore()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one_query(position: int) -> None:
+            nonlocal query_errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/query", json={"question": f"patch-day question {position}: who rules Greenleaf?"})
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    query_errors += 1
+
+        async def one_ingest(position: int) -> None:
+            # Spread over the query run, as a re-ingest script would send them.
+            await asyncio.sleep(position * args.ingest_interval)
+            documents = [
+                {"markdown": base.replace("\n# ", f"\n# Patch {position}.{item} "), "document_id": f"patch-{position}-{item}"}
+                for item in range(args.ingest_docs)
+            ]
+            response = await client.post("/ingest/bulk", json={"documents": documents, "concurrency": 4})
+            ingest_status[response.status_code] = ingest_status.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(one_query(position) for position in range(args.queries)),
+            *(one_ingest(position) for position in range(args.ingests)),
+        )
+    return {
+        "seconds": time.perf_counter() - started,
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "query_errors": query_errors,
+        "ingest_status": dict(sorted(ingest_status.items())),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=16, help="Queries in flight at once")
+    parser.add_argument("--ingests", type=int, default=24, help="POST /ingest/bulk requests")
+    parser.add_argument("--ingest-docs", type=int, default=8, help="Documents per bulk request")
+    parser.add_argument("--ingest-interval", type=float, default=0.05, help="Seconds between bulk requests")
+    parser.add_argument("--ingest-slots", type=int, default=1, help="INGEST_MAX_CONCURRENCY for the admission run")
+    parser.add_argument("--ingest-queue", type=int, default=8, help="INGEST_MAX_QUEUE for the admission run")
+    args = parser.parse_args()
+
+    rag_pipeline = load_pipeline(
+        hf_client=StubInferenceClient(embed_latency=0.02, chat_latency=0.1), index=StubPineconeIndex(latency=0.005)
+    )
+    logging.getLogger().setLevel(logging.ERROR)
+    import main as api
+
+    rag_pipeline.ingest_markdown(lore(), document_id="lore")
+    configurations = (
+        ("no admission control", None),
+        (
+            f"admission (ingest slots={args.ingest_slots}, queue={args.ingest_queue})",
+            AdmissionController(
+                [
+                    ClassLimits("query", max_concurrency=256, max_queue=256, max_wait=2.0),
+                    ClassLimits("ingest", max_concurrency=args.ingest_slots, max_queue=args.ingest_queue, max_wait=30.0),
+                ],
+                max_concurrency=256,
+                wait_histogram=rag_pipeline.ADMISSION_WAIT,
+            ),
+        ),
+    )
+    for label, controller in configurations:
+        api.admission = controller
+        rag_pipeline.answer_cache.clear()
+        rag_pipeline.query_embedding_cache.clear()
+        result = asyncio.run(drive(api.app, args))
+        print(
+            f"{label:>40}  query p50={result['p50']:7.1f} ms  p95={result['p95']:7.1f} ms  p99={result['p99']:7.1f} ms"
+            f"  query errors={result['query_errors']}  ingest responses={result['ingest_status']}  total={result['seconds']:.1f}s"
+        )
+        if controller is not None:
+            for name, values in controller.stats().items():
+                print(f"{'':>40}  {name}: admitted={values['admitted']} avg wait={values['avg_wait_ms']:.1f} ms rejected={values['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
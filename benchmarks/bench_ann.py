@@ -0,0 +1,66 @@
+"""
+Recall@k versus latency of the IVF index in LocalVectorStore against its exact search.
+Vectors are synthetic 384-dim points drawn around random topic centres, which is closer to
+real embedding distributions than uniform noise.
+Run with: python -m benchmarks.bench_ann --size 200000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from vector_store import LocalVectorStore
+
+
+def synthetic_vectors(rng: np.random.Generator, size: int, dim: int, topics: int, spread: float) -> np.ndarray:
+    centres = rng.standard_normal((topics, dim), dtype=np.float32)
+    vectors = centres[rng.integers(0, topics, size)] + spread * rng.standard_normal((size, dim), dtype=np.float32)
+    return vectors
+
+
+def timed_queries(store: LocalVectorStore, queries: np.ndarray, top_k: int, **kwargs):
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        matches = store.query(query, top_k=top_k, include_metadata=False, **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({match["id"] for match in matches})
+    return results, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=0.6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(rng, args.size, args.dim, args.topics, args.spread)
+    store = LocalVectorStore(path=None, ann_min_vectors=1, nlist=args.nlist)
+
+    started = time.perf_counter()
+    store.upsert([{"id": str(row), "values": vectors[row]} for row in range(args.size)])
+    build_seconds = time.perf_counter() - started
+    ivf = store._partitions[""].ivf
+    print(f"n={args.size} dim={args.dim} nlist={len(ivf.centroids)} build={build_seconds:.1f}s")
+
+    sample = rng.choice(args.size, size=args.queries, replace=False)
+    queries = vectors[sample] + 0.1 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    truth, exact_latencies = timed_queries(store, queries, args.top_k, exact=True)
+    print(f"{'exact':>10}  recall@{args.top_k}=1.000  p50={statistics.median(exact_latencies):8.3f} ms")
+
+    for nprobe in args.nprobe:
+        found, latencies = timed_queries(store, queries, args.top_k, nprobe=nprobe)
+        recall = statistics.mean(len(hit & expected) / args.top_k for hit, expected in zip(found, truth))
+        print(f"{f'nprobe={nprobe}':>10}  recall@{args.top_k}={recall:.3f}  p50={statistics.median(latencies):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
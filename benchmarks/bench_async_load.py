@@ -0,0 +1,68 @@
+"""
+Load test of the FastAPI service with sync (threadpool) handlers versus the async pipeline.
+Both apps run in-process over httpx's ASGI transport against the stub HF client and Pinecone index.
+Run with: python -m benchmarks.bench_async_load --requests 400 --concurrency 200
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.stubs import StubInferenceClient, StubPineconeIndex, load_pipeline
+
+
+def build_sync_app(pipeline) -> FastAPI:
+    # Mirrors the previous `def` routes, which Starlette runs on its bounded threadpool.
+    sync_app = FastAPI()
+
+    @sync_app.post("/query")
+    def query(req: dict):
+        result = pipeline.answer_question(req["question"], top_k=req.get("top_k", 5))
+        return {"answer": result["answer"], "context": result["context"], "sources": result["matches"]}
+
+    return sync_app
+
+
+async def drive(app, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(idx: int) -> None:
+            async with semaphore:
+                response = await client.post("/query", json={"question": f"Question {idx} about Greenleaf?"})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(idx) for idx in range(requests)))
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--index-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    client = StubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    pipeline = load_pipeline(hf_client=client, index=StubPineconeIndex(latency=args.index_latency))
+    logging.getLogger().setLevel(logging.WARNING)
+    pipeline.query_embedding_cache = None
+    pipeline.answer_cache = None
+    pipeline.ingest_markdown("# Races\n\nAshenclad, Luminarae and Humans.\n\n# Factions\n\nEach race has factions.", document_id="bench")
+
+    from main import app
+
+    for label, target in (("sync handlers", build_sync_app(pipeline)), ("async handlers", app)):
+        seconds = asyncio.run(drive(target, args.requests, args.concurrency))
+        print(f"{label:<16} {args.requests} req in {seconds:6.2f}s -> {args.requests / seconds:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Chunking throughput on multi-MB markdown: the H1-only splitter versus the hierarchical chunker,
+from an in-memory string and streamed line by line from a file.
+Documents are built by repeating the Greenleaf lore in test.py under numbered headings.
+Peak memory is what the chunking itself allocates, not counting the source document.
+Run with: python -m benchmarks.bench_chunking --sizes-mb 1 8 32
+"""
+import argparse
+import ast
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable
+
+from benchmarks.stubs import load_pipeline
+from chunker import HierarchicalChunker
+
+
+def lore() -> str:
+    tree = ast.parse((Path(__file__).resolve().parent.parent / "test.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "prompt":
+            return node.value.value
+    raise RuntimeError("No prompt found in test.py.")
+
+
+def build_markdown(size_mb: float) -> str:
+    text = lore()
+    copies = max(1, int(size_mb * 1024 * 1024 / len(text.encode("utf-8"))))
+    return "\n\n".join(text.replace("\n# ", f"\n# Part {copy} ") for copy in range(copies))
+
+
+def measure(run: Callable[[], Iterable], size_bytes: int):
+    started = time.perf_counter()
+    count = sum(1 for _ in run())
+    seconds = time.perf_counter() - started
+    # tracemalloc slows allocation-heavy code several times over, so memory gets its own pass.
+    tracemalloc.start()
+    sum(1 for _ in run())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, size_bytes / 1024 / 1024 / seconds, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-tokens", type=int, default=400)
+    parser.add_argument("--overlap-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    pipeline = load_pipeline()
+    chunker = HierarchicalChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    for size_mb in args.sizes_mb:
+        markdown = build_markdown(size_mb)
+        size_bytes = len(markdown.encode("utf-8"))
+        with tempfile.NamedTemporaryFile("w", suffix=".md", encoding="utf-8", delete=False) as handle:
+            handle.write(markdown)
+            path = handle.name
+
+        def streamed():
+            with open(path, encoding="utf-8") as source:
+                yield from chunker.chunk(source)
+
+        modes = (
+            ("h1", lambda: pipeline.split_into_h1_chunks(markdown)),
+            ("hierarchical", lambda: chunker.chunk(markdown)),
+            ("hierarchical/file", streamed),
+        )
+        print(f"document={size_bytes / 1024 / 1024:.1f} MB")
+        for name, run in modes:
+            count, seconds, mb_per_sec, peak_mb = measure(run, size_bytes)
+            print(f"  {name:>18}  chunks={count:>7}  {seconds:7.3f} s  {mb_per_sec:7.2f} MB/s  peak={peak_mb:7.1f} MB")
+        Path(path).unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cost of resolving chunk text from the local content store versus carrying it in vector metadata.
+Reports the metadata bytes a top-k query would move in each layout, and get_many latency for a
+top-k result set straight from SQLite and from the LRU.
+Run with: python -m benchmarks.bench_content_store --chunks 20000 --top-k 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_chunking import build_markdown
+from chunker import HierarchicalChunker
+from content_store import ContentStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    chunks = []
+    while len(chunks) < args.chunks:
+        chunks.extend(chunk.text for chunk in HierarchicalChunker().chunk(build_markdown(1)))
+    chunks = chunks[: args.chunks]
+    ids = [f"doc-chunk-{position:06d}" for position in range(len(chunks))]
+    small = {"section_title": "Armies", "heading_path": ["Armies", "Morale"], "chunk_index": 1, "document_id": "doc"}
+    with_text = statistics.mean(len(json.dumps({**small, "content": text})) for text in chunks)
+    without_text = len(json.dumps(small))
+    print(f"metadata per top-{args.top_k} query: {with_text * args.top_k / 1024:.1f} KB with text, {without_text * args.top_k / 1024:.1f} KB without")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentStore(os.path.join(directory, "chunks.sqlite3"), cache_size=args.chunks)
+        started = time.perf_counter()
+        for start in range(0, len(chunks), 500):
+            store.put_many(None, zip(ids[start:start + 500], chunks[start:start + 500]))
+        print(f"stored {len(chunks)} chunks in {time.perf_counter() - started:.2f} s")
+
+        rng = random.Random(0)
+        result_sets = [rng.sample(ids, args.top_k) for _ in range(args.queries)]
+        uncached = ContentStore(os.path.join(directory, "chunks.sqlite3"), cache_size=0)
+        for label, target in (("sqlite", uncached), ("lru", store)):
+            latencies = []
+            for result_set in result_sets:
+                started = time.perf_counter()
+                target.get_many(None, result_set)
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(f"  get_many {label:>6}  p50={statistics.median(latencies):6.3f} ms  max={max(latencies):6.3f} ms")
+        uncached.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
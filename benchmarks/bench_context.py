@@ -0,0 +1,64 @@
+"""
+Prompt context size with and without budget packing, and the time the packing takes.
+Ingests the Greenleaf lore in test.py twice (so retrieval returns near-duplicates), then packs the
+matches for a set of questions at several top_k values.
+Run with: python -m benchmarks.bench_context --top-k 3 5 10 --max-tokens 1500
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from bm25_index import LexicalIndex
+from context_builder import ContextBuilder
+from vector_store import LocalVectorStore
+
+QUESTIONS = [
+    "How does army morale work?",
+    "What happens when food supplies run out?",
+    "Which race has the weakest economy?",
+    "How do I recruit a general?",
+    "What does a non-aggression pact do?",
+    "How are prisoners captured after a battle?",
+    "What does the Whisperer archetype specialise in?",
+    "How is province stability affected?",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--max-tokens", type=int, default=1500)
+    parser.add_argument("--strategy", choices=["hierarchical", "h1"], default="h1")
+    args = parser.parse_args()
+
+    rag_pipeline = load_pipeline(hf_client=StubInferenceClient(embed_latency=0.0), vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.CHUNK_STRATEGY = args.strategy
+    rag_pipeline.lexical_index = LexicalIndex(path=None)
+    rag_pipeline.ingest_manifest = None
+    rag_pipeline.ingest_documents([{"markdown": lore(), "document_id": "lore"}, {"markdown": lore(), "document_id": "lore-copy"}])
+    builder = ContextBuilder(max_tokens=args.max_tokens)
+
+    for top_k in args.top_k:
+        tokens_in, tokens_out, duplicates, pack_ms = [], [], [], []
+        for question in QUESTIONS:
+            matches = rag_pipeline.query_chunks(question, top_k=top_k)
+            contents = rag_pipeline.resolve_contents(matches)
+            started = time.perf_counter()
+            _, stats = builder.pack(question, matches, contents)
+            pack_ms.append((time.perf_counter() - started) * 1000)
+            tokens_in.append(stats.tokens_in)
+            tokens_out.append(stats.tokens_out)
+            duplicates.append(stats.duplicates)
+        saved = 1 - sum(tokens_out) / sum(tokens_in)
+        print(
+            f"top_k={top_k:>3}  tokens in={statistics.mean(tokens_in):7.0f}  out={statistics.mean(tokens_out):6.0f}"
+            f"  saved={saved:6.1%}  duplicates={statistics.mean(duplicates):4.1f}  pack p50={statistics.median(pack_ms):6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
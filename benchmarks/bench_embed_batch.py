@@ -0,0 +1,50 @@
+"""
+Compares per-chunk embedding against embed_batch during ingest_markdown.
+Run with: python -m benchmarks.bench_embed_batch --sections 40 --latency 0.05
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.stubs import StubInferenceClient, StubPineconeIndex, load_pipeline
+
+
+def build_markdown(sections: int) -> str:
+    return "\n\n".join(
+        f"# Section {idx}\n\nLore entry {idx} describing the factions, races and units of Greenleaf."
+        for idx in range(1, sections + 1)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per feature_extraction call")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    client = StubInferenceClient(embed_latency=args.latency)
+    pipeline = load_pipeline(hf_client=client, index=StubPineconeIndex(latency=0.0))
+    logging.getLogger().setLevel(logging.WARNING)
+    fragments = pipeline.split_into_h1_chunks(build_markdown(args.sections))
+
+    started = time.perf_counter()
+    for _, chunk_text in fragments:
+        pipeline.embed_and_normalize(chunk_text)
+    per_chunk_seconds = time.perf_counter() - started
+    per_chunk_calls = client.embed_calls
+
+    client.reset()
+    started = time.perf_counter()
+    pipeline.embed_batch([chunk_text for _, chunk_text in fragments], batch_size=args.batch_size)
+    batched_seconds = time.perf_counter() - started
+    batched_calls = client.embed_calls
+
+    print(f"chunks:     {len(fragments)}")
+    print(f"per-chunk:  {per_chunk_calls:4d} call(s) {per_chunk_seconds * 1000:9.1f} ms")
+    print(f"batched:    {batched_calls:4d} call(s) {batched_seconds * 1000:9.1f} ms (batch_size={args.batch_size})")
+    print(f"speedup:    {per_chunk_seconds / batched_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Connection reuse of the Hugging Face and Pinecone clients as rag_pipeline builds them, against
+the local stub server in benchmarks/stub_servers.py, which counts accepted TCP connections.
+Compares the client defaults (httpx keeps 20 idle connections, urllib3 4 per host) with pools sized
+to the concurrency. Every new connection would be a TLS handshake against the real services.
+Run with: python -m benchmarks.bench_http_pool --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_servers import StubHTTPServer
+from http_pool import PoolConfig
+
+
+def use_config(rag_pipeline, pool_config: PoolConfig, pinecone_maxsize: int) -> None:
+    rag_pipeline.http_pool_config = pool_config
+    rag_pipeline.PINECONE_POOL_MAXSIZE = pinecone_maxsize
+    rag_pipeline.hf_client = rag_pipeline.async_hf_client = rag_pipeline.vector_store = None
+    rag_pipeline.hf_pool_stats.clear()
+
+
+async def embed_async(rag_pipeline, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(position: int) -> None:
+        async with semaphore:
+            await rag_pipeline.aembed_and_normalize(f"question {position}")
+
+    await asyncio.gather(*(one(position) for position in range(requests)))
+
+
+def threaded(call, requests: int, concurrency: int) -> None:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency per request")
+    parser.add_argument("--jitter", type=float, default=0.9, help="Latency varies by up to this fraction either way")
+    args = parser.parse_args()
+
+    with StubHTTPServer(latency=args.latency, jitter=args.jitter) as server:
+        os.environ.update(
+            {
+                "HF_TOKEN": "stub-token",
+                "EMBED_MODEL": server.url,
+                "VECTOR_BACKEND": "pinecone",
+                "PINECONE_API_KEY": "stub-key",
+                "PINECONE_INDEX_HOST": server.url,
+                "INGEST_MANIFEST_DIR": "",
+                "LEXICAL_INDEX_PATH": "",
+                "CONTENT_STORE_PATH": ":memory:",
+            }
+        )
+        import rag_pipeline
+
+        # urllib3 logs every connection it throws away from a full pool; the counts below show the same.
+        logging.getLogger().setLevel(logging.ERROR)
+        logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+        configurations = (
+            ("client defaults", PoolConfig(max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0), 4),
+            (
+                f"pooled for c={args.concurrency}",
+                PoolConfig(max_connections=args.concurrency, max_keepalive_connections=args.concurrency, keepalive_expiry=30.0),
+                args.concurrency,
+            ),
+        )
+        vector = [0.1] * server.dim
+        for label, pool_config, pinecone_maxsize in configurations:
+            use_config(rag_pipeline, pool_config, pinecone_maxsize)
+            print(f"{label}:")
+            for name, run in (
+                ("hf async", lambda: asyncio.run(embed_async(rag_pipeline, args.requests, args.concurrency))),
+                ("hf sync", lambda: threaded(lambda position: rag_pipeline.embed_and_normalize(f"chunk {position}"), args.requests, args.concurrency)),
+                ("pinecone", lambda: threaded(lambda _: rag_pipeline.get_vector_store().query(vector, top_k=5), args.requests, args.concurrency)),
+            ):
+                server.reset()
+                started = time.perf_counter()
+                run()
+                seconds = time.perf_counter() - started
+                print(
+                    f"  {name:>9}  {args.requests / seconds:8.0f} req/s  server saw {server.connections:>5} connection(s)"
+                    f" for {sum(server.requests.values())} request(s)"
+                )
+            stats = rag_pipeline.pool_stats()
+            print(f"  pool stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
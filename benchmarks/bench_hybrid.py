@@ -0,0 +1,119 @@
+"""
+Retrieval quality and latency of dense-only, BM25-only and hybrid (RRF) search.
+Each paragraph of the Greenleaf lore in test.py becomes a chunk; each query is a few words lifted
+from one paragraph, lightly scrambled, and is a hit when that paragraph comes back in the top k.
+The stub embedding hashes character trigrams, so dense search has lexical signal but is noisy.
+Run with: python -m benchmarks.bench_hybrid --queries 200 --top-k 5
+"""
+import argparse
+import ast
+import hashlib
+import logging
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from bm25_index import LexicalIndex, tokenize
+from vector_store import LocalVectorStore
+
+
+class TrigramStubInferenceClient(StubInferenceClient):
+    def feature_extraction(self, text, model=None):
+        texts = text if isinstance(text, list) else [text]
+        return [self._embed(item) for item in texts]
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f"  {text.casefold()}  "
+        for start in range(len(padded) - 2):
+            digest = hashlib.blake2b(padded[start:start + 3].encode("utf-8"), digest_size=4).digest()
+            vector[int.from_bytes(digest, "big") % self.dim] += 1.0
+        return vector.tolist()
+
+
+def load_corpus() -> List[str]:
+    # test.py is parsed rather than imported: it is a script, and "test" shadows the stdlib package.
+    tree = ast.parse((Path(__file__).resolve().parent.parent / "test.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "prompt":
+            return [paragraph for paragraph in node.value.value.split("\n\n") if len(paragraph.split()) > 20]
+    raise RuntimeError("No prompt found in test.py.")
+
+
+def make_queries(rng: random.Random, paragraphs: List[str], count: int, words: int):
+    queries = []
+    for _ in range(count):
+        target = rng.randrange(len(paragraphs))
+        tokens = tokenize(paragraphs[target])
+        start = rng.randrange(max(1, len(tokens) - words))
+        window = tokens[start:start + words]
+        rng.shuffle(window)
+        queries.append((f"doc-{target:03d}", " ".join(window)))
+    return queries
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--words", type=int, default=4, help="Words lifted from the target paragraph per query")
+    args = parser.parse_args()
+
+    client = TrigramStubInferenceClient(dim=384, embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.lexical_index = LexicalIndex(path=None)
+    rag_pipeline.ingest_manifest = None
+    rag_pipeline.query_embedding_cache = None
+
+    paragraphs = load_corpus()
+    rag_pipeline.ingest_documents(
+        [{"markdown": f"# Passage {position}\n\n{text}", "document_id": f"doc-{position:03d}"} for position, text in enumerate(paragraphs)]
+    )
+    queries = make_queries(random.Random(0), paragraphs, args.queries, args.words)
+    lexical_index = rag_pipeline.lexical_index
+
+    def dense(question: str):
+        rag_pipeline.HYBRID_SEARCH = False
+        try:
+            return [match["id"] for match in rag_pipeline.query_chunks(question, top_k=args.top_k)]
+        finally:
+            rag_pipeline.HYBRID_SEARCH = True
+
+    def sparse(question: str):
+        return [doc_id for doc_id, _ in lexical_index.search(None, question, args.top_k)]
+
+    def hybrid(question: str):
+        return [match["id"] for match in rag_pipeline.query_chunks(question, top_k=args.top_k)]
+
+    print(f"chunks={len(paragraphs)} queries={len(queries)} top_k={args.top_k}")
+    for name, search in (("dense", dense), ("bm25", sparse), ("hybrid", hybrid)):
+        hits, reciprocal_ranks, latencies = 0, [], []
+        for target, question in queries:
+            started = time.perf_counter()
+            # Chunk ids are "<document_id>-chunk-<n>"; every passage is a single chunk.
+            found = [chunk_id.rsplit("-chunk-", 1)[0] for chunk_id in search(question)]
+            latencies.append((time.perf_counter() - started) * 1000)
+            if target in found:
+                hits += 1
+                reciprocal_ranks.append(1.0 / (found.index(target) + 1))
+            else:
+                reciprocal_ranks.append(0.0)
+        print(
+            f"{name:>7}  hit@{args.top_k}={hits / len(queries):.3f}  mrr={statistics.mean(reciprocal_ranks):.3f}"
+            f"  p50={statistics.median(latencies):7.3f} ms  p95={percentile(latencies, 0.95):7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+POST /ingest for a batch of documents, answered inline and with ?async=true. Inline, the client waits
+for chunking, embedding and upserts; async, it gets a job id back and polls GET /ingest/jobs/{id}
+while the job workers do the work. Reports request latency, time until every document is ingested,
+how many repeat submissions were deduplicated, and whether jobs left behind by a "crashed" process
+are picked up by the next one from the same SQLite file.
+Run with: python -m benchmarks.bench_ingest_jobs --documents 32 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.bench_chunking import lore
+from benchmarks.bench_suite import percentile
+from benchmarks.stubs import StubInferenceClient, StubPineconeIndex, load_pipeline
+from ingest_jobs import RUNNING, IngestJobQueue, IngestJobStore
+
+
+def documents(count: int, tag: str) -> List[Dict]:
+    base = lore()
+    return [
+        {"markdown": base.replace("\n# ", f"\n# {tag} {position} "), "document_id": f"{tag}-{position}"}
+        for position in range(count)
+    ]
+
+
+async def drive(app, args, mode: str) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    job_ids: List[str] = []
+    deduplicated = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    batch = documents(args.documents, mode)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def one(document: Dict) -> None:
+            nonlocal deduplicated
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/ingest", params={"async": "true"} if mode == "async" else None, json=document)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                if mode == "async":
+                    body = response.json()
+                    job_ids.append(body["job_id"])
+                    deduplicated += body["deduplicated"]
+
+        started = time.perf_counter()
+        # Async runs send every document twice; the second copy should join the first job.
+        repeats = 2 if mode == "async" else 1
+        await asyncio.gather(*(one(document) for document in batch * repeats))
+        accepted = time.perf_counter() - started
+        jobs: List[Dict] = []
+        while job_ids:
+            jobs = [(await client.get(f"/ingest/jobs/{job_id}")).json() for job_id in set(job_ids)]
+            if all(job["status"] in ("succeeded", "failed") for job in jobs):
+                break
+            await asyncio.sleep(0.05)
+        finished = time.perf_counter() - started
+    return {
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "accepted": accepted,
+        "finished": finished,
+        "jobs": len(set(job_ids)),
+        "deduplicated": deduplicated,
+        "failed": sum(job["status"] == "failed" for job in jobs),
+        "chunks_per_sec": sum(job["chunks_per_sec"] for job in jobs) / len(jobs) if jobs else 0.0,
+    }
+
+
+def restart(rag_pipeline, count: int, workers: int) -> Dict:
+    # Jobs are written to the store and one is marked running, as if the process died mid-ingest.
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.sqlite3")
+        store = IngestJobStore(path)
+        job_ids = [store.submit(document["markdown"], document["document_id"], None)[0] for document in documents(count, "restart")]
+        store.claim(job_ids[0])
+        interrupted = store.counts()[RUNNING]
+        queue = IngestJobQueue(IngestJobStore(path), rag_pipeline._run_ingest_job, workers=workers)
+        started = time.perf_counter()
+        recovered = queue.start()
+        while queue.stats()["jobs"]["succeeded"] + queue.stats()["jobs"]["failed"] < count:
+            time.sleep(0.02)
+        return {"interrupted": interrupted, "recovered": recovered, "seconds": time.perf_counter() - started, **queue.stats()["jobs"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--workers", type=int, default=2, help="INGEST_JOB_WORKERS")
+    args = parser.parse_args()
+
+    rag_pipeline = load_pipeline(
+        hf_client=StubInferenceClient(embed_latency=0.02, chat_latency=0.1), index=StubPineconeIndex(latency=0.005)
+    )
+    logging.getLogger().setLevel(logging.ERROR)
+    import main as api
+
+    queue = IngestJobQueue(
+        IngestJobStore(":memory:"), rag_pipeline._run_ingest_job, workers=args.workers, slot=rag_pipeline._ingest_job_slot
+    )
+    rag_pipeline.ingest_jobs = queue
+    for mode in ("inline", "async"):
+        result = asyncio.run(drive(api.app, args, mode))
+        line = (
+            f"{mode:>7}  request p50={result['p50']:7.1f} ms  p99={result['p99']:7.1f} ms"
+            f"  all accepted={result['accepted']:.2f}s  all ingested={result['finished']:.2f}s"
+        )
+        if mode == "async":
+            line += (
+                f"  jobs={result['jobs']}  deduplicated={result['deduplicated']}  failed={result['failed']}"
+                f"  avg job chunks/sec={result['chunks_per_sec']:.1f}"
+            )
+        print(line)
+    result = restart(rag_pipeline, min(args.documents, 8), args.workers)
+    print(
+        f"restart  queued before restart={min(args.documents, 8)} (running={result['interrupted']})  recovered={result['recovered']}"
+        f"  succeeded={result['succeeded']}  failed={result['failed']}  drained in {result['seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
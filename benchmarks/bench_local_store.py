@@ -0,0 +1,57 @@
+"""
+Query latency of the in-process LocalVectorStore (exact cosine top-k) and its memory-mapped reload time.
+Run with: python -m benchmarks.bench_local_store --sizes 1000 10000 100000 --dim 384
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import LocalVectorStore
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            store = LocalVectorStore(path=path)
+            vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+            for start in range(0, size, 1000):
+                store.upsert(
+                    [{"id": f"v{row}", "values": vectors[row], "metadata": {}} for row in range(start, min(size, start + 1000))]
+                )
+            store.save()
+
+            queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                store.query(query, top_k=args.top_k, include_metadata=False)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            LocalVectorStore(path=path)
+            reload_ms = (time.perf_counter() - started) * 1000
+
+        print(
+            f"n={size:>8}  p50={statistics.median(latencies):7.3f} ms  p95={percentile(latencies, 0.95):7.3f} ms"
+            f"  reload={reload_ms:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Cost of the stage instrumentation: per-span overhead in isolation, and /query latency over httpx's
+ASGI transport with the spans as shipped versus replaced by no-ops. Prints one request's
+timings and the rag_stage_seconds series from GET /metrics.
+Run with: python -m benchmarks.bench_metrics --spans 200000 --requests 300
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+import metrics
+from benchmarks.bench_chunking import lore
+from benchmarks.bench_hybrid import percentile
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from vector_store import LocalVectorStore
+
+
+class NoopSpan:
+    __slots__ = ()
+
+    def __init__(self, stage: str):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def span_overhead(count: int) -> None:
+    for label, factory, collect in (
+        ("no-op", NoopSpan, False),
+        ("span", metrics.span, False),
+        ("span+timings", metrics.span, True),
+    ):
+        context = metrics.collect_timings() if collect else NoopSpan("")
+        with context:
+            started = time.perf_counter()
+            for _ in range(count):
+                with factory("bench"):
+                    pass
+            seconds = time.perf_counter() - started
+        print(f"{label:>13}  {seconds / count * 1e9:7.0f} ns per span")
+
+
+async def query_latency(app, rag_pipeline, requests: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label in ("no-op spans", "spans"):
+            rag_pipeline.span = NoopSpan if label == "no-op spans" else metrics.span
+            rag_pipeline.query_embedding_cache.clear()
+            latencies = []
+            for position in range(requests):
+                started = time.perf_counter()
+                response = await client.post("/query", json={"question": f"Who leads army {position}?", "timings": True})
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(f"{label:>13}  p50={statistics.median(latencies):6.3f} ms  p95={percentile(latencies, 0.95):6.3f} ms")
+        print(f"timings of the last request: {response.json()['timings']}")
+        text = (await client.get("/metrics")).text
+        print("\n".join(line for line in text.splitlines() if line.startswith("rag_stage_seconds_count") and "bench" not in line))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    span_overhead(args.spans)
+    # Zero upstream latency, so the comparison is dominated by the pipeline's own work.
+    client = StubInferenceClient(embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.ingest_document(lore(), document_id="lore")
+    rag_pipeline.answer_cache = None
+
+    from main import app
+
+    asyncio.run(query_latency(app, rag_pipeline, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark of the list-based L2 normalization against the NumPy path.
+Run with: python -m benchmarks.bench_normalize --dim 384 --batch 32
+"""
+import argparse
+import logging
+import math
+import random
+import timeit
+
+import numpy as np
+
+from benchmarks.stubs import load_pipeline
+
+
+def list_normalize(raw_result) -> list:
+    # The pre-NumPy implementation, kept here as the baseline.
+    if hasattr(raw_result, "tolist"):
+        raw_result = raw_result.tolist()
+    embedding = raw_result[0] if len(raw_result) and isinstance(raw_result[0], list) else raw_result
+    l2_norm = math.sqrt(sum(value * value for value in embedding))
+    return [value / l2_norm for value in embedding] if l2_norm else embedding
+
+
+def report(label: str, seconds: float, number: int) -> None:
+    print(f"{label:<28} {seconds / number * 1e6:10.2f} us/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    pipeline = load_pipeline()
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(0)
+    single = np.asarray([[rng.uniform(-1.0, 1.0) for _ in range(args.dim)]], dtype=np.float32)
+    batch = np.asarray([[rng.uniform(-1.0, 1.0) for _ in range(args.dim)] for _ in range(args.batch)], dtype=np.float32)
+
+    report("list, single vector", timeit.timeit(lambda: list_normalize(single), number=args.number), args.number)
+    report("numpy, single vector", timeit.timeit(lambda: pipeline.l2_normalize(single[0]), number=args.number), args.number)
+    batch_number = max(1, args.number // 10)
+    report(f"list, batch of {args.batch}", timeit.timeit(lambda: [list_normalize(row) for row in batch.tolist()], number=batch_number), batch_number)
+    report(f"numpy, batch of {args.batch}", timeit.timeit(lambda: pipeline.l2_normalize(batch), number=batch_number), batch_number)
+
+    expected = np.asarray(list_normalize(single), dtype=np.float32)
+    assert np.allclose(pipeline.l2_normalize(single[0]), expected, atol=1e-6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+N NPC prompts answered as N concurrent POST /query calls versus one POST /query/batch, in-process
+over httpx's ASGI transport with the stub clients. Reports wall time and upstream call counts.
+Run with: python -m benchmarks.bench_query_batch --size 16 --duplicates 4 --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from vector_store import LocalVectorStore
+
+
+async def run(app, rag_pipeline, queries, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in ("/query x N", "/query/batch"):
+            rag_pipeline.async_hf_client.reset()
+            rag_pipeline.answer_cache.clear()
+            rag_pipeline.query_embedding_cache.clear()
+            started = time.perf_counter()
+            if name == "/query/batch":
+                response = await client.post("/query/batch", json={"queries": queries, "concurrency": concurrency})
+                failed = sum(item["error"] is not None for item in response.json()["results"])
+            else:
+                responses = await asyncio.gather(*(client.post("/query", json=query) for query in queries))
+                failed = sum(response.status_code != 200 for response in responses)
+            seconds = time.perf_counter() - started
+            stub = rag_pipeline.async_hf_client
+            print(
+                f"{name:>13}  {seconds:6.2f} s  embed_calls={stub.embed_calls:>3}  chat_calls={stub.chat_calls:>3}  failed={failed}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=16, help="Prompts per batch")
+    parser.add_argument("--duplicates", type=int, default=4, help="How many of them repeat an earlier prompt")
+    parser.add_argument("--concurrency", type=int, default=4, help="Generations in flight for /query/batch")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    client = StubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.ingest_document(lore(), document_id="lore")
+    # Unrelated questions, far apart enough that the semantic answer cache does not merge them.
+    distinct = [{"question": f"NPC {position}: what do you know about topic {position * 7919}?"} for position in range(args.size - args.duplicates)]
+    queries = distinct + distinct[: args.duplicates]
+
+    from main import app
+
+    asyncio.run(run(app, rag_pipeline, queries, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
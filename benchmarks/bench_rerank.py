@@ -0,0 +1,64 @@
+"""
+Precision at small top_k with and without the reranking stage, on the bench_hybrid corpus.
+Each query is a few scrambled words from one Greenleaf paragraph and is a hit when that paragraph is
+returned; the reranker over-fetches top_k * --candidates and keeps the best top_k.
+Run with: python -m benchmarks.bench_rerank --top-k 1 3 --candidates 4
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.bench_hybrid import TrigramStubInferenceClient, load_corpus, make_queries, percentile
+from benchmarks.stubs import load_pipeline
+from reranker import LexicalScorer, Reranker
+from vector_store import LocalVectorStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--candidates", type=int, default=4)
+    parser.add_argument("--words", type=int, default=4)
+    parser.add_argument("--budget-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    client = TrigramStubInferenceClient(dim=384, embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.query_embedding_cache = None
+    paragraphs = load_corpus()
+    rag_pipeline.ingest_documents(
+        [{"markdown": f"# Passage {position}\n\n{text}", "document_id": f"doc-{position:03d}"} for position, text in enumerate(paragraphs)]
+    )
+    queries = make_queries(random.Random(1), paragraphs, args.queries, args.words)
+    rag_pipeline.RERANK_CANDIDATES = args.candidates
+    reranker = Reranker(LexicalScorer(), budget=args.budget_ms / 1000)
+
+    modes = (
+        ("dense", False, None),
+        ("dense+rerank", False, reranker),
+        ("hybrid", True, None),
+        ("hybrid+rerank", True, reranker),
+    )
+    print(f"chunks={len(paragraphs)} queries={len(queries)} candidates=top_k*{args.candidates}")
+    for top_k in args.top_k:
+        for name, hybrid, stage in modes:
+            rag_pipeline.HYBRID_SEARCH, rag_pipeline.reranker = hybrid, stage
+            hits, latencies = 0, []
+            for target, question in queries:
+                started = time.perf_counter()
+                matches = rag_pipeline.query_chunks(question, top_k=top_k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += any(match["id"].rsplit("-chunk-", 1)[0] == target for match in matches)
+            print(
+                f"top_k={top_k}  {name:>14}  hit@{top_k}={hits / len(queries):.3f}"
+                f"  p50={statistics.median(latencies):6.3f} ms  p95={percentile(latencies, 0.95):6.3f} ms"
+            )
+    print(f"reranker: {reranker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+POST /query under injected inference faults, with and without the resilience layer (resilience.py):
+a small share of calls that stall (hedging), a share that fail with a 503 (jittered retries), and
+GEN_MODEL down entirely (circuit breaker and GEN_FALLBACK_MODEL). Reports errors and latency
+percentiles per run, plus the extra inference calls each configuration cost.
+Run with: python -m benchmarks.bench_resilience --requests 400 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+
+from benchmarks.bench_chunking import lore
+from benchmarks.bench_suite import run_http
+from benchmarks.stubs import AsyncStubInferenceClient, StubInferenceClient, load_pipeline
+from resilience import HedgePolicy, Resilience, RetryPolicy, model_chain
+
+FALLBACK_MODEL = "stub/fallback-model"
+
+
+def configure(rag_pipeline, client, attempts: int, hedge: bool, fallback: bool) -> None:
+    rag_pipeline.async_hf_client = client
+    rag_pipeline.inference = Resilience(
+        retry=RetryPolicy(max_attempts=attempts, backoff_base=0.02, backoff_max=0.2),
+        hedge=HedgePolicy(enabled=hedge, min_delay=0.01),
+        failure_threshold=5,
+        reset_timeout=1.0,
+    )
+    rag_pipeline.GEN_MODELS = model_chain(rag_pipeline.GEN_MODEL, FALLBACK_MODEL if fallback else None)
+    rag_pipeline.answer_cache.clear()
+    rag_pipeline.query_embedding_cache.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--chat-latency", type=float, default=0.1)
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="Share of calls that stall")
+    parser.add_argument("--stall-latency", type=float, default=2.0, help="Seconds a stalled call takes on top")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Share of calls that fail with a 503")
+    args = parser.parse_args()
+
+    rag_pipeline = load_pipeline(hf_client=StubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency))
+    logging.getLogger().setLevel(logging.ERROR)
+    rag_pipeline.ingest_markdown(lore(), document_id="lore")
+    from main import app
+
+    faults = {
+        "stalls": {"stall_rate": args.stall_rate, "stall_latency": args.stall_latency},
+        "errors": {"error_rate": args.error_rate},
+        "gen model down": {"down_models": [rag_pipeline.GEN_MODEL]},
+    }
+    configurations = (
+        ("unprotected", {"attempts": 1, "hedge": False, "fallback": False}),
+        ("retries", {"attempts": 3, "hedge": False, "fallback": False}),
+        ("retries+hedge", {"attempts": 3, "hedge": True, "fallback": False}),
+        ("+fallback", {"attempts": 3, "hedge": True, "fallback": True}),
+    )
+    for fault, fault_kwargs in faults.items():
+        print(f"{fault}:")
+        for label, options in configurations:
+            client = AsyncStubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency, **fault_kwargs)
+            configure(rag_pipeline, client, **options)
+            # The hedge delay needs latency samples first; warm up with fault-free calls.
+            if options["hedge"]:
+                healthy = AsyncStubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+                rag_pipeline.async_hf_client = healthy
+                asyncio.run(run_http(app, 40, args.concurrency))
+                rag_pipeline.async_hf_client = client
+                rag_pipeline.answer_cache.clear()
+                rag_pipeline.query_embedding_cache.clear()
+            result = asyncio.run(run_http(app, args.requests, args.concurrency))
+            stats = rag_pipeline.inference.stats()
+            print(
+                f"  {label:>14}  errors={result['errors']:>4}  p50={result['p50_ms']:7.1f} ms  p95={result['p95_ms']:7.1f} ms"
+                f"  p99={result['p99_ms']:7.1f} ms  max={result['max_ms']:7.1f} ms  inference calls={sum(client.calls_by_model.values())}"
+                f"  retries={sum(model['retries'] for model in stats.values())}"
+                f"  hedges={sum(model['hedges'] for model in stats.values())}"
+                f"  short-circuited={sum(model['short_circuited'] for model in stats.values())}"
+            )
+
+
+if __name__ == "__main__":
+    main()
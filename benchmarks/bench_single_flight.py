@@ -0,0 +1,84 @@
+"""
+A burst of concurrent identical questions with and without single-flight coalescing, through
+answer_question on a thread pool and through POST /query over httpx's ASGI transport.
+Reports wall time, upstream embed/chat calls and the coalescing counters.
+Run with: python -m benchmarks.bench_single_flight --requests 32 --distinct 2
+"""
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from singleflight import AsyncSingleFlight, SingleFlight
+from vector_store import LocalVectorStore
+
+
+def reset(rag_pipeline, enabled: bool) -> None:
+    rag_pipeline.hf_client.reset()
+    rag_pipeline.async_hf_client.reset()
+    rag_pipeline.answer_cache.clear()
+    rag_pipeline.query_embedding_cache.clear()
+    rag_pipeline.answer_flight = SingleFlight() if enabled else None
+    rag_pipeline.async_answer_flight = AsyncSingleFlight() if enabled else None
+
+
+def report(label: str, seconds: float, stub, flight) -> None:
+    counters = flight.stats() if flight is not None else {"coalesced": 0, "max_waiters": 0}
+    print(
+        f"{label:>22}  {seconds:6.2f} s  embed_calls={stub.embed_calls:>3}  chat_calls={stub.chat_calls:>3}"
+        f"  coalesced={counters['coalesced']:>3}  max_waiters={counters['max_waiters']}"
+    )
+
+
+async def run_http(app, queries) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/query", json=query) for query in queries))
+        seconds = time.perf_counter() - started
+    assert all(response.status_code == 200 for response in responses)
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=32, help="Concurrent requests per burst")
+    parser.add_argument("--distinct", type=int, default=2, help="Distinct questions spread over the burst")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    client = StubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    logging.getLogger().setLevel(logging.WARNING)
+    rag_pipeline.ingest_document(lore(), document_id="lore")
+    # Case and spacing differ between copies, which the key normalizes away.
+    questions = [f"Who commands the {position}th army of Greenleaf?" for position in range(args.distinct)]
+    queries = [
+        {"question": questions[position % args.distinct].upper() if position % 3 == 0 else questions[position % args.distinct]}
+        for position in range(args.requests)
+    ]
+
+    from main import app
+
+    print(f"{args.requests} concurrent requests over {args.distinct} distinct question(s)")
+    for enabled in (False, True):
+        reset(rag_pipeline, enabled)
+        with ThreadPoolExecutor(max_workers=args.requests) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda query: rag_pipeline.answer_question(query["question"]), queries))
+            seconds = time.perf_counter() - started
+        report(f"sync single_flight={'on' if enabled else 'off'}", seconds, rag_pipeline.hf_client, rag_pipeline.answer_flight)
+
+        reset(rag_pipeline, enabled)
+        seconds = asyncio.run(run_http(app, queries))
+        report(f"/query single_flight={'on' if enabled else 'off'}", seconds, rag_pipeline.async_hf_client, rag_pipeline.async_answer_flight)
+
+
+if __name__ == "__main__":
+    main()
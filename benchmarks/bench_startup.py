@@ -0,0 +1,76 @@
+"""
+Cold-start cost, each sample in a fresh interpreter: importing rag_pipeline and main with no
+credentials in the environment, running the FastAPI lifespan warm-up against the stub clients,
+and the latency of the first POST /query with and without that warm-up.
+Run with: python -m benchmarks.bench_startup --runs 5 --probe "Who rules Greenleaf?"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import rag_pipeline
+imported = time.perf_counter()
+import main
+main_imported = time.perf_counter()
+result = {"import_rag_pipeline": imported - started, "import_main": main_imported - imported}
+if sys.argv[1] == "serve":
+    import asyncio, logging
+    import httpx
+    from benchmarks.stubs import StubInferenceClient, load_pipeline
+
+    load_pipeline(hf_client=StubInferenceClient(embed_latency=0.01, chat_latency=0.0, connect_latency=float(sys.argv[2])))
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def serve():
+        async with main.lifespan(main.app):
+            result["lifespan_startup"] = time.perf_counter() - lifespan_started
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                first = time.perf_counter()
+                # Not the probe text, so the query-embedding cache does not answer it.
+                (await client.post("/query", json={"question": "Which factions do the Ashenclad have?"})).raise_for_status()
+                result["first_query"] = time.perf_counter() - first
+
+    lifespan_started = time.perf_counter()
+    asyncio.run(serve())
+print(json.dumps(result))
+"""
+
+CREDENTIALS = ("HF_TOKEN", "PINECONE_API_KEY", "PINECONE_INDEX_HOST")
+
+
+def sample(mode: str, env: dict, connect_latency: float) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, str(connect_latency)], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--probe", default="Who rules Greenleaf?", help="STARTUP_PROBE_TEXT for the warm-up runs")
+    parser.add_argument("--connect-latency", type=float, default=0.2, help="Extra latency of the stub client's first call")
+    args = parser.parse_args()
+
+    base = {key: value for key, value in os.environ.items() if key not in CREDENTIALS}
+    base.update({"INGEST_MANIFEST_DIR": "", "LEXICAL_INDEX_PATH": "", "CONTENT_STORE_PATH": ":memory:"})
+    configurations = (
+        ("import only", "import", {}),
+        ("no warm-up", "serve", {"STARTUP_WARMUP": "false"}),
+        ("warm-up + probe", "serve", {"STARTUP_WARMUP": "true", "STARTUP_PROBE_TEXT": args.probe}),
+    )
+    for label, mode, extra in configurations:
+        runs = [sample(mode, {**base, **extra}, args.connect_latency) for _ in range(args.runs)]
+        medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+        print(f"{label:>16}  " + "  ".join(f"{key}={value:7.1f} ms" for key, value in medians.items()))
+
+
+if __name__ == "__main__":
+    main()
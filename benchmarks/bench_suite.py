@@ -0,0 +1,225 @@
+"""
+End-to-end offline benchmark suite: ingest_markdown, answer_question and POST /query (FastAPI over
+httpx's ASGI transport) at a configurable concurrency, against the stub HF client and stub Pinecone
+index from benchmarks/stubs.py with configurable latency. Reports throughput, p50/p95/p99 latency
+and memory per scenario, and writes them to JSON so runs can be compared across changes.
+Run with: python -m benchmarks.bench_suite --concurrency 16 --output bench.json [--compare before.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, StubPineconeIndex, load_pipeline
+
+SCENARIOS = ("ingest", "answer", "http_query")
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    # Linear interpolation between closest ranks.
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies: List[float], errors: int, seconds: float, concurrency: int) -> Dict:
+    completed = len(latencies)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(seconds, 4),
+        "throughput_per_sec": round(completed / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+
+def run_threaded(call: Callable[[int], object], count: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+
+    def one(position: int) -> Optional[float]:
+        started = time.perf_counter()
+        try:
+            call(position)
+        except Exception as exc:
+            logging.error("Benchmark call %d failed: %s", position, exc)
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency in pool.map(one, range(count)):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+async def run_http(app, count: int, concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def one(position: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/query", json={"question": question(position, "http")})
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(position) for position in range(count)))
+        return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+def question(position: int, scenario: str) -> str:
+    # Distinct per request and per scenario, so neither cache nor single-flight short-circuits the pipeline.
+    return f"{scenario} request {position}: what do the Ashenclad say about Greenleaf part {position % 97}?"
+
+
+def document(position: int, base: str) -> str:
+    return base.replace("\n# ", f"\n# Volume {position} ")
+
+
+def measure(name: str, run: Callable[[], Dict], trace_memory: bool) -> Dict:
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        result = run()
+        if trace_memory:
+            result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(
+        f"{name:>11}  {result['requests']:>5} req  c={result['concurrency']:<4} {result['throughput_per_sec']:9.1f}/s"
+        f"  p50={result['p50_ms']:8.2f} ms  p95={result['p95_ms']:8.2f} ms  p99={result['p99_ms']:8.2f} ms"
+        f"  errors={result['errors']}  rss={result['peak_rss_mb']} MB"
+        + (f"  traced={result['traced_peak_mb']} MB" if trace_memory else "")
+    )
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, path: str) -> None:
+    with open(path, "r", encoding="utf-8") as handle:
+        previous = json.load(handle)
+    print(f"\nversus {path} ({previous['meta'].get('git_revision') or 'unknown revision'}):")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in ("throughput_per_sec", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if before.get(key):
+                changes.append(f"{key}={(result[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"{name:>11}  " + "  ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--documents", type=int, default=32, help="Documents ingested by the ingest scenario")
+    parser.add_argument("--questions", type=int, default=200, help="Questions per answer / http_query scenario")
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--chat-latency", type=float, default=0.1)
+    parser.add_argument("--index-latency", type=float, default=0.01)
+    parser.add_argument("--trace-memory", action="store_true", help="Also report tracemalloc peaks (several times slower)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Print the change against an earlier --output file")
+    args = parser.parse_args()
+
+    client = StubInferenceClient(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    index = StubPineconeIndex(latency=args.index_latency)
+    rag_pipeline = load_pipeline(hf_client=client, index=index)
+    logging.getLogger().setLevel(logging.WARNING)
+    base = lore()
+    if "ingest" not in args.scenarios:
+        rag_pipeline.ingest_markdown(base, document_id="lore")
+
+    results: Dict[str, Dict] = {}
+    for name in args.scenarios:
+        client.reset()
+        rag_pipeline.async_hf_client.reset()
+        if name == "ingest":
+            results[name] = measure(
+                name,
+                lambda: run_threaded(
+                    lambda position: rag_pipeline.ingest_markdown(document(position, base), document_id=f"bench-{position:04d}"),
+                    args.documents,
+                    args.concurrency,
+                ),
+                args.trace_memory,
+            )
+            results[name]["embed_calls"] = client.embed_calls
+        elif name == "answer":
+            results[name] = measure(
+                name,
+                lambda: run_threaded(lambda position: rag_pipeline.answer_question(question(position, name)), args.questions, args.concurrency),
+                args.trace_memory,
+            )
+        else:
+            from main import app
+
+            results[name] = measure(name, lambda: asyncio.run(run_http(app, args.questions, args.concurrency)), args.trace_memory)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+A local HTTP server that answers like the Hugging Face inference API (feature extraction at any
+path, chat completions at /v1/chat/completions) and a Pinecone index (/query, /vectors/*,
+/describe_index_stats), with configurable latency. It counts accepted TCP connections, so
+connection reuse by the real clients can be measured without credentials.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from benchmarks.stubs import fake_embedding
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Enough for a burst of new connections from an exhausted pool.
+    request_queue_size = 512
+
+    def __init__(self, latency: float = 0.01, dim: int = 384, jitter: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        # Each response takes latency * uniform(1 - jitter, 1 + jitter).
+        self.jitter = jitter
+        self.dim = dim
+        self.connections = 0
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-http", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def delay(self) -> None:
+        time.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = {}
+
+    def __enter__(self) -> "StubHTTPServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, as the real services do.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _reply(self, payload) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self.server.count(self.path.split("?")[0])
+        self.server.delay()
+        if self.path.startswith("/vectors/fetch"):
+            self._reply({"vectors": {}, "namespace": ""})
+        else:
+            self._reply({"namespaces": {}, "dimension": self.server.dim, "totalVectorCount": 0})
+
+    def do_POST(self) -> None:
+        path = self.path.split("?")[0]
+        self.server.count(path)
+        body = self._body()
+        self.server.delay()
+        if path.endswith("/chat/completions"):
+            self._reply(
+                {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "I do not know."}}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 4, "total_tokens": 5},
+                }
+            )
+        elif path == "/query":
+            self._reply({"matches": [], "namespace": body.get("namespace", "")})
+        elif path == "/vectors/upsert":
+            self._reply({"upsertedCount": len(body.get("vectors", []))})
+        elif path in ("/vectors/delete", "/vectors/update", "/describe_index_stats"):
+            self._reply({} if path != "/describe_index_stats" else {"namespaces": {}, "dimension": self.server.dim, "totalVectorCount": 0})
+        else:
+            inputs = body.get("inputs")
+            texts = inputs if isinstance(inputs, list) else [inputs]
+            self._reply([fake_embedding(str(text), self.server.dim) for text in texts])
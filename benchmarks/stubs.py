@@ -0,0 +1,251 @@
+"""
+Local stand-ins for the Hugging Face InferenceClient and the Pinecone index.
+Lets the pipeline run offline with configurable latency and call counters.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def fake_embedding(text: str, dim: int = 384) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+class StubHTTPError(Exception):
+    """Shaped like huggingface_hub's HTTP errors: the status code is on .response."""
+
+    def __init__(self, status_code: int, model: Optional[str]):
+        super().__init__(f"{status_code} from stub model {model}")
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class StubInferenceClient:
+    def __init__(
+        self,
+        dim: int = 384,
+        embed_latency: float = 0.05,
+        chat_latency: float = 0.2,
+        answer: str = "I do not know.",
+        connect_latency: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_latency: float = 5.0,
+        error_rate: float = 0.0,
+        down_models: Iterable[str] = (),
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.answer = answer
+        # Added to the first call only, standing in for DNS + TLS setup of a fresh connection.
+        self.connect_latency = connect_latency
+        # Fault injection: a stall_rate share of calls takes stall_latency longer, an error_rate share
+        # fails with a 503, and every call to a model in down_models fails with a 503.
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.error_rate = error_rate
+        self.down_models = set(down_models)
+        self.embed_calls = 0
+        self.embedded_texts = 0
+        self.chat_calls = 0
+        self.stalls = 0
+        self.errors = 0
+        self.calls_by_model: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._connected = False
+        self._lock = threading.Lock()
+
+    def _fault(self, model: Optional[str]) -> float:
+        # Returns extra latency for this call, or raises its injected error.
+        with self._lock:
+            self.calls_by_model[model or ""] = self.calls_by_model.get(model or "", 0) + 1
+            if model in self.down_models or self._random.random() < self.error_rate:
+                self.errors += 1
+                raise StubHTTPError(503, model)
+            if self._random.random() < self.stall_rate:
+                self.stalls += 1
+                return self.stall_latency
+            return 0.0
+
+    def _connect_delay(self) -> float:
+        with self._lock:
+            if self._connected:
+                return 0.0
+            self._connected = True
+            return self.connect_latency
+
+    def feature_extraction(self, text, model: Optional[str] = None):
+        texts = text if isinstance(text, list) else [text]
+        with self._lock:
+            self.embed_calls += 1
+            self.embedded_texts += len(texts)
+        time.sleep(self.embed_latency + self._fault(model) + self._connect_delay())
+        return [fake_embedding(item, self.dim) for item in texts]
+
+    def chat_completion(self, messages, model: Optional[str] = None, max_tokens: int = 512, temperature: float = 0.7, **kwargs):
+        with self._lock:
+            self.chat_calls += 1
+        time.sleep(self.chat_latency + self._fault(model) + self._connect_delay())
+        message = SimpleNamespace(content=self.answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def reset(self) -> None:
+        with self._lock:
+            self.embed_calls = 0
+            self.embedded_texts = 0
+            self.chat_calls = 0
+            self.stalls = 0
+            self.errors = 0
+            self.calls_by_model = {}
+
+
+class AsyncStubInferenceClient(StubInferenceClient):
+    async def feature_extraction(self, text, model: Optional[str] = None):
+        texts = text if isinstance(text, list) else [text]
+        with self._lock:
+            self.embed_calls += 1
+            self.embedded_texts += len(texts)
+        await asyncio.sleep(self.embed_latency + self._fault(model) + self._connect_delay())
+        return [fake_embedding(item, self.dim) for item in texts]
+
+    async def chat_completion(self, messages, model: Optional[str] = None, max_tokens: int = 512, temperature: float = 0.7, stream: bool = False, **kwargs):
+        with self._lock:
+            self.chat_calls += 1
+        extra = self._fault(model)
+        if stream:
+            return self._stream_answer()
+        await asyncio.sleep(self.chat_latency + extra + self._connect_delay())
+        message = SimpleNamespace(content=self.answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream_answer(self):
+        await asyncio.sleep(self._connect_delay())
+        tokens = self.answer.split(" ")
+        for idx, token in enumerate(tokens):
+            await asyncio.sleep(self.chat_latency / len(tokens))
+            text = token if idx == 0 else f" {token}"
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class StubPineconeIndex:
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.namespaces: Dict[str, Dict[str, Dict]] = {}
+        self.upsert_calls = 0
+        self.query_calls = 0
+        # namespace -> (records, normalized matrix), rebuilt after writes so queries cost what a server's would, not Python loops.
+        self._matrices: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[Dict], namespace: Optional[str] = None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.upsert_calls += 1
+            records = self.namespaces.setdefault(namespace or "", {})
+            for vector in vectors:
+                records[vector["id"]] = vector
+            self._matrices.pop(namespace or "", None)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: Optional[str] = None, include_metadata: bool = False, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.query_calls += 1
+            records, matrix = self._matrix(namespace or "")
+        if not records:
+            return SimpleNamespace(matches=[])
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ (query / (np.linalg.norm(query) or 1.0))
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        matches = [
+            SimpleNamespace(
+                id=records[index]["id"],
+                score=float(scores[index]),
+                metadata=records[index].get("metadata") if include_metadata else None,
+            )
+            for index in order
+        ]
+        return SimpleNamespace(matches=matches)
+
+    def _matrix(self, namespace: str) -> tuple:
+        # Called with the lock held.
+        cached = self._matrices.get(namespace)
+        if cached is None:
+            records = list(self.namespaces.get(namespace, {}).values())
+            if not records:
+                return records, np.empty((0, 0), dtype=np.float32)
+            matrix = np.asarray([record["values"] for record in records], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            cached = self._matrices[namespace] = (records, matrix / np.where(norms == 0, 1.0, norms))
+        return cached
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None):
+        time.sleep(self.latency)
+        with self._lock:
+            records = self.namespaces.get(namespace or "", {})
+            vectors = {
+                vector_id: SimpleNamespace(id=vector_id, values=records[vector_id]["values"], metadata=records[vector_id].get("metadata"))
+                for vector_id in ids
+                if vector_id in records
+            }
+        return SimpleNamespace(vectors=vectors)
+
+    def update(self, id: str, set_metadata: Optional[Dict] = None, namespace: Optional[str] = None, **kwargs):
+        with self._lock:
+            record = self.namespaces.get(namespace or "", {}).get(id)
+            if record is not None and set_metadata:
+                record["metadata"] = {**record.get("metadata", {}), **set_metadata}
+                self._matrices.pop(namespace or "", None)
+        return {}
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None):
+        with self._lock:
+            records = self.namespaces.get(namespace or "", {})
+            for vector_id in ids:
+                records.pop(vector_id, None)
+            self._matrices.pop(namespace or "", None)
+        return {}
+
+    def describe_index_stats(self):
+        with self._lock:
+            return {
+                "namespaces": {name: {"vector_count": len(records)} for name, records in self.namespaces.items()},
+                "total_vector_count": sum(len(records) for records in self.namespaces.values()),
+            }
+
+
+def load_pipeline(hf_client=None, index=None, async_hf_client=None, vector_store=None):
+    # Keep every local side store in memory so benchmark runs leave nothing on disk.
+    os.environ.setdefault("INGEST_MANIFEST_DIR", "")
+    os.environ.setdefault("LEXICAL_INDEX_PATH", "")
+    os.environ.setdefault("CONTENT_STORE_PATH", ":memory:")
+    os.environ.setdefault("INGEST_JOBS_PATH", ":memory:")
+    import rag_pipeline
+
+    rag_pipeline.hf_client = hf_client or StubInferenceClient()
+    rag_pipeline.async_hf_client = async_hf_client or AsyncStubInferenceClient(
+        dim=rag_pipeline.hf_client.dim,
+        embed_latency=rag_pipeline.hf_client.embed_latency,
+        chat_latency=rag_pipeline.hf_client.chat_latency,
+        answer=rag_pipeline.hf_client.answer,
+        connect_latency=rag_pipeline.hf_client.connect_latency,
+        stall_rate=rag_pipeline.hf_client.stall_rate,
+        stall_latency=rag_pipeline.hf_client.stall_latency,
+        error_rate=rag_pipeline.hf_client.error_rate,
+        down_models=rag_pipeline.hf_client.down_models,
+    )
+    if vector_store is None:
+        from vector_store import PineconeVectorStore
+
+        vector_store = PineconeVectorStore(index or StubPineconeIndex())
+    rag_pipeline.vector_store = vector_store
+    return rag_pipeline
@@ -0,0 +1,226 @@
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i in is it its of on or so that the their them "
+    "they this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.casefold()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index whose postings are typed arrays, one pair per term.
+
+    Updating or deleting a document tombstones its old slot; compact() rewrites the postings once
+    enough slots are dead. save() writes tombstoned slots as they are, so saving never compacts.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self.postings_docs: List[array] = []
+        self.postings_tfs: List[array] = []
+        self.doc_freq = array("i")
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lengths = array("i")
+        self.doc_terms: List[Optional[array]] = []
+        self.slots: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, doc_id: str, text: str) -> None:
+        if doc_id in self.slots:
+            self.delete([doc_id])
+        counts: Dict[int, int] = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                term_id = self.vocabulary[token] = len(self.vocabulary)
+                self.postings_docs.append(array("i"))
+                self.postings_tfs.append(array("i"))
+                self.doc_freq.append(0)
+            counts[term_id] = counts.get(term_id, 0) + 1
+
+        slot = len(self.doc_ids)
+        for term_id, tf in counts.items():
+            self.postings_docs[term_id].append(slot)
+            self.postings_tfs[term_id].append(tf)
+            self.doc_freq[term_id] += 1
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.doc_terms.append(array("i", counts.keys()))
+        self.slots[doc_id] = slot
+        self.total_length += len(tokens)
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        # Returns how many of doc_ids were in the index.
+        deleted = 0
+        for doc_id in doc_ids:
+            slot = self.slots.pop(doc_id, None)
+            if slot is None:
+                continue
+            deleted += 1
+            for term_id in self.doc_terms[slot]:
+                self.doc_freq[term_id] -= 1
+            self.total_length -= self.doc_lengths[slot]
+            self.doc_ids[slot] = None
+            self.doc_terms[slot] = None
+        if len(self.doc_ids) > 1024 and len(self.slots) < len(self.doc_ids) // 2:
+            self.compact()
+        return deleted
+
+    def compact(self) -> None:
+        live = [(doc_id, slot) for slot, doc_id in enumerate(self.doc_ids) if doc_id is not None]
+        remap = np.full(len(self.doc_ids), -1, dtype=np.int64)
+        remap[[slot for _, slot in live]] = np.arange(len(live))
+        for term_id in range(len(self.postings_docs)):
+            docs = np.frombuffer(self.postings_docs[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self.postings_tfs[term_id], dtype=np.int32)
+            keep = remap[docs] >= 0
+            self.postings_docs[term_id] = array("i", remap[docs[keep]].astype(np.int32).tobytes())
+            self.postings_tfs[term_id] = array("i", tfs[keep].tobytes())
+        self.doc_lengths = array("i", (self.doc_lengths[slot] for _, slot in live))
+        self.doc_terms = [self.doc_terms[slot] for _, slot in live]
+        self.doc_ids = [doc_id for doc_id, _ in live]
+        self.slots = {doc_id: slot for slot, doc_id in enumerate(self.doc_ids)}
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        if not self.slots or top_k < 1:
+            return []
+        term_ids = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not term_ids:
+            return []
+        live_count = len(self.slots)
+        average_length = self.total_length / live_count or 1.0
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term_id in term_ids:
+            df = self.doc_freq[term_id]
+            if df <= 0:
+                continue
+            idf = math.log(1.0 + (live_count - df + 0.5) / (df + 0.5))
+            docs = np.frombuffer(self.postings_docs[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self.postings_tfs[term_id], dtype=np.int32).astype(np.float32)
+            length_norm = self.k1 * (1.0 - self.b + self.b * lengths[docs] / average_length)
+            # A term's postings hold each slot at most once, so fancy-index accumulation is safe.
+            scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + length_norm)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates):
+            candidates = candidates[[self.doc_ids[slot] is not None for slot in candidates]]
+        if top_k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.doc_ids[slot], float(scores[slot])) for slot in ranked]
+
+    def save(self, stem: str) -> None:
+        offsets = np.zeros(len(self.postings_docs) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(docs) for docs in self.postings_docs])
+        empty = np.empty(0, dtype=np.int32)
+        with open(f"{stem}.npz.tmp", "wb") as handle:
+            np.savez(
+                handle,
+                offsets=offsets,
+                docs=np.concatenate([np.frombuffer(docs, dtype=np.int32) for docs in self.postings_docs] or [empty]),
+                tfs=np.concatenate([np.frombuffer(tfs, dtype=np.int32) for tfs in self.postings_tfs] or [empty]),
+                doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.int32),
+            )
+        with open(f"{stem}.json.tmp", "w", encoding="utf-8") as handle:
+            json.dump({"k1": self.k1, "b": self.b, "vocabulary": self.vocabulary, "doc_ids": self.doc_ids}, handle)
+        os.replace(f"{stem}.npz.tmp", f"{stem}.npz")
+        os.replace(f"{stem}.json.tmp", f"{stem}.json")
+
+    @classmethod
+    def load(cls, stem: str) -> "BM25Index":
+        with open(f"{stem}.json", encoding="utf-8") as handle:
+            header = json.load(handle)
+        index = cls(k1=header["k1"], b=header["b"])
+        index.vocabulary = header["vocabulary"]
+        index.doc_ids = header["doc_ids"]
+        index.slots = {doc_id: slot for slot, doc_id in enumerate(index.doc_ids) if doc_id is not None}
+        live = np.asarray([doc_id is not None for doc_id in index.doc_ids], dtype=bool)
+        with np.load(f"{stem}.npz") as arrays:
+            offsets, docs, tfs = arrays["offsets"], arrays["docs"], arrays["tfs"]
+            index.doc_lengths = array("i", arrays["doc_lengths"].astype(np.int32).tobytes())
+        term_lists: List[List[int]] = [[] for _ in index.doc_ids]
+        for term_id in range(len(offsets) - 1):
+            term_docs = docs[offsets[term_id]:offsets[term_id + 1]]
+            index.postings_docs.append(array("i", term_docs.astype(np.int32).tobytes()))
+            index.postings_tfs.append(array("i", tfs[offsets[term_id]:offsets[term_id + 1]].astype(np.int32).tobytes()))
+            index.doc_freq.append(int(live[term_docs].sum()))
+            for slot in term_docs:
+                term_lists[slot].append(term_id)
+        index.doc_terms = [array("i", terms) if live[slot] else None for slot, terms in enumerate(term_lists)]
+        index.total_length = int(np.frombuffer(index.doc_lengths, dtype=np.int32)[live].sum())
+        return index
+
+
+class LexicalIndex:
+    """Thread-safe BM25 indexes partitioned by namespace, optionally persisted under one directory."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._indexes: Dict[str, BM25Index] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        if path and os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.startswith("ns_") and name.endswith(".json"):
+                    namespace = unquote(name[len("ns_"): -len(".json")])
+                    self._indexes[namespace] = BM25Index.load(self._stem(namespace))
+
+    def _stem(self, namespace: str) -> str:
+        return os.path.join(self.path, "ns_" + quote(namespace, safe=""))
+
+    def has_documents(self, namespace: Optional[str]) -> bool:
+        index = self._indexes.get(namespace or "")
+        return index is not None and len(index) > 0
+
+    def contains(self, namespace: Optional[str], doc_id: str) -> bool:
+        index = self._indexes.get(namespace or "")
+        return index is not None and doc_id in index.slots
+
+    def add(self, namespace: Optional[str], documents: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            index = self._indexes.setdefault(namespace or "", BM25Index())
+            for doc_id, text in documents:
+                index.add(doc_id, text)
+                self._dirty.add(namespace or "")
+
+    def delete(self, namespace: Optional[str], doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            index = self._indexes.get(namespace or "")
+            if index is not None and index.delete(doc_ids):
+                self._dirty.add(namespace or "")
+
+    def search(self, namespace: Optional[str], query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        with self._lock:
+            index = self._indexes.get(namespace or "")
+            return index.search(query, top_k) if index is not None else []
+
+    def save(self, namespace: Optional[str]) -> None:
+        # Only writes a namespace changed since its last save.
+        if not self.path:
+            return
+        with self._lock:
+            index = self._indexes.get(namespace or "")
+            if index is None or (namespace or "") not in self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            index.save(self._stem(namespace or ""))
+            self._dirty.discard(namespace or "")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Bulk-ingest many markdown documents into the configured vector store in one run.
+
+Sources can be a directory (every *.md file, recursively), a single markdown
+file, or an NDJSON file with one {"markdown", "document_id"?, "namespace"?}
+object per line ("-" reads NDJSON from stdin).
+
+    python -m bulk_ingest wiki/ --namespace greenleaf --concurrency 8
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from rag_pipeline import ingest_documents
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[Dict]:
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            document = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Line {line_number} is not valid JSON: {exc}") from exc
+        if not isinstance(document, dict) or not isinstance(document.get("markdown"), str):
+            raise ValueError(f"Line {line_number} must be an object with a 'markdown' string.")
+        yield document
+
+
+def _document_id_for(path: Path, root: Path) -> str:
+    relative = path.relative_to(root) if path != root else Path(path.name)
+    return "-".join(relative.with_suffix("").parts)
+
+
+def load_documents(source: str) -> Iterator[Dict]:
+    if source == "-":
+        yield from parse_ndjson(sys.stdin)
+        return
+
+    path = Path(source)
+    if path.is_dir():
+        for markdown_path in sorted(path.rglob("*.md")):
+            yield {"markdown": markdown_path.read_text(encoding="utf-8"), "document_id": _document_id_for(markdown_path, path)}
+    elif path.suffix in (".ndjson", ".jsonl"):
+        with path.open(encoding="utf-8") as handle:
+            yield from parse_ndjson(handle)
+    elif path.is_file():
+        yield {"markdown": path.read_text(encoding="utf-8"), "document_id": _document_id_for(path, path)}
+    else:
+        raise FileNotFoundError(f"No such file or directory: {source}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest markdown documents into the configured vector store.")
+    parser.add_argument("sources", nargs="+", help="Directories, markdown files, NDJSON files, or - for NDJSON on stdin")
+    parser.add_argument("--namespace", default=None, help="Namespace for documents that do not set their own")
+    parser.add_argument("--concurrency", type=int, default=None, help="Embedding batches in flight (default EMBED_CONCURRENCY)")
+    args = parser.parse_args(argv)
+
+    documents: List[Dict] = []
+    for source in args.sources:
+        documents.extend(load_documents(source))
+    logging.info("Loaded %d document(s) from %s", len(documents), ", ".join(args.sources))
+
+    started = time.perf_counter()
+    done = 0
+
+    def report_progress(chunks: int) -> None:
+        nonlocal done
+        done += chunks
+        elapsed = time.perf_counter() - started
+        logging.info("Upserted %d chunk(s) (%.1f chunks/sec)", done, done / elapsed if elapsed else 0.0)
+
+    result = ingest_documents(documents, namespace=args.namespace, concurrency=args.concurrency, on_progress=report_progress)
+    print(json.dumps(result.summary(), indent=2))
+    return 1 if result.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Protocol, Tuple
+
+import numpy as np
+
+
+class CacheStore(Protocol):
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    def delete(self, key: Hashable) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+class LRUTTLStore:
+    """Bounded in-process store with least-recently-used eviction and a per-entry TTL."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = self.clock() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def normalize_query_text(text: str) -> str:
+    # bge-small-en-v1.5 lowercases its input, so case and spacing variants embed identically.
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Query-embedding cache keyed on (model, normalized text) in front of any CacheStore."""
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, model: str, text: str) -> Tuple[str, str]:
+        return (model, normalize_query_text(text))
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        value = self.store.get(self.key(model, text))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, model: str, text: str, embedding: np.ndarray) -> np.ndarray:
+        embedding = np.array(embedding, dtype=np.float32)
+        # Callers share the cached array, so make accidental in-place edits fail loudly.
+        embedding.setflags(write=False)
+        self.store.set(self.key(model, text), embedding)
+        return embedding
+
+    def get_or_compute(self, model: str, text: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        cached = self.get(model, text)
+        if cached is not None:
+            return cached
+        return self.set(model, text, compute(text))
+
+    def clear(self) -> None:
+        self.store.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        stats: Dict[str, Any] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": len(self.store),
+        }
+        for counter in ("evictions", "expirations"):
+            if hasattr(self.store, counter):
+                stats[counter] = getattr(self.store, counter)
+        return stats
+
+
+class AnswerCache:
+    """Semantic cache of generated answers, matched on retrieved chunk set plus question similarity."""
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        threshold: float = 0.95,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        if not -1.0 <= threshold <= 1.0:
+            raise ValueError("threshold must be a cosine similarity between -1 and 1.")
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.seconds_saved = 0.0
+        self._next_id = 0
+        # entry id -> (bucket key, embedding, answer, generation seconds, expires_at), in LRU order
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, frozenset], np.ndarray, str, float, float]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, frozenset], set] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket_key(namespace: Optional[str], chunk_ids) -> Tuple[str, frozenset]:
+        return (namespace or "", frozenset(chunk_ids))
+
+    def _drop(self, entry_id: int) -> None:
+        bucket_key = self._entries.pop(entry_id)[0]
+        bucket = self._buckets[bucket_key]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._buckets[bucket_key]
+
+    def lookup(self, namespace: Optional[str], embedding: np.ndarray, chunk_ids) -> Optional[str]:
+        bucket_key = self._bucket_key(namespace, chunk_ids)
+        now = self.clock()
+        with self._lock:
+            for entry_id in list(self._buckets.get(bucket_key, ())):
+                expires_at = self._entries[entry_id][4]
+                if expires_at and expires_at <= now:
+                    self._drop(entry_id)
+            candidates = list(self._buckets.get(bucket_key, ()))
+            if candidates:
+                # Embeddings are L2-normalized, so the dot product is the cosine similarity.
+                stacked = np.stack([self._entries[entry_id][1] for entry_id in candidates])
+                scores = stacked @ np.asarray(embedding, dtype=np.float32)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    _, _, answer, generation_seconds, _ = self._entries[entry_id]
+                    self.hits += 1
+                    self.seconds_saved += generation_seconds
+                    return answer
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        namespace: Optional[str],
+        embedding: np.ndarray,
+        chunk_ids,
+        answer: str,
+        generation_seconds: float = 0.0,
+    ) -> None:
+        bucket_key = self._bucket_key(namespace, chunk_ids)
+        expires_at = self.clock() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                bucket_key,
+                np.array(embedding, dtype=np.float32),
+                answer,
+                generation_seconds,
+                expires_at,
+            )
+            self._buckets.setdefault(bucket_key, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_namespace(self, namespace: Optional[str]) -> int:
+        namespace = namespace or ""
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items() if entry[0][0] == namespace]
+            for entry_id in stale:
+                self._drop(entry_id)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "seconds_saved": round(self.seconds_saved, 3),
+            }
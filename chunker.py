@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.*?)[ \t#]*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_LINE_RE = re.compile(r"[^\n]*\n|[^\n]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# A word of n characters counts as ceil(n / 8) pieces.
+_TOKEN_RE = re.compile(r"\w{1,8}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    # Close to (and usually a little above) a WordPiece count: one token per symbol and per word,
+    # plus one for every further 8 characters of a long word, which WordPiece splits into pieces.
+    return len(_TOKEN_RE.findall(text))
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """Yield (heading level, text) for each markdown block; level 0 is a paragraph or fenced code block."""
+    paragraph: List[str] = []
+    fence: Optional[str] = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if fence is not None:
+            paragraph.append(line)
+            if line.strip().startswith(fence):
+                yield 0, "\n".join(paragraph)
+                paragraph, fence = [], None
+            continue
+        fence_match = _FENCE_RE.match(line)
+        heading = None if fence_match else _HEADING_RE.match(line)
+        if fence_match or heading or not line.strip():
+            if paragraph:
+                yield 0, "\n".join(paragraph).strip()
+                paragraph = []
+        if fence_match:
+            fence = fence_match.group(1)
+            paragraph.append(line)
+        elif heading:
+            yield len(heading.group(1)), line.strip()
+        elif line.strip():
+            paragraph.append(line)
+    if paragraph:
+        yield 0, "\n".join(paragraph).strip()
+
+
+@dataclass
+class Chunk:
+    text: str
+    heading_path: Tuple[str, ...]
+    token_count: int
+
+
+class HierarchicalChunker:
+    """Streaming markdown chunker with a token budget.
+
+    A chunk never spans two H1 sections. Within one, blocks are packed up to max_tokens, and an
+    overflowing chunk is cut at its last H2/H3 heading when it has one, otherwise between
+    paragraphs with overlap_tokens of trailing sentences repeated. Blocks larger than the budget are
+    split by sentence (lines for code), then by words. Chunks that do not start at an H1 repeat
+    their parent headings so each one embeds with its context.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 400,
+        overlap_tokens: int = 50,
+        split_level: int = 3,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        if max_tokens < 16:
+            raise ValueError("max_tokens must be at least 16.")
+        if not 0 <= overlap_tokens < max_tokens // 2:
+            raise ValueError("overlap_tokens must be non-negative and under half of max_tokens.")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.split_level = split_level
+        self.count = token_counter
+
+    def chunk(self, source: Union[str, Iterable[str]]) -> Iterator[Chunk]:
+        lines = (match.group(0) for match in _LINE_RE.finditer(source)) if isinstance(source, str) else source
+        levels: List[int] = []
+        headings: List[str] = []
+        state = _ChunkState(self, ())
+        for level, text in iter_blocks(lines):
+            if level and level <= self.split_level:
+                depth = next((position for position, existing in enumerate(levels) if existing >= level), len(levels))
+                del levels[depth:], headings[depth:]
+                levels.append(level)
+                headings.append(text)
+                if level == 1:
+                    yield from state.flush()
+                    state = _ChunkState(self, tuple(headings))
+                else:
+                    state.mark_boundary(tuple(headings))
+            yield from state.add(text, level)
+        yield from state.flush()
+
+
+class _ChunkState:
+    # The chunk being built. blocks are (text, tokens, separator before it, heading level); the
+    # first prefix_blocks of them repeat parent headings.
+    def __init__(self, chunker: HierarchicalChunker, path: Tuple[str, ...], parents: Tuple[str, ...] = ()):
+        self.chunker = chunker
+        self.path = path
+        self.blocks: List[Tuple[str, int, str, int]] = [(heading, chunker.count(heading), "\n\n", 0) for heading in parents]
+        self.prefix_blocks = len(self.blocks)
+        self.tokens = sum(block[1] for block in self.blocks)
+        # (block index, parents, path) of the last H2/H3 heading with content before it.
+        self.boundary: Optional[Tuple[int, Tuple[str, ...], Tuple[str, ...]]] = None
+
+    def _is_content(self, block: Tuple[str, int, str, int]) -> bool:
+        return not 0 < block[3] <= self.chunker.split_level
+
+    @property
+    def has_content(self) -> bool:
+        return len(self.blocks) > self.prefix_blocks
+
+    def mark_boundary(self, path: Tuple[str, ...]) -> None:
+        if not any(self._is_content(block) for block in self.blocks[self.prefix_blocks:]):
+            # Only headings so far: the chunk simply starts deeper.
+            self.path = path
+        elif self.boundary is not None and not any(self._is_content(block) for block in self.blocks[self.boundary[0]:]):
+            # Consecutive headings are cut together, before the first of them.
+            self.boundary = (self.boundary[0], self.boundary[1], path)
+        else:
+            self.boundary = (len(self.blocks), path[:-1], path)
+
+    def add(self, text: str, level: int, separator: str = "\n\n") -> Iterator[Chunk]:
+        chunker = self.chunker
+        tokens = chunker.count(text)
+        if tokens > chunker.max_tokens - self.tokens and tokens > chunker.max_tokens // 2:
+            # Too big to place whole even in a fresh chunk, so it goes in as pieces.
+            for position, (piece, piece_separator) in enumerate(self._pieces(text)):
+                yield from self.add(piece, 0, separator if position == 0 else piece_separator)
+            return
+        while self.tokens + tokens > chunker.max_tokens and self.has_content:
+            yield from self._cut(tokens)
+        if not self.has_content:
+            # A piece that opens a chunk starts its own block after the repeated headings.
+            separator = "\n\n"
+        self.blocks.append((text, tokens, separator, level))
+        self.tokens += tokens
+
+    def _pieces(self, text: str) -> Iterator[Tuple[str, str]]:
+        chunker = self.chunker
+        code = text.lstrip().startswith(("```", "~~~"))
+        units = text.split("\n") if code else _SENTENCE_RE.split(text)
+        unit_separator = "\n" if code else " "
+        budget = chunker.max_tokens // 2
+        for unit in units:
+            if chunker.count(unit) <= budget:
+                yield unit, unit_separator
+                continue
+            words: List[str] = []
+            size = 0
+            for word in unit.split(" "):
+                word_tokens = chunker.count(word)
+                if words and size + word_tokens > budget:
+                    yield " ".join(words), unit_separator
+                    words, size = [], 0
+                if word_tokens > budget:
+                    # Pieces of one word are rejoined without a separator when they land in the same chunk.
+                    for position, window in enumerate(self._windows(word, budget)):
+                        yield window, unit_separator if position == 0 else ""
+                    continue
+                words.append(word)
+                size += word_tokens
+            if words:
+                yield " ".join(words), unit_separator
+
+    def _windows(self, word: str, budget: int) -> Iterator[str]:
+        # A run with no spaces, such as a base64 data URI or a long URL, is cut by characters.
+        count = self.chunker.count
+        start = 0
+        while start < len(word):
+            end = len(word)
+            tokens = count(word[start:end])
+            while tokens > budget:
+                end = start + max(1, (end - start) * budget // tokens)
+                tokens = count(word[start:end])
+            yield word[start:end]
+            start = end
+
+    def _cut(self, incoming: int) -> Iterator[Chunk]:
+        if self.boundary is not None:
+            index, parents, path = self.boundary
+            yield self._emit(self.blocks[:index])
+            rest = _ChunkState(self.chunker, path, parents)
+            tail = self.blocks[index:]
+        else:
+            yield self._emit(self.blocks)
+            rest = _ChunkState(self.chunker, self.path, self.path)
+            tail = self._overlap(self.blocks[self.prefix_blocks:])
+            if rest.tokens + sum(block[1] for block in tail) + incoming > self.chunker.max_tokens:
+                tail = []
+        for block in tail:
+            rest.blocks.append(block)
+            rest.tokens += block[1]
+        self.__dict__.update(rest.__dict__)
+
+    def _overlap(self, blocks: List[Tuple[str, int, str, int]]) -> List[Tuple[str, int, str, int]]:
+        budget = self.chunker.overlap_tokens
+        if not budget or not blocks or blocks[-1][3]:
+            return []
+        kept: List[str] = []
+        size = 0
+        for sentence in reversed(_SENTENCE_RE.split(blocks[-1][0])):
+            sentence_tokens = self.chunker.count(sentence)
+            if size + sentence_tokens > budget:
+                break
+            kept.insert(0, sentence)
+            size += sentence_tokens
+        return [(" ".join(kept), size, "\n\n", 0)] if kept else []
+
+    def flush(self) -> Iterator[Chunk]:
+        if self.has_content:
+            yield self._emit(self.blocks)
+
+    def _emit(self, blocks: List[Tuple[str, int, str, int]]) -> Chunk:
+        text = "".join((separator if position else "") + block for position, (block, _, separator, _) in enumerate(blocks))
+        return Chunk(
+            text=text,
+            heading_path=tuple(_HEADING_RE.match(heading).group(2) for heading in self.path),
+            token_count=sum(block[1] for block in blocks),
+        )
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache import LRUTTLStore
+
+# SQLite's default limit on bound parameters is 999 on older builds.
+_MAX_PARAMS = 900
+
+
+class ContentStore:
+    """Chunk text keyed by (namespace, chunk_id) in SQLite, fronted by an in-process LRU.
+
+    Lets the vector index keep only small metadata; callers resolve the text of a whole result
+    set with one get_many.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "namespace TEXT NOT NULL, chunk_id TEXT NOT NULL, content TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, chunk_id)) WITHOUT ROWID"
+        )
+        self._lock = threading.Lock()
+        self._cache: Optional[LRUTTLStore] = LRUTTLStore(max_size=cache_size) if cache_size > 0 else None
+        self.hits = 0
+        self.misses = 0
+
+    def put_many(self, namespace: Optional[str], items: Iterable[Tuple[str, str]]) -> None:
+        rows = [(namespace or "", chunk_id, content) for chunk_id, content in items]
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", rows)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        if self._cache is not None:
+            for row_namespace, chunk_id, content in rows:
+                self._cache.set((row_namespace, chunk_id), content)
+
+    def get_many(self, namespace: Optional[str], chunk_ids: Iterable[str]) -> Dict[str, str]:
+        namespace = namespace or ""
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for chunk_id in dict.fromkeys(chunk_ids):
+            content = self._cache.get((namespace, chunk_id)) if self._cache is not None else None
+            if content is None:
+                missing.append(chunk_id)
+            else:
+                found[chunk_id] = content
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            with self._lock:
+                for start in range(0, len(missing), _MAX_PARAMS):
+                    batch = missing[start:start + _MAX_PARAMS]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(
+                        self._connection.execute(
+                            f"SELECT chunk_id, content FROM chunks WHERE namespace = ? AND chunk_id IN ({placeholders})",
+                            [namespace, *batch],
+                        ).fetchall()
+                    )
+            if self._cache is not None:
+                for chunk_id in missing:
+                    if chunk_id in found:
+                        self._cache.set((namespace, chunk_id), found[chunk_id])
+        return found
+
+    def delete(self, namespace: Optional[str], chunk_ids: Iterable[str]) -> None:
+        namespace = namespace or ""
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            self._connection.executemany(
+                "DELETE FROM chunks WHERE namespace = ? AND chunk_id = ?", [(namespace, chunk_id) for chunk_id in chunk_ids]
+            )
+        if self._cache is not None:
+            for chunk_id in chunk_ids:
+                self._cache.delete((namespace, chunk_id))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "chunks": count,
+            "cache_size": len(self._cache) if self._cache is not None else 0,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
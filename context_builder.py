@@ -0,0 +1,187 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from bm25_index import tokenize
+from chunker import estimate_tokens
+
+_UNIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"\w+")
+_GAP = "…"
+
+
+@dataclass
+class ContextStats:
+    chunks: int = 0
+    used_chunks: int = 0
+    duplicates: int = 0
+    trimmed_chunks: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    dropped_ids: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def as_dict(self) -> Dict:
+        return {
+            "chunks": self.chunks,
+            "used_chunks": self.used_chunks,
+            "duplicates": self.duplicates,
+            "trimmed_chunks": self.trimmed_chunks,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_saved,
+            "dropped_ids": self.dropped_ids,
+        }
+
+
+def _shingles(text: str, size: int = 3) -> FrozenSet:
+    words = _WORD_RE.findall(text.casefold())
+    if len(words) < size:
+        return frozenset(words)
+    return frozenset(zip(*(words[offset:] for offset in range(size))))
+
+
+def _jaccard(left: FrozenSet, right: FrozenSet) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def chunk_header(position: int, chunk_id) -> str:
+    return f"[Chunk {position} | id={chunk_id}]"
+
+
+class ContextBuilder:
+    """Packs retrieved chunks into a prompt context that fits max_tokens.
+
+    Chunks are taken in descending score order; one whose word 3-grams overlap an already kept chunk
+    by dedup_threshold (Jaccard) or more is dropped. Each chunk may use an even share of the budget
+    still left, so short chunks hand their unused share to the ones after them. A chunk over its
+    share keeps its leading headings plus its sentences that best match the question (each with its
+    subsection heading), in document order.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        dedup_threshold: float = 0.8,
+        min_chunk_tokens: int = 24,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+        self.count = token_counter
+
+    def pack(
+        self, question: str, matches: List[Dict], contents: Optional[List[str]] = None
+    ) -> Tuple[List[Tuple[Dict, str]], ContextStats]:
+        # contents, when given, holds each match's text; otherwise it is read from metadata["content"].
+        stats = ContextStats(chunks=len(matches))
+        if contents is None:
+            contents = [match.get("metadata", {}).get("content", "") for match in matches]
+        order = sorted(range(len(matches)), key=lambda index: matches[index].get("score") or 0.0, reverse=True)
+        ordered = [matches[index] for index in order]
+        contents = [contents[index] for index in order]
+        sizes = [self.count(content) for content in contents]
+        stats.tokens_in = sum(sizes)
+
+        kept: List[Tuple[Dict, str, int]] = []
+        kept_shingles: List[FrozenSet] = []
+        for match, content, size in zip(ordered, contents, sizes):
+            shingles = _shingles(content)
+            if any(_jaccard(shingles, other) >= self.dedup_threshold for other in kept_shingles):
+                stats.duplicates += 1
+                stats.dropped_ids.append(match.get("id"))
+                continue
+            kept.append((match, content, size))
+            kept_shingles.append(shingles)
+
+        query_terms = set(tokenize(question))
+        # Sentences and their terms, split once and shared by the idf and the trimming.
+        split = [[(unit, set(tokenize(unit))) for unit in _UNIT_RE.split(content) if unit.strip()] for _, content, _ in kept]
+        idf = self._idf(query_terms, [terms for units in split for _, terms in units])
+        packed: List[Tuple[Dict, str]] = []
+        remaining = self.max_tokens
+        for position, (match, content, size) in enumerate(kept):
+            header = self.count(chunk_header(len(packed) + 1, match.get("id")))
+            share = remaining // (len(kept) - position) - header
+            if size > share:
+                content = self._trim(split[position], share, query_terms, idf) if share >= self.min_chunk_tokens else ""
+                if not content:
+                    stats.dropped_ids.append(match.get("id"))
+                    continue
+                stats.trimmed_chunks += 1
+                size = self.count(content)
+            packed.append((match, content))
+            remaining -= size + header
+            stats.tokens_out += size
+        stats.used_chunks = len(packed)
+        return packed, stats
+
+    def _idf(self, query_terms: set, unit_terms: List[set]) -> Dict[str, float]:
+        return {
+            term: math.log(1.0 + (len(unit_terms) + 1) / (1 + sum(term in terms for terms in unit_terms)))
+            for term in query_terms
+        }
+
+    def _trim(self, split: List[Tuple[str, set]], budget: int, query_terms: set, idf: Dict[str, float]) -> str:
+        units = [unit for unit, _ in split]
+        sizes = [self.count(unit) for unit in units]
+        headings = [unit.lstrip().startswith("#") for unit in units]
+        gap = self.count(_GAP)
+        selected = set()
+
+        def cost(positions) -> int:
+            # Sentences plus the gap markers the result will need: one before each run of selected
+            # sentences but the first, and one after the last run unless it ends the chunk.
+            ordered = sorted(positions)
+            gaps = sum(1 for before, after in zip(ordered, ordered[1:]) if after != before + 1)
+            gaps += ordered[-1] != len(units) - 1
+            return sum(sizes[position] for position in ordered) + gaps * gap
+
+        def take(position: int) -> bool:
+            if position in selected or cost(selected | {position}) > budget:
+                return False
+            selected.add(position)
+            return True
+
+        # The leading headings carry the chunk's section path, so they go in first.
+        for position, heading in enumerate(headings):
+            if not heading or not take(position):
+                break
+        relevance = [sum(idf[term] for term in query_terms & terms) for _, terms in split]
+        for position in sorted(range(len(units)), key=lambda index: (-relevance[index], index)):
+            if not relevance[position]:
+                break
+            if take(position) and not headings[position]:
+                # Keep the heading of the subsection the sentence came from, when it fits.
+                take(next((index for index in range(position - 1, -1, -1) if headings[index]), position))
+        # Leftover share goes to the sentences right after the chosen ones, which usually continue them.
+        grew = True
+        while grew:
+            grew = False
+            for position in sorted(selected):
+                if position + 1 < len(units) and not headings[position + 1] and take(position + 1):
+                    grew = True
+        if not any(relevance[position] for position in selected):
+            # Nothing matched the question, so fall back to the opening of the chunk.
+            for position in range(len(units)):
+                if position not in selected and not take(position):
+                    break
+        if all(headings[position] for position in selected):
+            return ""
+        lines: List[str] = []
+        previous = -1
+        for position in sorted(selected):
+            if previous >= 0 and position != previous + 1:
+                lines.append(_GAP)
+            lines.append(units[position].strip())
+            previous = position
+        if lines and previous != len(units) - 1:
+            lines.append(_GAP)
+        return "\n".join(lines)
@@ -0,0 +1,283 @@
+import importlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class PoolConfig:
+    """Connection-pool and timeout settings for an httpx client.
+
+    max_connections bounds open connections; up to max_keepalive_connections idle ones are kept for
+    keepalive_expiry seconds. pool_timeout is how long a request waits for a free connection.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 10.0
+
+
+class PoolStats:
+    """Counters kept by a PooledTransport. new_connections counts TCP connects, so connections
+    reused from the pool do not show up there."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        # Returns (open, idle) connections; set by the transport that owns the pool.
+        self.snapshot: Optional[Callable[[], Optional[tuple]]] = None
+
+    def started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def failed(self, pool_timeout: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if pool_timeout:
+                self.pool_timeouts += 1
+            else:
+                self.errors += 1
+
+    def traced(self, event: str) -> None:
+        if event == "connection.connect_tcp.started":
+            with self._lock:
+                self.new_connections += 1
+        elif event == "connection.start_tls.started":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "pool_timeouts": self.pool_timeouts,
+                "errors": self.errors,
+                "reuse_rate": round(1 - self.new_connections / self.requests, 4) if self.requests else 0.0,
+            }
+        counts = self.snapshot() if self.snapshot is not None else None
+        if counts is not None:
+            stats["open_connections"], stats["idle_connections"] = counts
+        return stats
+
+
+def _pool_snapshot(transport) -> Optional[tuple]:
+    # httpcore keeps its connection list on the transport's private _pool; report nothing if that changes.
+    pool = getattr(transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    connections = list(connections)
+    return len(connections), sum(1 for connection in connections if connection.is_idle())
+
+
+def hub_httpx_module():
+    # huggingface_hub builds its sessions on httpx; some builds ship it under another module name.
+    from huggingface_hub.utils import _http
+
+    return getattr(_http, "httpx2", None) or getattr(_http, "httpx", None) or importlib.import_module("httpx")
+
+
+def _transport_kwargs(httpx, config: PoolConfig) -> Dict[str, Any]:
+    http2 = config.http2
+    if http2:
+        try:
+            importlib.import_module("h2")
+        except ImportError:
+            logging.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    return {"limits": limits, "http2": http2}
+
+
+def timeout_for(httpx, config: PoolConfig):
+    return httpx.Timeout(
+        connect=config.connect_timeout, read=config.read_timeout, write=config.write_timeout, pool=config.pool_timeout
+    )
+
+
+def pooled_transport(httpx, config: PoolConfig, stats: PoolStats):
+    inner = httpx.HTTPTransport(**_transport_kwargs(httpx, config))
+    stats.snapshot = lambda: _pool_snapshot(inner)
+
+    class _TrackedStream(httpx.SyncByteStream):
+        def __init__(self, stream):
+            self._stream = stream
+            self._open = True
+
+        def __iter__(self):
+            yield from self._stream
+
+        def close(self) -> None:
+            if self._open:
+                self._open = False
+                stats.finished()
+            self._stream.close()
+
+    class PooledTransport(httpx.BaseTransport):
+        def handle_request(self, request):
+            chained = request.extensions.get("trace")
+
+            def trace(event: str, info: Dict) -> None:
+                stats.traced(event)
+                if chained is not None:
+                    chained(event, info)
+
+            request.extensions = {**request.extensions, "trace": trace}
+            stats.started()
+            try:
+                response = inner.handle_request(request)
+            except BaseException as exc:
+                stats.failed(isinstance(exc, httpx.PoolTimeout))
+                raise
+            # In flight until the body is read and the connection goes back to the pool.
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_TrackedStream(response.stream),
+                extensions=response.extensions,
+            )
+
+        def close(self) -> None:
+            inner.close()
+
+    return PooledTransport()
+
+
+def async_pooled_transport(httpx, config: PoolConfig, stats: PoolStats):
+    inner = httpx.AsyncHTTPTransport(**_transport_kwargs(httpx, config))
+    stats.snapshot = lambda: _pool_snapshot(inner)
+
+    class _TrackedStream(httpx.AsyncByteStream):
+        def __init__(self, stream):
+            self._stream = stream
+            self._open = True
+
+        async def __aiter__(self):
+            async for part in self._stream:
+                yield part
+
+        async def aclose(self) -> None:
+            if self._open:
+                self._open = False
+                stats.finished()
+            await self._stream.aclose()
+
+    class AsyncPooledTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            chained = request.extensions.get("trace")
+
+            async def trace(event: str, info: Dict) -> None:
+                stats.traced(event)
+                if chained is not None:
+                    await chained(event, info)
+
+            request.extensions = {**request.extensions, "trace": trace}
+            stats.started()
+            try:
+                response = await inner.handle_async_request(request)
+            except BaseException as exc:
+                stats.failed(isinstance(exc, httpx.PoolTimeout))
+                raise
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_TrackedStream(response.stream),
+                extensions=response.extensions,
+            )
+
+        async def aclose(self) -> None:
+            await inner.aclose()
+
+    return AsyncPooledTransport()
+
+
+def configure_hf_sessions(config: PoolConfig) -> Dict[str, PoolStats]:
+    """Routes huggingface_hub's sync and async sessions through pooled transports built from config.
+
+    The hub's own request/response event hooks are kept. Returns the stats for each. Timeouts also
+    have to be passed to the InferenceClient, which otherwise sends timeout=None with every request.
+    """
+    import huggingface_hub
+    from huggingface_hub.utils import _http
+
+    httpx = hub_httpx_module()
+    stats = {"sync": PoolStats("hf_sync"), "async": PoolStats("hf_async")}
+    default_hooks = {}
+    for kind, factory in (("sync", _http.default_client_factory), ("async", _http.default_async_client_factory)):
+        client = factory()
+        default_hooks[kind] = {name: list(hooks) for name, hooks in client.event_hooks.items()}
+        if kind == "sync":
+            client.close()
+
+    def client_factory():
+        return httpx.Client(
+            transport=pooled_transport(httpx, config, stats["sync"]),
+            event_hooks=default_hooks["sync"],
+            follow_redirects=True,
+            timeout=timeout_for(httpx, config),
+        )
+
+    def async_client_factory():
+        return httpx.AsyncClient(
+            transport=async_pooled_transport(httpx, config, stats["async"]),
+            event_hooks=default_hooks["async"],
+            follow_redirects=True,
+            timeout=timeout_for(httpx, config),
+        )
+
+    huggingface_hub.set_client_factory(client_factory)
+    huggingface_hub.set_async_client_factory(async_client_factory)
+    return stats
+
+
+def pinecone_pool_manager(index):
+    # pinecone-client 5.x: Index -> DataPlaneApi -> ApiClient -> RESTClientObject -> urllib3.PoolManager.
+    api_client = getattr(getattr(index, "_vector_api", None), "api_client", None)
+    return getattr(getattr(api_client, "rest_client", None), "pool_manager", None)
+
+
+def urllib3_pool_stats(pool_manager) -> Optional[Dict[str, int]]:
+    # pinecone-client 5.x talks to the index through a urllib3 PoolManager; sum over its host pools.
+    pools = getattr(pool_manager, "pools", None)
+    if pools is None:
+        return None
+    totals = {"pools": 0, "new_connections": 0, "requests": 0, "idle_connections": 0, "max_connections": 0}
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        totals["pools"] += 1
+        totals["new_connections"] += pool.num_connections
+        totals["requests"] += pool.num_requests
+        # The queue is pre-filled with None placeholders up to maxsize; only real entries are idle connections.
+        totals["idle_connections"] += sum(1 for connection in list(pool.pool.queue) if connection is not None) if pool.pool is not None else 0
+        totals["max_connections"] += pool.pool.maxsize if pool.pool is not None else 0
+    return totals
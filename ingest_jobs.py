@@ -0,0 +1,285 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_COLUMNS = (
+    "id, document_id, namespace, status, content_hash, chunks_total, chunks_done, chunks_skipped, "
+    "chunks_deleted, error, result, created_at, started_at, finished_at"
+)
+
+
+class IngestJobStore:
+    """Ingest jobs in SQLite, including the markdown of jobs that have not finished, so queued and
+    interrupted jobs can be picked up again after a restart."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, document_id TEXT, namespace TEXT NOT NULL, status TEXT NOT NULL, "
+            "markdown TEXT, content_hash TEXT NOT NULL, chunks_total INTEGER, chunks_done INTEGER NOT NULL DEFAULT 0, "
+            "chunks_skipped INTEGER NOT NULL DEFAULT 0, chunks_deleted INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "result TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_document ON jobs (namespace, document_id, status)")
+        self._lock = threading.Lock()
+
+    def submit(self, markdown: str, document_id: Optional[str], namespace: Optional[str]) -> Tuple[str, bool]:
+        """Returns (job id, deduplicated).
+
+        A document that already has an unfinished job is not queued twice: the same markdown returns
+        that job, and new markdown replaces the payload of a job that has not started yet. A running
+        job cannot take new markdown, so that case queues a second job.
+        """
+        digest = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if document_id is not None:
+                    active = self._connection.execute(
+                        "SELECT id, status, content_hash FROM jobs WHERE namespace = ? AND document_id = ? AND status IN (?, ?) "
+                        "ORDER BY created_at DESC",
+                        (namespace or "", document_id, QUEUED, RUNNING),
+                    ).fetchall()
+                    for job_id, status, content_hash in active:
+                        if content_hash == digest:
+                            self._connection.execute("COMMIT")
+                            return job_id, True
+                    for job_id, status, _ in active:
+                        if status == QUEUED:
+                            self._connection.execute(
+                                "UPDATE jobs SET markdown = ?, content_hash = ? WHERE id = ?", (markdown, digest, job_id)
+                            )
+                            self._connection.execute("COMMIT")
+                            return job_id, True
+                job_id = uuid.uuid4().hex
+                self._connection.execute(
+                    "INSERT INTO jobs (id, document_id, namespace, status, markdown, content_hash, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, document_id, namespace or "", QUEUED, markdown, digest, time.time()),
+                )
+                self._connection.execute("COMMIT")
+                return job_id, False
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Marks a queued job as running and returns its payload; None if it is gone or already claimed,
+        # or if another job for the same document is running (the job then stays queued).
+        with self._lock:
+            updated = self._connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ? AND NOT EXISTS ("
+                "SELECT 1 FROM jobs AS other WHERE other.namespace = jobs.namespace "
+                "AND other.document_id = jobs.document_id AND other.status = ?)",
+                (RUNNING, time.time(), job_id, QUEUED, RUNNING),
+            ).rowcount
+            if not updated:
+                return None
+            document_id, namespace, markdown = self._connection.execute(
+                "SELECT document_id, namespace, markdown FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return {"id": job_id, "document_id": document_id, "namespace": namespace or None, "markdown": markdown}
+
+    def planned(self, job_id: str, total: int, skipped: int) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET chunks_total = ?, chunks_skipped = ? WHERE id = ?", (total, skipped, job_id)
+            )
+
+    def progressed(self, job_id: str, chunks: int) -> None:
+        with self._lock:
+            self._connection.execute("UPDATE jobs SET chunks_done = chunks_done + ? WHERE id = ?", (chunks, job_id))
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        # The markdown is dropped once a job is done; only its hash is kept.
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, result = ?, chunks_deleted = ?, markdown = NULL, finished_at = ? "
+                "WHERE id = ?",
+                (
+                    FAILED if error is not None else SUCCEEDED,
+                    error,
+                    json.dumps(result) if result is not None else None,
+                    (result or {}).get("deleted", 0),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _describe(row) if row is not None else None
+
+    def recover(self) -> List[str]:
+        # Jobs left running by a previous process start over; upserts are idempotent by chunk id.
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, chunks_done = 0 WHERE status = ?", (QUEUED, RUNNING)
+            )
+            rows = self._connection.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (SUCCEEDED, FAILED, time.time() - older_than)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)} | dict(rows)
+
+
+def _describe(row: Tuple) -> Dict[str, Any]:
+    (job_id, document_id, namespace, status, _, total, done, skipped, deleted, error, result, created, started, finished) = row
+    end = finished or time.time()
+    elapsed = end - started if started else 0.0
+    return {
+        "job_id": job_id,
+        "document_id": document_id,
+        "namespace": namespace or None,
+        "status": status,
+        "chunks_total": total,
+        "chunks_done": done,
+        "chunks_skipped": skipped,
+        "chunks_deleted": deleted,
+        "progress": round(done / total, 4) if total else (1.0 if status == SUCCEEDED else 0.0),
+        "chunks_per_sec": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        "error": error,
+        "result": json.loads(result) if result else None,
+        "created_at": created,
+        "started_at": started,
+        "finished_at": finished,
+    }
+
+
+class IngestJobQueue:
+    """Runs ingest jobs from an IngestJobStore on a pool of worker threads.
+
+    run_fn(markdown, document_id=..., namespace=..., on_planned=..., on_progress=...) does the work
+    and returns a dict for the job's result; slot(namespace), if given, is entered around it. Workers
+    start, and jobs left over from a previous process are re-queued, on the first start() or submit().
+    A job whose document already has a running job is held back until that one finishes, so two
+    ingests of one document never run at once.
+    """
+
+    def __init__(
+        self,
+        store: IngestJobStore,
+        run_fn: Callable[..., Dict[str, Any]],
+        workers: int = 2,
+        retention: float = 86400.0,
+        slot: Optional[Callable[[Optional[str]], ContextManager]] = None,
+    ):
+        self.store = store
+        self.run_fn = run_fn
+        self.workers = workers
+        self.retention = retention
+        self.slot = slot
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        # Held-back job ids by (namespace, document_id) of the running job they wait for.
+        self._deferred: Dict[Tuple[str, str], List[str]] = {}
+        self._claim_lock = threading.Lock()
+
+    def start(self) -> int:
+        # Returns how many recovered jobs were queued.
+        with self._lock:
+            if self._threads:
+                return 0
+            purged = self.store.purge(self.retention)
+            if purged:
+                logging.info("Purged %d finished ingest job(s)", purged)
+            recovered = self.store.recover()
+            for job_id in recovered:
+                self._queue.put(job_id)
+            for position in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"ingest-job-{position}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        if recovered:
+            logging.info("Re-queued %d unfinished ingest job(s)", len(recovered))
+        return len(recovered)
+
+    def submit(self, markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> Tuple[str, bool]:
+        self.start()
+        job_id, deduplicated = self.store.submit(markdown, document_id, namespace)
+        if not deduplicated:
+            self._queue.put(job_id)
+        return job_id, deduplicated
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._claim_lock:
+            deferred = sum(len(job_ids) for job_ids in self._deferred.values())
+        return {"workers": self.workers, "pending": self._queue.qsize() + deferred, "jobs": self.store.counts()}
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception:
+                # A store error (e.g. "database is locked") must not take the worker down with it.
+                logging.exception("Ingest job worker failed on job %s", job_id)
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Claiming and holding back happen under the same lock as _finish, so a held-back job cannot
+        # miss the finish of the job it waits for.
+        with self._claim_lock:
+            job = self.store.claim(job_id)
+            if job is None:
+                waiting = self.store.get(job_id)
+                if waiting is not None and waiting["status"] == QUEUED:
+                    self._deferred.setdefault((waiting["namespace"] or "", waiting["document_id"]), []).append(job_id)
+            return job
+
+    def _finish(self, job: Dict[str, Any], **outcome: Any) -> None:
+        with self._claim_lock:
+            try:
+                self.store.finish(job["id"], **outcome)
+            finally:
+                for job_id in self._deferred.pop((job["namespace"] or "", job["document_id"]), ()):
+                    self._queue.put(job_id)
+
+    def _run(self, job_id: str) -> None:
+        job = self._claim(job_id)
+        if job is None:
+            return
+        started = time.perf_counter()
+        try:
+            with self.slot(job["namespace"]) if self.slot is not None else nullcontext():
+                result = self.run_fn(
+                    job["markdown"],
+                    document_id=job["document_id"],
+                    namespace=job["namespace"],
+                    on_planned=lambda total, skipped: self.store.planned(job_id, total, skipped),
+                    on_progress=lambda chunks: self.store.progressed(job_id, chunks),
+                )
+        except Exception as exc:
+            logging.error("Ingest job %s for %s failed: %s", job_id, job["document_id"] or "new document", exc)
+            self._finish(job, error=str(exc))
+            return
+        self._finish(job, result=result)
+        logging.info("Ingest job %s finished in %.2fs", job_id, time.perf_counter() - started)
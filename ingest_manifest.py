@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import quote
+
+
+class IngestManifest:
+    """Per-document record of the chunks last upserted, stored as one JSON file per (namespace, document_id)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: Optional[str], document_id: str) -> str:
+        # Like vector_store's file stems: named namespaces get an "ns_" prefix, so none of them can
+        # share a directory with the default namespace (None or "").
+        directory = "ns_" + quote(namespace, safe="") if namespace else "default_namespace"
+        return os.path.join(self.directory, directory, f"{quote(document_id, safe='')}.json")
+
+    def _legacy_path(self, namespace: Optional[str], document_id: str) -> str:
+        # Earlier layout, where None and "default" shared a directory; the file records which one wrote it.
+        return os.path.join(self.directory, quote(namespace or "default", safe=""), f"{quote(document_id, safe='')}.json")
+
+    def _read_legacy(self, namespace: Optional[str], document_id: str) -> Optional[Dict]:
+        try:
+            with open(self._legacy_path(namespace, document_id), encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except FileNotFoundError:
+            return None
+        return manifest if (manifest.get("namespace") or None) == (namespace or None) else None
+
+    def load(self, namespace: Optional[str], document_id: str) -> Dict[str, Dict]:
+        # chunk_id -> {"hash", "created_at"}
+        try:
+            with open(self._path(namespace, document_id), encoding="utf-8") as handle:
+                return json.load(handle).get("chunks", {})
+        except FileNotFoundError:
+            legacy = self._read_legacy(namespace, document_id)
+            return legacy.get("chunks", {}) if legacy is not None else {}
+
+    def save(self, namespace: Optional[str], document_id: str, chunks: Dict[str, Dict]) -> None:
+        path = self._path(namespace, document_id)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump({"document_id": document_id, "namespace": namespace, "chunks": chunks}, handle)
+            os.replace(temp_path, path)
+
+    def delete(self, namespace: Optional[str], document_id: str) -> None:
+        paths = [self._path(namespace, document_id)]
+        if self._read_legacy(namespace, document_id) is not None:
+            paths.append(self._legacy_path(namespace, document_id))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
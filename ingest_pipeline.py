@@ -0,0 +1,270 @@
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from resilience import InferenceUnavailableError, is_retryable
+
+# (chunk_id, chunk_text, metadata)
+ChunkRecord = Tuple[str, str, Dict]
+
+_DONE = object()
+
+
+@dataclass
+class IngestResult:
+    chunk_ids: List[str] = field(default_factory=list)
+    embed_batches: int = 0
+    upsert_batches: int = 0
+    retries: int = 0
+    failed_chunk_ids: List[str] = field(default_factory=list)
+    # Filled in by incremental re-ingest: chunks whose content hash was unchanged, and chunks no longer present.
+    skipped_chunk_ids: List[str] = field(default_factory=list)
+    deleted_chunk_ids: List[str] = field(default_factory=list)
+    # Chunks whose text moved to a new id and were upserted with the vector stored under the old one.
+    reused_chunk_ids: List[str] = field(default_factory=list)
+    # Wall-clock seconds for the whole run plus busy seconds summed across workers for each stage.
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunk_ids)
+
+
+def _batched(records: Iterable[ChunkRecord], size: int) -> Iterator[List[ChunkRecord]]:
+    batch: List[ChunkRecord] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StagedIngestPipeline:
+    """Embeds chunk batches on a thread pool while a separate thread upserts size-capped batches."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        upsert_fn: Callable[[List[Dict], Optional[str]], None],
+        embed_batch_size: int = 32,
+        embed_workers: int = 4,
+        upsert_batch_size: int = 100,
+        upsert_max_bytes: int = 2_000_000,
+        max_pending: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        if embed_batch_size < 1 or upsert_batch_size < 1:
+            raise ValueError("Batch sizes must be at least 1.")
+        if embed_workers < 1 or max_pending < 1:
+            raise ValueError("embed_workers and max_pending must be at least 1.")
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_max_bytes = upsert_max_bytes
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _with_retry(self, stage: str, func: Callable, stats: Dict, *args):
+        attempt = 0
+        while True:
+            try:
+                return func(*args)
+            except Exception as exc:
+                # A bad request or a bad document fails the same way every time, so only transient
+                # errors are retried; InferenceUnavailableError means the inference retries ran out.
+                if attempt >= self.max_retries or not (is_retryable(exc) or isinstance(exc, InferenceUnavailableError)):
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                attempt += 1
+                with stats["lock"]:
+                    stats["retries"] += 1
+                logging.warning("%s batch failed (%s); retry %d/%d in %.1fs", stage, exc, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+    def _embed_stage(
+        self, batch: List[ChunkRecord], upsert_queue: "queue.Queue", stats: Dict, cancelled: threading.Event, fail_fast: bool
+    ) -> None:
+        if cancelled.is_set():
+            return
+        started = time.perf_counter()
+        try:
+            embeddings = self._with_retry("Embedding", self.embed_fn, stats, [text for _, text, _ in batch])
+        except Exception as exc:
+            if fail_fast:
+                raise
+            logging.error("Embedding batch of %d chunk(s) failed: %s", len(batch), exc)
+            with stats["lock"]:
+                stats["failed"].extend(chunk_id for chunk_id, _, _ in batch)
+            return
+        vectors = [
+            {"id": chunk_id, "values": embedding.tolist(), "metadata": metadata}
+            for (chunk_id, _, metadata), embedding in zip(batch, embeddings)
+        ]
+        with stats["lock"]:
+            stats["embed"] += time.perf_counter() - started
+            stats["embed_batches"] += 1
+        # Blocks while the upsert thread is behind, which in turn holds back new embedding work.
+        upsert_queue.put(vectors)
+
+    def _upsert_stage(
+        self,
+        upsert_queue: "queue.Queue",
+        namespace: Optional[str],
+        stats: Dict,
+        cancelled: threading.Event,
+        fail_fast: bool,
+        on_progress: Optional[Callable[[int], None]],
+    ) -> None:
+        buffer: List[Dict] = []
+        buffer_bytes = 0
+
+        def flush() -> None:
+            nonlocal buffer, buffer_bytes
+            if not buffer or cancelled.is_set():
+                buffer, buffer_bytes = [], 0
+                return
+            started = time.perf_counter()
+            upserted = 0
+            try:
+                self._with_retry("Upsert", self.upsert_fn, stats, buffer, namespace)
+                upserted = len(buffer)
+            except Exception as exc:
+                if fail_fast:
+                    stats["error"] = exc
+                    cancelled.set()
+                else:
+                    logging.error("Upsert batch of %d chunk(s) failed: %s", len(buffer), exc)
+                    with stats["lock"]:
+                        stats["failed"].extend(vector["id"] for vector in buffer)
+            with stats["lock"]:
+                stats["upsert"] += time.perf_counter() - started
+                stats["upsert_batches"] += 1
+            buffer, buffer_bytes = [], 0
+            if upserted and on_progress is not None:
+                on_progress(upserted)
+
+        while True:
+            vectors = upsert_queue.get()
+            if vectors is _DONE:
+                break
+            # Keep draining after a failure so embedding workers never block on a full queue.
+            for vector in vectors:
+                vector_bytes = len(json.dumps(vector))
+                if buffer and buffer_bytes + vector_bytes > self.upsert_max_bytes:
+                    flush()
+                buffer.append(vector)
+                buffer_bytes += vector_bytes
+                if len(buffer) >= self.upsert_batch_size:
+                    flush()
+        flush()
+
+    def run(
+        self,
+        records: Iterable[ChunkRecord],
+        namespace: Optional[str] = None,
+        fail_fast: bool = True,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> IngestResult:
+        # With fail_fast=False a batch that exhausts its retries is recorded in failed_chunk_ids and the run continues.
+        started = time.perf_counter()
+        stats: Dict = {
+            "lock": threading.Lock(),
+            "embed": 0.0,
+            "upsert": 0.0,
+            "embed_batches": 0,
+            "upsert_batches": 0,
+            "retries": 0,
+            "failed": [],
+            "error": None,
+        }
+        cancelled = threading.Event()
+        upsert_queue: "queue.Queue" = queue.Queue(maxsize=self.max_pending)
+        in_flight = threading.BoundedSemaphore(self.max_pending)
+        chunk_ids: List[str] = []
+
+        upsert_thread = threading.Thread(
+            target=self._upsert_stage,
+            args=(upsert_queue, namespace, stats, cancelled, fail_fast, on_progress),
+            name="ingest-upsert",
+            daemon=True,
+        )
+        upsert_thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.embed_workers, thread_name_prefix="ingest-embed") as pool:
+                futures = []
+                for batch in _batched(records, self.embed_batch_size):
+                    if cancelled.is_set():
+                        break
+                    in_flight.acquire()
+                    chunk_ids.extend(chunk_id for chunk_id, _, _ in batch)
+                    future = pool.submit(self._embed_stage, batch, upsert_queue, stats, cancelled, fail_fast)
+                    future.add_done_callback(lambda _: in_flight.release())
+                    futures.append(future)
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        cancelled.set()
+                        stats["error"] = stats["error"] or exc
+        finally:
+            upsert_queue.put(_DONE)
+            upsert_thread.join()
+
+        if stats["error"] is not None:
+            raise stats["error"]
+        return IngestResult(
+            chunk_ids=chunk_ids,
+            embed_batches=stats["embed_batches"],
+            upsert_batches=stats["upsert_batches"],
+            retries=stats["retries"],
+            failed_chunk_ids=stats["failed"],
+            timings={
+                "embed": round(stats["embed"], 4),
+                "upsert": round(stats["upsert"], 4),
+                "total": round(time.perf_counter() - started, 4),
+            },
+        )
+
+
+@dataclass
+class BulkIngestResult:
+    document_ids: List[str] = field(default_factory=list)
+    chunk_count: int = 0
+    skipped_chunks: int = 0
+    reused_chunks: int = 0
+    deleted_chunks: int = 0
+    # document_id -> error message, for documents with any chunk that could not be ingested
+    failures: Dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        seconds = self.seconds or 1e-9
+        return {
+            "documents": len(self.document_ids),
+            "chunks": self.chunk_count,
+            "skipped_chunks": self.skipped_chunks,
+            "reused_chunks": self.reused_chunks,
+            "deleted_chunks": self.deleted_chunks,
+            "failed_documents": len(self.failures),
+            "failures": self.failures,
+            "seconds": round(self.seconds, 3),
+            "docs_per_sec": round(len(self.document_ids) / seconds, 2),
+            "chunks_per_sec": round(self.chunk_count / seconds, 2),
+            "timings": self.timings,
+        }
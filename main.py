@@ -1,9 +1,75 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import json
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager, nullcontext
 
-from rag_pipeline import answer_question, ingest_markdown
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.background import BackgroundTask
 
-app = FastAPI(title="Project Greenleaf RAG API")
+from admission import AdmissionRejected
+from bulk_ingest import parse_ndjson
+from metrics import REGISTRY
+from rag_pipeline import (
+    QUERY_BATCH_MAX_ITEMS,
+    STARTUP_PROBE_TEXT,
+    STARTUP_WARMUP,
+    admission,
+    admission_stats,
+    aanswer_question,
+    aanswer_questions,
+    aingest_document,
+    aingest_documents,
+    astream_answer,
+    awarm_up,
+    cache_stats,
+    get_ingest_jobs,
+    inference_stats,
+    ingest_job_stats,
+    ingest_job_status,
+    pool_stats,
+    start_ingest_jobs,
+    submit_ingest_job,
+)
+from resilience import InferenceUnavailableError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if STARTUP_WARMUP:
+        try:
+            logging.info("Warm-up finished: %s", await awarm_up(STARTUP_PROBE_TEXT or None))
+        except Exception as exc:
+            # Still serve; the clients are created on first use instead.
+            logging.warning("Warm-up failed: %s", exc)
+    # Starts the job workers and picks up jobs a previous process left queued or running.
+    start_ingest_jobs()
+    yield
+
+
+app = FastAPI(title="Project Greenleaf RAG API", lifespan=lifespan)
+
+
+@app.exception_handler(InferenceUnavailableError)
+async def inference_unavailable(request: Request, exc: InferenceUnavailableError):
+    # Retries and fallbacks are exhausted or every circuit is open: tell clients to back off rather than 500.
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def admitted(request_class: str, namespace: str | None = None, cost: float = 1.0, costs: dict | None = None):
+    # A no-op when ADMISSION_CONTROL is off. costs ({namespace: tokens}) charges a request spanning namespaces.
+    return admission.admit(request_class, namespace, cost, costs=costs) if admission is not None else nullcontext()
 
 
 class IngestRequest(BaseModel):
@@ -16,18 +82,70 @@ class IngestResponse(BaseModel):
     chunk_ids: list[str]
     count: int
     document_id: str
+    skipped_chunk_ids: list[str] = []
+    reused_chunk_ids: list[str] = []
+    deleted_chunk_ids: list[str] = []
+    timings: dict[str, float] = {}
+
+
+class IngestJobAccepted(BaseModel):
+    job_id: str
+    status_url: str
+    deduplicated: bool
+
+
+class BulkIngestRequest(BaseModel):
+    documents: list[IngestRequest]
+    namespace: str | None = None
+    concurrency: int | None = None
+
+
+class BulkIngestResponse(BaseModel):
+    document_ids: list[str]
+    documents: int
+    chunks: int
+    skipped_chunks: int
+    reused_chunks: int
+    deleted_chunks: int
+    failed_documents: int
+    failures: dict[str, str]
+    seconds: float
+    docs_per_sec: float
+    chunks_per_sec: float
+    timings: dict[str, float]
 
 
 class QueryRequest(BaseModel):
     question: str
-    top_k: int = 5
+    top_k: int = Field(5, ge=1)
     namespace: str | None = None
+    timings: bool = False
 
 
 class QueryResponse(BaseModel):
     answer: str
     context: str
     sources: list[dict]
+    context_stats: dict = {}
+    timings: dict[str, float] | None = None
+
+
+class QueryBatchRequest(BaseModel):
+    queries: list[QueryRequest]
+    concurrency: int | None = None
+
+
+class QueryBatchItem(BaseModel):
+    answer: str | None = None
+    context: str | None = None
+    sources: list[dict] = []
+    context_stats: dict = {}
+    error: str | None = None
+
+
+class QueryBatchResponse(BaseModel):
+    results: list[QueryBatchItem]
+    merged: int
 
 
 @app.get("/health")
@@ -35,19 +153,163 @@ def health_check():
     return {"status": "ok"}
 
 
-@app.post("/ingest", response_model=IngestResponse)
-def ingest(req: IngestRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return cache_stats()
+
+
+@app.get("/inference/stats")
+def get_inference_stats():
+    return inference_stats()
+
+
+@app.get("/admission/stats")
+def get_admission_stats():
+    return admission_stats()
+
+
+@app.get("/pool/stats")
+def get_pool_stats():
+    return pool_stats()
+
+
+@app.post("/ingest", response_model=IngestResponse, responses={202: {"model": IngestJobAccepted}})
+async def ingest(req: IngestRequest, async_: bool = Query(False, alias="async")):
     if not req.markdown.strip():
         raise HTTPException(status_code=400, detail="Markdown content is required.")
-    chunk_ids = ingest_markdown(req.markdown, document_id=req.document_id, namespace=req.namespace)
-    document_id = req.document_id or chunk_ids[0].split("-chunk-")[0]
-    return IngestResponse(chunk_ids=chunk_ids, count=len(chunk_ids), document_id=document_id)
+    if async_:
+        if get_ingest_jobs() is None:
+            raise HTTPException(status_code=400, detail="Background ingest jobs are disabled (INGEST_JOBS_PATH is empty).")
+        # Only the namespace's rate limit applies here; the job takes its ingest slot when a worker runs it.
+        if admission is not None:
+            admission.check_rate("ingest", req.namespace)
+        job_id, deduplicated = submit_ingest_job(req.markdown, document_id=req.document_id, namespace=req.namespace)
+        status_url = f"/ingest/jobs/{job_id}"
+        accepted = IngestJobAccepted(job_id=job_id, status_url=status_url, deduplicated=deduplicated)
+        return JSONResponse(status_code=202, content=accepted.model_dump(), headers={"Location": status_url})
+    async with admitted("ingest", req.namespace):
+        result = await aingest_document(req.markdown, document_id=req.document_id, namespace=req.namespace)
+    document_id = req.document_id or result.chunk_ids[0].split("-chunk-")[0]
+    return IngestResponse(
+        chunk_ids=result.chunk_ids,
+        count=result.chunk_count,
+        document_id=document_id,
+        skipped_chunk_ids=result.skipped_chunk_ids,
+        reused_chunk_ids=result.reused_chunk_ids,
+        deleted_chunk_ids=result.deleted_chunk_ids,
+        timings=result.timings,
+    )
+
+
+@app.get("/ingest/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    job = ingest_job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}.")
+    return job
+
+
+@app.get("/ingest/jobs")
+def get_ingest_job_stats():
+    return ingest_job_stats()
+
+
+@app.post("/ingest/bulk", response_model=BulkIngestResponse)
+async def ingest_bulk(request: Request, namespace: str | None = None, concurrency: int | None = None):
+    # Accepts a JSON BulkIngestRequest, or NDJSON (one IngestRequest per line) with namespace/concurrency as query params.
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            documents = [IngestRequest(**document) for document in parse_ndjson(body.decode("utf-8").splitlines())]
+            bulk = BulkIngestRequest(documents=documents, namespace=namespace, concurrency=concurrency)
+        else:
+            bulk = BulkIngestRequest.model_validate_json(body)
+    except (ValueError, ValidationError) as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if not bulk.documents:
+        raise HTTPException(status_code=400, detail="At least one document is required.")
+    if bulk.concurrency is not None and bulk.concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1.")
+
+    # One slot, but each namespace's ingest bucket is charged a token per document headed for it.
+    costs = Counter(document.namespace or bulk.namespace for document in bulk.documents)
+    async with admitted("ingest", costs=costs):
+        result = await aingest_documents(
+            [document.model_dump() for document in bulk.documents], namespace=bulk.namespace, concurrency=bulk.concurrency
+        )
+    return BulkIngestResponse(document_ids=result.document_ids, **result.summary())
 
 
 @app.post("/query", response_model=QueryResponse)
-def query(req: QueryRequest):
+async def query(req: QueryRequest):
     if not req.question.strip():
         raise HTTPException(status_code=400, detail="Question is required.")
-    result = answer_question(req.question, top_k=req.top_k, namespace=req.namespace)
-    return QueryResponse(answer=result["answer"], context=result["context"], sources=result["matches"])
+    async with admitted("query", req.namespace):
+        result = await aanswer_question(req.question, top_k=req.top_k, namespace=req.namespace)
+    return QueryResponse(
+        answer=result["answer"],
+        context=result["context"],
+        sources=result["matches"],
+        context_stats=result.get("context_stats", {}),
+        timings=result.get("timings") if req.timings else None,
+    )
+
+
+@app.post("/query/batch", response_model=QueryBatchResponse)
+async def query_batch(req: QueryBatchRequest):
+    # Results come back in request order; a failed item carries "error" instead of failing the batch.
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required.")
+    if len(req.queries) > QUERY_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_BATCH_MAX_ITEMS} queries per batch.")
+    if req.concurrency is not None and req.concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1.")
+    # One slot, but each namespace's query bucket is charged a token per query in it.
+    costs = Counter(query.namespace for query in req.queries)
+    async with admitted("query", costs=costs):
+        results, merged = await aanswer_questions([query.model_dump() for query in req.queries], concurrency=req.concurrency)
+    items = [
+        QueryBatchItem(error=result["error"])
+        if "error" in result
+        else QueryBatchItem(
+            answer=result["answer"],
+            context=result["context"],
+            sources=result["matches"],
+            context_stats=result.get("context_stats", {}),
+        )
+        for result in results
+    ]
+    return QueryBatchResponse(results=items, merged=merged)
+
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest):
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="Question is required.")
+    # Admitted before the response starts, so a rejection is still a 429; the slot is held until the stream ends.
+    ticket = await admission.acquire("query", req.namespace) if admission is not None else None
+
+    async def event_stream():
+        try:
+            async for event, payload in astream_answer(req.question, top_k=req.top_k, namespace=req.namespace):
+                yield f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+        except Exception as exc:
+            # Headers are already sent, so failures have to be reported in-band.
+            logging.exception("Streaming answer failed for question '%s'", req.question)
+            yield f"event: error\ndata: {json.dumps({'detail': str(exc)})}\n\n"
+        finally:
+            if ticket is not None:
+                ticket.release()
 
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also releases the slot if the stream never started; release() is idempotent.
+        background=BackgroundTask(ticket.release) if ticket is not None else None,
+    )
@@ -1,33 +1,351 @@
+import asyncio
+import contextvars
+import copy
+import hashlib
 import logging
-import math
 import os
 import re
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from huggingface_hub import InferenceClient
-from pinecone import Pinecone
+import numpy as np
+
+from admission import AdmissionController, ClassLimits
+from bm25_index import LexicalIndex
+from cache import AnswerCache, EmbeddingCache, LRUTTLStore, normalize_query_text
+from chunker import Chunk, HierarchicalChunker, estimate_tokens
+from content_store import ContentStore
+from context_builder import ContextBuilder, chunk_header
+from http_pool import (
+    PoolConfig,
+    PoolStats,
+    configure_hf_sessions,
+    hub_httpx_module,
+    pinecone_pool_manager,
+    timeout_for,
+    urllib3_pool_stats,
+)
+from ingest_jobs import IngestJobQueue, IngestJobStore
+from ingest_manifest import IngestManifest
+from metrics import REGISTRY, MetricFamily, collect_timings, record, rounded, span
+from reranker import CrossEncoderScorer, LexicalScorer, Reranker
+from resilience import HedgePolicy, Resilience, RetryPolicy, model_chain
+from singleflight import AsyncSingleFlight, SingleFlight
+from ingest_pipeline import BulkIngestResult, ChunkRecord, IngestResult, StagedIngestPipeline
+from vector_store import LocalVectorStore, PineconeVectorStore, VectorStore
+
+if TYPE_CHECKING:
+    from huggingface_hub import AsyncInferenceClient, InferenceClient
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
 
 HF_TOKEN = os.environ.get("HF_TOKEN")
-if not HF_TOKEN:
-    raise ValueError("HF_TOKEN environment variable is required")
 EMBED_MODEL = os.environ.get("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
 GEN_MODEL = os.environ.get("GEN_MODEL", "meta-llama/Llama-3.2-3B-Instruct:novita")
+GEN_FALLBACK_MODEL = os.environ.get("GEN_FALLBACK_MODEL", "")
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX", "greenleaf-rag")
 PINECONE_INDEX_HOST = os.environ.get("PINECONE_INDEX_HOST")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", "4"))
+QUERY_EMBED_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "1024"))
+QUERY_EMBED_CACHE_TTL = float(os.environ.get("QUERY_EMBED_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", ".local_index")
+LOCAL_ANN_MIN_VECTORS = int(os.environ.get("LOCAL_ANN_MIN_VECTORS", "50000"))
+LOCAL_ANN_NPROBE = int(os.environ.get("LOCAL_ANN_NPROBE", "8"))
+LOCAL_ANN_NLIST = int(os.environ.get("LOCAL_ANN_NLIST", "0"))
+INDEX_MAX_WORKERS = int(os.environ.get("INDEX_MAX_WORKERS", "64"))
+CHUNK_STRATEGY = os.environ.get("CHUNK_STRATEGY", "hierarchical").lower()
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "50"))
+GEN_MAX_TOKENS = int(os.environ.get("GEN_MAX_TOKENS", "512"))
+CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", "1500"))
+CONTEXT_DEDUP_THRESHOLD = float(os.environ.get("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTENT_STORE_PATH = os.environ.get("CONTENT_STORE_PATH", "")
+CONTENT_CACHE_SIZE = int(os.environ.get("CONTENT_CACHE_SIZE", "4096"))
+RERANKER = os.environ.get("RERANKER", "off").lower()
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", "4"))
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "8"))
+RERANK_BUDGET_MS = float(os.environ.get("RERANK_BUDGET_MS", "150"))
+QUERY_BATCH_MAX_ITEMS = int(os.environ.get("QUERY_BATCH_MAX_ITEMS", "64"))
+QUERY_BATCH_CONCURRENCY = int(os.environ.get("QUERY_BATCH_CONCURRENCY", "4"))
+HYBRID_SEARCH = os.environ.get("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "4"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+SINGLE_FLIGHT = os.environ.get("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+LEXICAL_INDEX_PATH = os.environ.get("LEXICAL_INDEX_PATH", ".lexical_index")
+UPSERT_BATCH_SIZE = int(os.environ.get("UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_BYTES = int(os.environ.get("UPSERT_MAX_BYTES", "2000000"))
+INGEST_MAX_PENDING = int(os.environ.get("INGEST_MAX_PENDING", "8"))
+INGEST_MAX_RETRIES = int(os.environ.get("INGEST_MAX_RETRIES", "3"))
+INGEST_MANIFEST_DIR = os.environ.get("INGEST_MANIFEST_DIR", ".ingest_manifests")
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_HTTP2 = os.environ.get("HTTP_HTTP2", "false").lower() in ("1", "true", "yes")
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "60"))
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", "10"))
+PINECONE_POOL_MAXSIZE = int(os.environ.get("PINECONE_POOL_MAXSIZE", "0"))
+PINECONE_CONNECT_TIMEOUT = float(os.environ.get("PINECONE_CONNECT_TIMEOUT", "5"))
+PINECONE_READ_TIMEOUT = float(os.environ.get("PINECONE_READ_TIMEOUT", "30"))
+INFERENCE_MAX_ATTEMPTS = int(os.environ.get("INFERENCE_MAX_ATTEMPTS", "3"))
+INFERENCE_BACKOFF_BASE = float(os.environ.get("INFERENCE_BACKOFF_BASE", "0.2"))
+INFERENCE_BACKOFF_MAX = float(os.environ.get("INFERENCE_BACKOFF_MAX", "2"))
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.environ.get("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY_MS = float(os.environ.get("HEDGE_MIN_DELAY_MS", "50"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "256"))
+QUERY_MAX_CONCURRENCY = int(os.environ.get("QUERY_MAX_CONCURRENCY", "256"))
+QUERY_MAX_QUEUE = int(os.environ.get("QUERY_MAX_QUEUE", "256"))
+QUERY_MAX_WAIT_MS = float(os.environ.get("QUERY_MAX_WAIT_MS", "2000"))
+QUERY_RATE_PER_NAMESPACE = float(os.environ.get("QUERY_RATE_PER_NAMESPACE", "0"))
+QUERY_BURST_PER_NAMESPACE = float(os.environ.get("QUERY_BURST_PER_NAMESPACE", "100"))
+INGEST_MAX_CONCURRENCY = int(os.environ.get("INGEST_MAX_CONCURRENCY", "2"))
+INGEST_MAX_QUEUE = int(os.environ.get("INGEST_MAX_QUEUE", "16"))
+INGEST_MAX_WAIT_MS = float(os.environ.get("INGEST_MAX_WAIT_MS", "30000"))
+INGEST_RATE_PER_NAMESPACE = float(os.environ.get("INGEST_RATE_PER_NAMESPACE", "0"))
+INGEST_BURST_PER_NAMESPACE = float(os.environ.get("INGEST_BURST_PER_NAMESPACE", "200"))
+INGEST_JOBS_PATH = os.environ.get("INGEST_JOBS_PATH", ".ingest_jobs/jobs.sqlite3")
+INGEST_JOB_WORKERS = int(os.environ.get("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_RETENTION_HOURS = float(os.environ.get("INGEST_JOB_RETENTION_HOURS", "24"))
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+STARTUP_PROBE_TEXT = os.environ.get("STARTUP_PROBE_TEXT", "")
+
+if VECTOR_BACKEND not in ("pinecone", "local"):
+    raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'; expected 'pinecone' or 'local'.")
+
+# Clients are built on first use by the get_* accessors below, so importing this module needs no
+# credentials or network. Assigning one of these (e.g. a stub in benchmarks) takes precedence.
+hf_client: Optional["InferenceClient"] = None
+async_hf_client: Optional["AsyncInferenceClient"] = None
+vector_store: Optional[VectorStore] = None
+_client_lock = threading.Lock()
+
+# Shared by every Hugging Face call: connection limits, keep-alive and per-call timeouts.
+http_pool_config = PoolConfig(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    http2=HTTP_HTTP2,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+    pool_timeout=HTTP_POOL_TIMEOUT,
+)
+# Retries, hedging and a circuit breaker per model around every embedding and generation call.
+inference = Resilience(
+    retry=RetryPolicy(
+        max_attempts=INFERENCE_MAX_ATTEMPTS, backoff_base=INFERENCE_BACKOFF_BASE, backoff_max=INFERENCE_BACKOFF_MAX
+    ),
+    hedge=HedgePolicy(enabled=HEDGE_REQUESTS, quantile=HEDGE_QUANTILE, min_delay=HEDGE_MIN_DELAY_MS / 1000),
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=CIRCUIT_RESET_SECONDS,
+)
+# Embeddings have no fallback: vectors from another model would not match the index.
+EMBED_MODELS = model_chain(EMBED_MODEL)
+GEN_MODELS = model_chain(GEN_MODEL, GEN_FALLBACK_MODEL)
+# Filled once the Hugging Face sessions are configured and the Pinecone index is opened.
+hf_pool_stats: Dict[str, PoolStats] = {}
+_pinecone_pool_manager = None
+
+
+def _require_hf_token() -> str:
+    if not HF_TOKEN:
+        raise ValueError("HF_TOKEN environment variable is required")
+    return HF_TOKEN
+
+
+def _hf_timeout():
+    # Called with _client_lock held, by whichever Hugging Face client is created first.
+    if not hf_pool_stats:
+        hf_pool_stats.update(configure_hf_sessions(http_pool_config))
+    return timeout_for(hub_httpx_module(), http_pool_config)
+
+
+def _create_hf_client() -> "InferenceClient":
+    from huggingface_hub import InferenceClient
+
+    token = _require_hf_token()
+    return InferenceClient(token=token, timeout=_hf_timeout())
+
+
+def _create_async_hf_client() -> "AsyncInferenceClient":
+    from huggingface_hub import AsyncInferenceClient
+
+    token = _require_hf_token()
+    return AsyncInferenceClient(token=token, timeout=_hf_timeout())
+
+
+def _create_vector_store() -> VectorStore:
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore(
+            path=LOCAL_INDEX_PATH or None,
+            ann_min_vectors=LOCAL_ANN_MIN_VECTORS,
+            nprobe=LOCAL_ANN_NPROBE,
+            nlist=LOCAL_ANN_NLIST or None,
+        )
+    if not PINECONE_API_KEY:
+        raise RuntimeError("PINECONE_API_KEY is not set.")
+
+    if not PINECONE_INDEX_HOST:
+        raise RuntimeError("PINECONE_INDEX_HOST is not set. Provide the index host from Pinecone console.")
+
+    from pinecone import Pinecone
+
+    global _pinecone_pool_manager
+    pinecone = Pinecone(api_key=PINECONE_API_KEY)
+    # urllib3 keeps 4 connections per host by default; with more index threads than that, extra
+    # connections are opened and thrown away after each call, each costing a TLS handshake.
+    pinecone.openapi_config.connection_pool_maxsize = PINECONE_POOL_MAXSIZE or INDEX_MAX_WORKERS
+    index = pinecone.Index(name=PINECONE_INDEX_NAME, host=PINECONE_INDEX_HOST)
+    _pinecone_pool_manager = pinecone_pool_manager(index)
+    return PineconeVectorStore(index, request_timeout=(PINECONE_CONNECT_TIMEOUT, PINECONE_READ_TIMEOUT))
+
+
+def _get_or_create(name: str, factory: Callable):
+    client = globals()[name]
+    if client is None:
+        with _client_lock:
+            client = globals()[name]
+            if client is None:
+                client = globals()[name] = factory()
+    return client
+
+
+def get_hf_client() -> "InferenceClient":
+    return _get_or_create("hf_client", _create_hf_client)
+
+
+def get_async_hf_client() -> "AsyncInferenceClient":
+    return _get_or_create("async_hf_client", _create_async_hf_client)
+
+
+def get_vector_store() -> VectorStore:
+    return _get_or_create("vector_store", _create_vector_store)
+
+
+# Neither pinecone-client 5.x nor the local store has an asyncio API, so the async path runs index calls on this pool.
+index_executor = ThreadPoolExecutor(max_workers=INDEX_MAX_WORKERS, thread_name_prefix="vector-index")
+
+# Set QUERY_EMBED_CACHE_SIZE=0 to disable, or assign an EmbeddingCache over another CacheStore backend.
+query_embedding_cache: Optional[EmbeddingCache] = (
+    EmbeddingCache(LRUTTLStore(max_size=QUERY_EMBED_CACHE_SIZE, ttl=QUERY_EMBED_CACHE_TTL or None))
+    if QUERY_EMBED_CACHE_SIZE > 0
+    else None
+)
+answer_cache: Optional[AnswerCache] = (
+    AnswerCache(max_size=ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL or None)
+    if ANSWER_CACHE_SIZE > 0
+    else None
+)
 
-if not PINECONE_API_KEY:
-    raise RuntimeError("PINECONE_API_KEY is not set.")
+# Re-ingesting a document_id only embeds chunks whose content hash changed; set INGEST_MANIFEST_DIR="" to disable.
+ingest_manifest: Optional[IngestManifest] = IngestManifest(INGEST_MANIFEST_DIR) if INGEST_MANIFEST_DIR else None
 
-if not PINECONE_INDEX_HOST:
-    raise RuntimeError("PINECONE_INDEX_HOST is not set. Provide the index host from Pinecone console.")
+if CHUNK_STRATEGY not in ("hierarchical", "h1"):
+    raise ValueError(f"Unknown CHUNK_STRATEGY {CHUNK_STRATEGY!r}; expected 'hierarchical' or 'h1'.")
+# bge-small truncates at 512 tokens, so the default budget leaves room for error in the token estimate.
+markdown_chunker = HierarchicalChunker(max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
 
-hf_client = InferenceClient(token=HF_TOKEN)
-pinecone = Pinecone(api_key=PINECONE_API_KEY)
-pinecone_index = pinecone.Index(name=PINECONE_INDEX_NAME, host=PINECONE_INDEX_HOST)
+# Prompt size drives generation latency, so retrieved chunks are packed into CONTEXT_MAX_TOKENS (0 disables).
+context_builder: Optional[ContextBuilder] = (
+    ContextBuilder(max_tokens=CONTEXT_MAX_TOKENS, dedup_threshold=CONTEXT_DEDUP_THRESHOLD) if CONTEXT_MAX_TOKENS > 0 else None
+)
+
+# Like the clients, these side stores are opened on first use by get_content_store() and
+# get_lexical_index(), so importing this module creates no files and loads no indexes.
+# With CONTENT_STORE_PATH set, chunk text lives in the content store instead of in vector metadata.
+content_store: Optional[ContentStore] = None
+# BM25 over chunk content, fused with dense results in query_chunks; filled as chunks are upserted. HYBRID_SEARCH=false disables it.
+lexical_index: Optional[LexicalIndex] = None
+
+
+def _create_content_store() -> ContentStore:
+    return ContentStore(CONTENT_STORE_PATH, cache_size=CONTENT_CACHE_SIZE)
+
+
+def _create_lexical_index() -> LexicalIndex:
+    # Loads every namespace persisted under LEXICAL_INDEX_PATH.
+    return LexicalIndex(LEXICAL_INDEX_PATH or None)
+
+
+def get_content_store() -> Optional[ContentStore]:
+    if not CONTENT_STORE_PATH:
+        return None
+    return _get_or_create("content_store", _create_content_store)
+
+
+def get_lexical_index() -> Optional[LexicalIndex]:
+    if not HYBRID_SEARCH:
+        return None
+    return _get_or_create("lexical_index", _create_lexical_index)
+
+
+# Optional second stage: query_chunks over-fetches top_k * RERANK_CANDIDATES and keeps the best top_k by this scorer.
+reranker: Optional[Reranker] = None
+if RERANKER in ("lexical", "cross-encoder"):
+    scorer = LexicalScorer() if RERANKER == "lexical" else CrossEncoderScorer(RERANK_MODEL)
+    reranker = Reranker(scorer, batch_size=RERANK_BATCH_SIZE, budget=RERANK_BUDGET_MS / 1000 if RERANK_BUDGET_MS > 0 else None)
+elif RERANKER not in ("off", "none", ""):
+    raise ValueError(f"Unknown RERANKER {RERANKER!r}; expected 'off', 'lexical' or 'cross-encoder'.")
+
+# Concurrent identical questions (normalized text, top_k, namespace) share one in-flight answer; SINGLE_FLIGHT=false disables.
+answer_flight: Optional[SingleFlight] = SingleFlight() if SINGLE_FLIGHT else None
+async_answer_flight: Optional[AsyncSingleFlight] = AsyncSingleFlight() if SINGLE_FLIGHT else None
+
+# Stage latencies go to metrics.STAGE_SECONDS through span(); these count work done. All are served at GET /metrics.
+REQUESTS = REGISTRY.counter("rag_requests_total", "Pipeline calls by operation.", ("operation",))
+TOKENS = REGISTRY.counter(
+    "rag_tokens_total", "Estimated context tokens sent to the model, and prompt/completion tokens reported by it.", ("kind",)
+)
+CHUNKS = REGISTRY.counter(
+    "rag_chunks_total",
+    "Chunks retrieved for questions or missing from the content store, and embedded, reused, skipped or deleted by ingests.",
+    ("kind",),
+)
+ADMISSION_WAIT = REGISTRY.histogram("rag_admission_wait_seconds", "Time requests waited for an admission slot.", ("class",))
+
+# Admission control for the API: queries are scheduled ahead of ingests on shared slots, each class
+# has its own concurrency cap and queue, and each namespace has a token bucket per class.
+admission: Optional[AdmissionController] = (
+    AdmissionController(
+        [
+            ClassLimits(
+                "query",
+                max_concurrency=QUERY_MAX_CONCURRENCY,
+                max_queue=QUERY_MAX_QUEUE,
+                max_wait=QUERY_MAX_WAIT_MS / 1000,
+                rate=QUERY_RATE_PER_NAMESPACE,
+                burst=QUERY_BURST_PER_NAMESPACE,
+            ),
+            ClassLimits(
+                "ingest",
+                max_concurrency=INGEST_MAX_CONCURRENCY,
+                max_queue=INGEST_MAX_QUEUE,
+                max_wait=INGEST_MAX_WAIT_MS / 1000,
+                rate=INGEST_RATE_PER_NAMESPACE,
+                burst=INGEST_BURST_PER_NAMESPACE,
+            ),
+        ],
+        max_concurrency=ADMISSION_MAX_CONCURRENCY,
+        wait_histogram=ADMISSION_WAIT,
+    )
+    if ADMISSION_CONTROL
+    else None
+)
 
 # Using Hugging Face InferenceClient directly instead of OpenAI client to avoid httpx compatibility issues
 
@@ -55,79 +373,609 @@ def split_into_h1_chunks(text: str) -> List[Tuple[str, str]]:
     return chunks
 
 
-def embed_and_normalize(text: str) -> List[float]:
-    raw_result = hf_client.feature_extraction(text, model=EMBED_MODEL)
-    if hasattr(raw_result, "tolist"):
-        raw_result = raw_result.tolist()
-    embedding = raw_result[0] if len(raw_result) and isinstance(raw_result[0], list) else raw_result
-    l2_norm = math.sqrt(sum(value * value for value in embedding))
-    return [value / l2_norm for value in embedding] if l2_norm else embedding
+def chunk_markdown(text: str) -> List[Chunk]:
+    if CHUNK_STRATEGY == "h1":
+        return [
+            Chunk(chunk_text, (title,) if title else (), estimate_tokens(chunk_text))
+            for title, chunk_text in split_into_h1_chunks(text)
+        ]
+    return list(markdown_chunker.chunk(text))
 
 
-def ingest_markdown(markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> List[str]:
-    fragments = split_into_h1_chunks(markdown)
-    if not fragments:
-        raise ValueError("No content to ingest after chunking.")
+def l2_normalize(embeddings) -> np.ndarray:
+    # Works on a single vector or a 2-D batch; rows with a zero norm are returned unchanged.
+    array = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    return array / np.where(norms == 0, np.float32(1.0), norms)
 
-    base_doc_id = document_id or f"doc-{datetime.utcnow().isoformat()}"
-    total_chunks = len(fragments)
-    vectors = []
-    chunk_ids: List[str] = []
 
-    for idx, (title, chunk_text) in enumerate(fragments, start=1):
+def embed_and_normalize(text: str) -> np.ndarray:
+    with span("embed"):
+        raw_result = np.asarray(
+            inference.call(EMBED_MODELS, "embed", lambda model: get_hf_client().feature_extraction(text, model=model)),
+            dtype=np.float32,
+        )
+    embedding = raw_result[0] if raw_result.ndim == 2 else raw_result
+    return l2_normalize(embedding)
+
+
+def embed_batch(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+
+    batches: List[np.ndarray] = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        # The staged ingest pipeline retries whole batches itself, so this makes one attempt.
+        raw_result = np.asarray(
+            inference.call(
+                EMBED_MODELS,
+                "embed_batch",
+                lambda model: get_hf_client().feature_extraction(batch, model=model),
+                hedge=False,
+                retry=False,
+            ),
+            dtype=np.float32,
+        )
+        if raw_result.ndim != 2 or raw_result.shape[0] != len(batch):
+            raise RuntimeError(
+                f"Embedding batch returned shape {raw_result.shape} for {len(batch)} input(s)."
+            )
+        batches.append(raw_result)
+    if not batches:
+        return np.empty((0, 0), dtype=np.float32)
+    return l2_normalize(np.concatenate(batches) if len(batches) > 1 else batches[0])
+
+
+def embed_query(question: str) -> np.ndarray:
+    if query_embedding_cache is None:
+        return embed_and_normalize(question)
+    return query_embedding_cache.get_or_compute(EMBED_MODEL, question, embed_and_normalize)
+
+
+def content_hash(chunk_text: str) -> str:
+    return hashlib.sha256(f"{EMBED_MODEL}\0{chunk_text}".encode("utf-8")).hexdigest()
+
+
+def _chunk_records(chunks: List[Chunk], base_doc_id: str) -> List[ChunkRecord]:
+    # No per-document totals in chunk metadata: they would change on unchanged chunks whenever a
+    # section is added or removed, and cost one metadata update per chunk to keep current.
+    records: List[ChunkRecord] = []
+
+    for idx, chunk in enumerate(chunks, start=1):
         chunk_id = f"{base_doc_id}-chunk-{idx:03d}"
-        normalized_embedding = embed_and_normalize(chunk_text)
+        chunk_text = chunk.text
         metadata = {
-            "section_title": title or "untitled",
+            "section_title": chunk.heading_path[-1] if chunk.heading_path else "untitled",
+            "heading_path": list(chunk.heading_path),
+            "token_count": chunk.token_count,
             "chunk_index": idx,
-            "chunk_count": total_chunks,
             "document_id": base_doc_id,
             "created_at": datetime.utcnow().isoformat(),
             "content": chunk_text,
+            "content_hash": content_hash(chunk_text),
         }
-        vectors.append({"id": chunk_id, "values": normalized_embedding, "metadata": metadata})
-        chunk_ids.append(chunk_id)
+        records.append((chunk_id, chunk_text, metadata))
+    return records
 
-    pinecone_index.upsert(vectors=vectors, namespace=namespace)
-    logging.info("Upserted %d chunk(s) into Pinecone (namespace=%s)", len(vectors), namespace or "default")
-    return chunk_ids
 
+def _plan_reingest(
+    records: List[ChunkRecord], base_doc_id: str, namespace: Optional[str], tracked: bool
+) -> Tuple[List[ChunkRecord], List[ChunkRecord], List[str], Dict[str, Dict]]:
+    # Returns (changed, unchanged, stale chunk ids, previous manifest entries).
+    previous = ingest_manifest.load(namespace, base_doc_id) if tracked and ingest_manifest is not None else {}
+    changed: List[ChunkRecord] = []
+    unchanged: List[ChunkRecord] = []
+    for chunk_record in records:
+        chunk_id, _, metadata = chunk_record
+        entry = previous.get(chunk_id)
+        if entry is not None and entry.get("hash") == metadata["content_hash"]:
+            metadata["created_at"] = entry.get("created_at", metadata["created_at"])
+            unchanged.append(chunk_record)
+        else:
+            changed.append(chunk_record)
+    if unchanged:
+        # The manifest says what was upserted, not what the store still holds (a wiped index, another
+        # VECTOR_BACKEND), so chunks it lists but the store lacks are upserted again.
+        present = _stored_ids([chunk_id for chunk_id, _, _ in unchanged], namespace)
+        if len(present) < len(unchanged):
+            logging.warning(
+                "%d unchanged chunk(s) of %s are missing from the vector store (namespace=%s); upserting them again",
+                len(unchanged) - len(present),
+                base_doc_id,
+                namespace or "default",
+            )
+            # Kept in document order, as if the manifest had never listed them.
+            kept = {chunk_id for chunk_id, _, _ in unchanged if chunk_id in present}
+            changed = [chunk_record for chunk_record in records if chunk_record[0] not in kept]
+            unchanged = [chunk_record for chunk_record in unchanged if chunk_record[0] in kept]
+    current_ids = {chunk_id for chunk_id, _, _ in records}
+    stale_ids = [chunk_id for chunk_id in previous if chunk_id not in current_ids]
+    return changed, unchanged, stale_ids, previous
 
-def query_chunks(question: str, top_k: int = 5, namespace: Optional[str] = None) -> List[Dict]:
-    query_embedding = embed_and_normalize(question)
-    results = pinecone_index.query(
-        namespace=namespace,
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True,
+
+def _stored_ids(ids: List[str], namespace: Optional[str]) -> Set[str]:
+    # Fetched in batches to keep each Pinecone request (ids go in the query string) small.
+    store = get_vector_store()
+    present: Set[str] = set()
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        present.update(store.fetch(ids[start:start + UPSERT_BATCH_SIZE], namespace=namespace))
+    return present
+
+
+def _reuse_embeddings(
+    changed: List[ChunkRecord], previous: Dict[str, Dict], namespace: Optional[str]
+) -> Tuple[List[ChunkRecord], List[str]]:
+    # Returns (records still to embed, ids upserted with a reused vector). Chunk ids are positional,
+    # so a section inserted early shifts every later chunk to a new id with unchanged text; those
+    # vectors are copied from the id that held the same content hash instead of being embedded again.
+    source_by_hash = {entry.get("hash"): chunk_id for chunk_id, entry in previous.items()}
+    sources = {
+        chunk_id: source_by_hash[metadata["content_hash"]]
+        for chunk_id, _, metadata in changed
+        if metadata["content_hash"] in source_by_hash
+    }
+    if not sources:
+        return changed, []
+    started = time.perf_counter()
+    try:
+        # Fetched before any upsert, since a source id may itself be overwritten by this ingest.
+        values = get_vector_store().fetch_vectors(sorted(set(sources.values())), namespace=namespace)
+        to_embed: List[ChunkRecord] = []
+        vectors: List[Dict] = []
+        for chunk_record in changed:
+            chunk_id, _, metadata = chunk_record
+            source = sources.get(chunk_id)
+            if source in values:
+                metadata["created_at"] = previous[source].get("created_at", metadata["created_at"])
+                vectors.append({"id": chunk_id, "values": values[source], "metadata": metadata})
+            else:
+                to_embed.append(chunk_record)
+        for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+            _upsert_batch(vectors[start:start + UPSERT_BATCH_SIZE], namespace)
+    except Exception as exc:
+        logging.warning("Reusing stored vectors failed (%s); embedding all %d changed chunk(s)", exc, len(changed))
+        return changed, []
+    record("ingest_reuse", time.perf_counter() - started)
+    return to_embed, [vector["id"] for vector in vectors]
+
+
+def _finish_reingest(
+    records: List[ChunkRecord],
+    unchanged: List[ChunkRecord],
+    stale_ids: List[str],
+    base_doc_id: str,
+    namespace: Optional[str],
+    tracked: bool,
+    failed_ids: Iterable[str] = (),
+) -> None:
+    lexical_index, content_store = get_lexical_index(), get_content_store()
+    if stale_ids:
+        get_vector_store().delete(stale_ids, namespace=namespace)
+        if lexical_index is not None:
+            lexical_index.delete(namespace, stale_ids)
+        if content_store is not None:
+            content_store.delete(namespace, stale_ids)
+        logging.info("Deleted %d stale chunk(s) of %s (namespace=%s)", len(stale_ids), base_doc_id, namespace or "default")
+    if lexical_index is not None:
+        # Unchanged chunks skip the upsert, so backfill any the lexical index has not seen (e.g. ingested before it existed).
+        lexical_index.add(
+            namespace,
+            [(chunk_id, text) for chunk_id, text, _ in unchanged if not lexical_index.contains(namespace, chunk_id)],
+        )
+    if content_store is not None and unchanged:
+        # Chunks ingested while text was still kept in metadata are copied into the content store.
+        stored = content_store.get_many(namespace, [chunk_id for chunk_id, _, _ in unchanged])
+        content_store.put_many(namespace, [(chunk_id, text) for chunk_id, text, _ in unchanged if chunk_id not in stored])
+    if not tracked or ingest_manifest is None:
+        return
+    failed = set(failed_ids)
+    # Failed chunks are left out so the next ingest retries them.
+    ingest_manifest.save(
+        namespace,
+        base_doc_id,
+        {
+            chunk_id: {"hash": metadata["content_hash"], "created_at": metadata["created_at"]}
+            for chunk_id, _, metadata in records
+            if chunk_id not in failed
+        },
+    )
+
+
+def _upsert_batch(vectors: List[Dict], namespace: Optional[str]) -> None:
+    texts = [(vector["id"], vector["metadata"].get("content", "")) for vector in vectors]
+    content_store = get_content_store()
+    if content_store is not None:
+        # Text is stored first so a query never finds a vector whose content cannot be resolved.
+        content_store.put_many(namespace, texts)
+        vectors = [
+            {**vector, "metadata": {key: value for key, value in vector["metadata"].items() if key != "content"}}
+            for vector in vectors
+        ]
+    get_vector_store().upsert(vectors, namespace=namespace)
+    lexical_index = get_lexical_index()
+    if lexical_index is not None:
+        lexical_index.add(namespace, texts)
+    logging.info("Upserted %d chunk(s) into %s (namespace=%s)", len(vectors), VECTOR_BACKEND, namespace or "default")
+
+
+staged_ingest = StagedIngestPipeline(
+    embed_fn=embed_batch,
+    upsert_fn=_upsert_batch,
+    embed_batch_size=EMBED_BATCH_SIZE,
+    embed_workers=EMBED_CONCURRENCY,
+    upsert_batch_size=UPSERT_BATCH_SIZE,
+    upsert_max_bytes=UPSERT_MAX_BYTES,
+    max_pending=INGEST_MAX_PENDING,
+    max_retries=INGEST_MAX_RETRIES,
+)
+
+
+def _after_ingest(namespace: Optional[str], changed: bool) -> None:
+    # One write of each side store per ingest, not per upsert batch or metadata update.
+    get_vector_store().flush(namespace)
+    if answer_cache is not None and changed:
+        answer_cache.invalidate_namespace(namespace)
+    lexical_index = get_lexical_index()
+    if lexical_index is not None:
+        lexical_index.save(namespace)
+
+
+def ingest_document(
+    markdown: str,
+    document_id: Optional[str] = None,
+    namespace: Optional[str] = None,
+    on_planned: Optional[Callable[[int, int], None]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> IngestResult:
+    # on_planned(chunks to embed, unchanged chunks) is called once chunking is done; on_progress as in StagedIngestPipeline.run.
+    REQUESTS.inc("ingest")
+    chunk_started = time.perf_counter()
+    fragments = chunk_markdown(markdown)
+    if not fragments:
+        raise ValueError("No content to ingest after chunking.")
+
+    base_doc_id = document_id or f"doc-{datetime.utcnow().isoformat()}"
+    records = _chunk_records(fragments, base_doc_id)
+    tracked = document_id is not None
+    changed, unchanged, stale_ids, previous = _plan_reingest(records, base_doc_id, namespace, tracked)
+    chunk_seconds = time.perf_counter() - chunk_started
+    try:
+        to_embed, reused_ids = _reuse_embeddings(changed, previous, namespace)
+        if on_planned is not None:
+            on_planned(len(to_embed), len(unchanged) + len(reused_ids))
+        result = staged_ingest.run(to_embed, namespace=namespace, on_progress=on_progress)
+        _finish_reingest(records, unchanged, stale_ids, base_doc_id, namespace, tracked)
+    finally:
+        # Even a partially failed ingest may have changed the namespace.
+        _after_ingest(namespace, bool(changed or stale_ids))
+    result.chunk_ids = [chunk_id for chunk_id, _, _ in records]
+    result.skipped_chunk_ids = [chunk_id for chunk_id, _, _ in unchanged]
+    result.deleted_chunk_ids = stale_ids
+    result.reused_chunk_ids = reused_ids
+    result.timings["chunk"] = round(chunk_seconds, 4)
+    _record_ingest(result.timings, len(to_embed), len(reused_ids), len(unchanged), len(stale_ids))
+    logging.info(
+        "Ingested %d chunk(s) for %s (%d unchanged, %d reused, %d deleted) in %d embed / %d upsert batch(es): %s",
+        result.chunk_count,
+        base_doc_id,
+        len(unchanged),
+        len(reused_ids),
+        len(stale_ids),
+        result.embed_batches,
+        result.upsert_batches,
+        result.timings,
+    )
+    return result
+
+
+def _record_ingest(timings: Dict[str, float], embedded: int, reused: int, skipped: int, deleted: int) -> None:
+    for stage in ("chunk", "embed", "upsert"):
+        if stage in timings:
+            record(f"ingest_{stage}", timings[stage])
+    CHUNKS.inc("embedded", amount=embedded)
+    CHUNKS.inc("reused", amount=reused)
+    CHUNKS.inc("skipped", amount=skipped)
+    CHUNKS.inc("deleted", amount=deleted)
+
+
+def ingest_markdown(markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> List[str]:
+    return ingest_document(markdown, document_id=document_id, namespace=namespace).chunk_ids
+
+
+def _run_ingest_job(markdown: str, **kwargs) -> Dict:
+    result = ingest_document(markdown, **kwargs)
+    return {
+        "chunk_ids": result.chunk_ids,
+        "count": result.chunk_count,
+        "document_id": kwargs.get("document_id") or result.chunk_ids[0].split("-chunk-")[0],
+        "skipped": len(result.skipped_chunk_ids),
+        "reused": len(result.reused_chunk_ids),
+        "deleted": len(result.deleted_chunk_ids),
+        "retries": result.retries,
+        "timings": result.timings,
+    }
+
+
+# The event loop serving the API. Job workers are threads, so they take their ingest admission slot
+# through it; set by start_ingest_jobs() and submit_ingest_job().
+_serving_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+@contextmanager
+def _ingest_job_slot(namespace: Optional[str]) -> Iterator[None]:
+    # The namespace's token bucket was charged when the job was submitted; this only waits for a slot.
+    loop = _serving_loop
+    ticket = None
+    if admission is not None and loop is not None and not loop.is_closed():
+        try:
+            future = asyncio.run_coroutine_threadsafe(admission.acquire("ingest", namespace, background=True), loop)
+            while ticket is None:
+                try:
+                    ticket = future.result(timeout=1.0)
+                except FuturesTimeoutError:
+                    if loop.is_closed():
+                        future.cancel()
+                        break
+        except (RuntimeError, CancelledError):
+            # The loop shut down; nothing is left to share slots with.
+            ticket = None
+    try:
+        yield
+    finally:
+        if ticket is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(ticket.release)
+
+
+# POST /ingest?async=true queues the document here and returns a job id at once; job state is kept in
+# SQLite so queued and interrupted jobs resume after a restart. Opened on first use by get_ingest_jobs();
+# INGEST_JOBS_PATH="" disables it.
+ingest_jobs: Optional[IngestJobQueue] = None
+
+
+def _create_ingest_jobs() -> IngestJobQueue:
+    return IngestJobQueue(
+        IngestJobStore(INGEST_JOBS_PATH),
+        _run_ingest_job,
+        workers=INGEST_JOB_WORKERS,
+        retention=INGEST_JOB_RETENTION_HOURS * 3600,
+        slot=_ingest_job_slot,
     )
-    if not results.matches:
-        return []
-    formatted = []
-    for match in results.matches:
-        formatted.append(
+
+
+def get_ingest_jobs() -> Optional[IngestJobQueue]:
+    if not INGEST_JOBS_PATH:
+        return None
+    return _get_or_create("ingest_jobs", _create_ingest_jobs)
+
+
+def ingest_documents(
+    documents: Iterable[Dict],
+    namespace: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> BulkIngestResult:
+    # Each document is {"markdown": ..., "document_id"?: ..., "namespace"?: ...}; chunks from every
+    # document in a namespace share embedding batches and upserts.
+    REQUESTS.inc("ingest_bulk")
+    started = time.perf_counter()
+    result = BulkIngestResult()
+    records_by_namespace: Dict[Optional[str], List[ChunkRecord]] = {}
+    document_for_chunk: Dict[str, str] = {}
+    batch_stamp = datetime.utcnow().isoformat()
+    # namespace -> [(base_doc_id, records, unchanged, stale ids, tracked)]
+    plans: Dict[Optional[str], List[Tuple]] = {}
+    reused_by_namespace: Dict[Optional[str], int] = {}
+
+    for position, document in enumerate(documents, start=1):
+        base_doc_id = document.get("document_id") or f"doc-{batch_stamp}-{position:05d}"
+        fragments = chunk_markdown(document.get("markdown") or "")
+        if not fragments:
+            result.failures[base_doc_id] = "No content to ingest after chunking."
+            continue
+        target_namespace = document.get("namespace") or namespace
+        tracked = bool(document.get("document_id"))
+        records = _chunk_records(fragments, base_doc_id)
+        changed, unchanged, stale_ids, previous = _plan_reingest(records, base_doc_id, target_namespace, tracked)
+        changed, reused_ids = _reuse_embeddings(changed, previous, target_namespace)
+        records_by_namespace.setdefault(target_namespace, []).extend(changed)
+        reused_by_namespace[target_namespace] = reused_by_namespace.get(target_namespace, 0) + len(reused_ids)
+        result.reused_chunks += len(reused_ids)
+        plans.setdefault(target_namespace, []).append((base_doc_id, records, unchanged, stale_ids, tracked))
+        document_for_chunk.update((chunk_id, base_doc_id) for chunk_id, _, _ in records)
+        result.document_ids.append(base_doc_id)
+        result.skipped_chunks += len(unchanged)
+    result.timings["chunk"] = round(time.perf_counter() - started, 4)
+
+    pipeline = staged_ingest
+    if concurrency:
+        pipeline = copy.copy(staged_ingest)
+        pipeline.embed_workers = concurrency
+
+    for target_namespace, namespace_plans in plans.items():
+        records = records_by_namespace[target_namespace]
+        try:
+            run = pipeline.run(records, namespace=target_namespace, fail_fast=False, on_progress=on_progress)
+            failed_ids = set(run.failed_chunk_ids)
+            for base_doc_id, doc_records, unchanged, stale_ids, tracked in namespace_plans:
+                try:
+                    _finish_reingest(doc_records, unchanged, stale_ids, base_doc_id, target_namespace, tracked, failed_ids)
+                    result.deleted_chunks += len(stale_ids)
+                except Exception as exc:
+                    logging.error("Finishing re-ingest of %s failed: %s", base_doc_id, exc)
+                    result.failures.setdefault(base_doc_id, f"Cleanup of unchanged or stale chunks failed: {exc}")
+        finally:
+            changed = records or reused_by_namespace[target_namespace] or any(plan[3] for plan in namespace_plans)
+            _after_ingest(target_namespace, bool(changed))
+        result.chunk_count += run.chunk_count - len(run.failed_chunk_ids) + reused_by_namespace[target_namespace]
+        for chunk_id in run.failed_chunk_ids:
+            result.failures.setdefault(document_for_chunk[chunk_id], "One or more chunks failed to embed or upsert.")
+        for stage in ("embed", "upsert"):
+            result.timings[stage] = round(result.timings.get(stage, 0.0) + run.timings[stage], 4)
+
+    result.seconds = time.perf_counter() - started
+    result.timings["total"] = round(result.seconds, 4)
+    embedded = result.chunk_count - result.reused_chunks
+    _record_ingest(result.timings, embedded, result.reused_chunks, result.skipped_chunks, result.deleted_chunks)
+    logging.info("Bulk ingest finished: %s", {key: value for key, value in result.summary().items() if key != "failures"})
+    return result
+
+
+def _search_index(query_embedding: np.ndarray, top_k: int, namespace: Optional[str]) -> List[Dict]:
+    with span("vector_query"):
+        return get_vector_store().query(query_embedding, top_k=top_k, namespace=namespace, include_metadata=True)
+
+
+def _search_lexical(namespace: Optional[str], question: str, top_k: int) -> List[Tuple[str, float]]:
+    with span("bm25"):
+        return get_lexical_index().search(namespace, question, top_k)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: Optional[int] = None) -> List[Tuple[str, float]]:
+    k = RRF_K if k is None else k
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _fuse_matches(
+    dense: List[Dict], sparse: List[Tuple[str, float]], top_k: int, namespace: Optional[str]
+) -> List[Dict]:
+    with span("fuse"):
+        return _fuse(dense, sparse, top_k, namespace)
+
+
+def _fuse(dense: List[Dict], sparse: List[Tuple[str, float]], top_k: int, namespace: Optional[str]) -> List[Dict]:
+    fused = reciprocal_rank_fusion([[match["id"] for match in dense], [doc_id for doc_id, _ in sparse]])[:top_k]
+    dense_by_id = {match["id"]: match for match in dense}
+    sparse_scores = dict(sparse)
+    missing = [doc_id for doc_id, _ in fused if doc_id not in dense_by_id]
+    fetched = get_vector_store().fetch(missing, namespace=namespace) if missing else {}
+
+    matches = []
+    for doc_id, score in fused:
+        if doc_id in dense_by_id:
+            metadata = dense_by_id[doc_id]["metadata"]
+            dense_score = dense_by_id[doc_id]["score"]
+        elif doc_id in fetched:
+            metadata = fetched[doc_id]
+            dense_score = None
+        else:
+            # Still in the lexical index but gone from the vector store.
+            continue
+        matches.append(
             {
-                "id": match.id,
-                "score": match.score,
-                "metadata": match.metadata or {},
+                "id": doc_id,
+                "score": score,
+                "metadata": metadata,
+                "dense_score": dense_score,
+                "bm25_score": sparse_scores.get(doc_id),
             }
         )
-    return formatted
+    return matches
+
+
+def _use_hybrid(namespace: Optional[str]) -> bool:
+    lexical_index = get_lexical_index()
+    return lexical_index is not None and lexical_index.has_documents(namespace)
+
+
+def _rerank(question: str, candidates: List[Dict], top_k: int, namespace: Optional[str]) -> List[Dict]:
+    with span("rerank"):
+        matches, info = reranker.rerank(question, candidates, resolve_contents(candidates, namespace), top_k)
+    logging.debug("Reranked %d candidate(s) for '%s': %s", len(candidates), question, info)
+    return matches
+
+
+def query_chunks(
+    question: str,
+    top_k: int = 5,
+    namespace: Optional[str] = None,
+    query_embedding: Optional[np.ndarray] = None,
+) -> List[Dict]:
+    if query_embedding is None:
+        query_embedding = embed_query(question)
+    if reranker is None:
+        matches = _retrieve(question, top_k, namespace, query_embedding)
+    else:
+        candidates = _retrieve(question, top_k * RERANK_CANDIDATES, namespace, query_embedding)
+        matches = _rerank(question, candidates, top_k, namespace)
+    CHUNKS.inc("retrieved", amount=len(matches))
+    return matches
 
 
-def format_context(matches: List[Dict]) -> str:
+def _retrieve(question: str, top_k: int, namespace: Optional[str], query_embedding: np.ndarray) -> List[Dict]:
+    if not _use_hybrid(namespace):
+        return _search_index(query_embedding, top_k, namespace)
+
+    candidates = top_k * HYBRID_CANDIDATES
+    # The dense query is network-bound, so BM25 scoring runs here while it is in flight.
+    dense_future = index_executor.submit(contextvars.copy_context().run, _search_index, query_embedding, candidates, namespace)
+    sparse = _search_lexical(namespace, question, candidates)
+    return _fuse_matches(dense_future.result(), sparse, top_k, namespace)
+
+
+def resolve_contents(matches: List[Dict], namespace: Optional[str] = None) -> List[str]:
+    # One content-store lookup for the whole result set; text still held in metadata (older ingests) wins.
+    content_store = get_content_store()
+    lookup = [match.get("id") for match in matches if "content" not in match.get("metadata", {})]
+    stored = content_store.get_many(namespace, lookup) if content_store is not None and lookup else {}
+    missing = [chunk_id for chunk_id in lookup if chunk_id not in stored]
+    if missing:
+        # E.g. a replica, or a fresh disk, that never ran the ingest: the text is gone, not empty.
+        CHUNKS.inc("content_missing", amount=len(missing))
+        logging.warning(
+            "No content for %d matched chunk(s) in namespace %s, e.g. %s; re-ingest to restore it",
+            len(missing),
+            namespace or "default",
+            missing[0],
+        )
+    return [match.get("metadata", {}).get("content") or stored.get(match.get("id"), "") for match in matches]
+
+
+def format_context(matches: List[Dict], contents: Optional[List[str]] = None, namespace: Optional[str] = None) -> str:
+    # contents, when given, replaces each match's text (e.g. trimmed by the context builder).
+    if contents is None:
+        contents = resolve_contents(matches, namespace)
     context_blocks = []
-    for idx, match in enumerate(matches, start=1):
-        metadata = match.get("metadata", {})
-        chunk_id = match.get("id")
-        content = metadata.get("content", "")
-        context_blocks.append(f"[Chunk {idx} | id={chunk_id}]\n{content}")
+    for idx, (match, content) in enumerate(zip(matches, contents), start=1):
+        context_blocks.append(f"{chunk_header(idx, match.get('id'))}\n{content}")
     return "\n\n".join(context_blocks)
 
 
-def answer_question(question: str, top_k: int = 5, namespace: Optional[str] = None) -> Dict:
-    matches = query_chunks(question, top_k=top_k, namespace=namespace)
-    context_text = format_context(matches)
+def build_context(question: str, matches: List[Dict], namespace: Optional[str] = None) -> Tuple[str, Dict]:
+    with span("context"):
+        context_text, stats = _build_context(question, matches, namespace)
+    TOKENS.inc("context", amount=stats["tokens_out"])
+    return context_text, stats
+
+
+def _build_context(question: str, matches: List[Dict], namespace: Optional[str]) -> Tuple[str, Dict]:
+    contents = resolve_contents(matches, namespace)
+    # Matches whose text could not be found would only give the model empty sources.
+    kept = [(match, content) for match, content in zip(matches, contents) if content]
+    matches, contents = [match for match, _ in kept], [content for _, content in kept]
+    if context_builder is None:
+        tokens = sum(estimate_tokens(content) for content in contents)
+        stats = {"chunks": len(matches), "used_chunks": len(matches), "tokens_in": tokens, "tokens_out": tokens, "tokens_saved": 0}
+        return format_context(matches, contents), stats
+    packed, stats = context_builder.pack(question, matches, contents)
+    if stats.tokens_saved:
+        logging.info(
+            "Packed context to %d of %d tokens (%d duplicate(s), %d trimmed, %d chunk(s) dropped)",
+            stats.tokens_out,
+            stats.tokens_in,
+            stats.duplicates,
+            stats.trimmed_chunks,
+            len(stats.dropped_ids),
+        )
+    return format_context([match for match, _ in packed], [content for _, content in packed]), stats.as_dict()
+
+
+def build_messages(question: str, context_text: str) -> List[Dict]:
     assistant_prompt = f"""Imagine you are a character in a medieval game and your name is Eldric Thorne. Your goal is to answer player questions about the game and its world. Use the provided context to answer user questions. If the context does not contain the answer, say you do not know. Your answers should be in first person.
 
 Context:
@@ -137,20 +985,509 @@ Question:
 {question}
 """
 
-    # Use Hugging Face Inference API directly for chat completion
-    messages = [
+    return [
         {"role": "system", "content": "Answer concisely using the supplied context."},
         {"role": "user", "content": assistant_prompt},
     ]
-    
-    response = hf_client.chat_completion(
-        messages=messages,
-        model=GEN_MODEL,
-        max_tokens=512,
-        temperature=0.7,
+
+
+def _cached_answer(
+    question: str,
+    namespace: Optional[str],
+    query_embedding: np.ndarray,
+    matches: List[Dict],
+    context_text: str,
+    context_stats: Dict,
+) -> Optional[Dict]:
+    if answer_cache is None:
+        return None
+    cached_answer = answer_cache.lookup(namespace, query_embedding, [match["id"] for match in matches])
+    if cached_answer is None:
+        return None
+    logging.info("Served cached answer for question '%s'", question)
+    return {"answer": cached_answer, "context": context_text, "matches": matches, "context_stats": context_stats}
+
+
+def _remember_answer(
+    namespace: Optional[str], query_embedding: np.ndarray, matches: List[Dict], answer: str, generation_seconds: float
+) -> None:
+    if answer_cache is not None:
+        answer_cache.store(namespace, query_embedding, [match["id"] for match in matches], answer, generation_seconds)
+
+
+def _flight_key(question: str, top_k: int, namespace: Optional[str]) -> Tuple[str, int, Optional[str]]:
+    return normalize_query_text(question), top_k, namespace
+
+
+def answer_question(question: str, top_k: int = 5, namespace: Optional[str] = None) -> Dict:
+    REQUESTS.inc("answer")
+    if answer_flight is None:
+        return _answer_question(question, top_k, namespace)
+    result, shared = answer_flight.do(
+        _flight_key(question, top_k, namespace), lambda: _answer_question(question, top_k, namespace)
     )
+    # Callers that joined another's computation get their own copy of the top-level dict.
+    return dict(result) if shared else result
+
+
+def _answer_question(question: str, top_k: int, namespace: Optional[str]) -> Dict:
+    # Coalesced callers get the timings of the computation they joined.
+    with collect_timings() as timings:
+        with span("answer"):
+            result = _answer(question, top_k, namespace)
+    return {**result, "timings": rounded(timings)}
+
+
+def _record_usage(response) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _answer(question: str, top_k: int, namespace: Optional[str]) -> Dict:
+    query_embedding = embed_query(question)
+    matches = query_chunks(question, top_k=top_k, namespace=namespace, query_embedding=query_embedding)
+    context_text, context_stats = build_context(question, matches, namespace)
+    cached = _cached_answer(question, namespace, query_embedding, matches, context_text, context_stats)
+    if cached is not None:
+        return cached
+
+    # Use Hugging Face Inference API directly for chat completion
+    messages = build_messages(question, context_text)
     
+    generation_started = time.perf_counter()
+    with span("generate"):
+        response = inference.call(
+            GEN_MODELS,
+            "generate",
+            lambda model: get_hf_client().chat_completion(
+                messages=messages, model=model, max_tokens=GEN_MAX_TOKENS, temperature=0.7
+            ),
+        )
+    _record_usage(response)
+
+    answer = response.choices[0].message.content
+    _remember_answer(namespace, query_embedding, matches, answer, time.perf_counter() - generation_started)
+    logging.info("Generated answer for question '%s'", question)
+    return {"answer": answer, "context": context_text, "matches": matches, "context_stats": context_stats}
+
+
+async def _run_in_index_executor(func, *args):
+    loop = asyncio.get_running_loop()
+    # copy_context carries the request's timings into the worker thread.
+    return await loop.run_in_executor(index_executor, contextvars.copy_context().run, func, *args)
+
+
+async def aembed_and_normalize(text: str) -> np.ndarray:
+    with span("embed"):
+        raw_result = np.asarray(
+            await inference.acall(EMBED_MODELS, "embed", lambda model: get_async_hf_client().feature_extraction(text, model=model)),
+            dtype=np.float32,
+        )
+    embedding = raw_result[0] if raw_result.ndim == 2 else raw_result
+    return l2_normalize(embedding)
+
+
+async def aembed_batch(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_one(batch: List[str]):
+        async with semaphore:
+            return await inference.acall(
+                EMBED_MODELS,
+                "embed_batch",
+                lambda model: get_async_hf_client().feature_extraction(batch, model=model),
+                hedge=False,
+            )
+
+    raw_results = await asyncio.gather(*(embed_one(batch) for batch in batches))
+    arrays: List[np.ndarray] = []
+    for batch, raw_result in zip(batches, raw_results):
+        raw_result = np.asarray(raw_result, dtype=np.float32)
+        if raw_result.ndim != 2 or raw_result.shape[0] != len(batch):
+            raise RuntimeError(
+                f"Embedding batch returned shape {raw_result.shape} for {len(batch)} input(s)."
+            )
+        arrays.append(raw_result)
+    if not arrays:
+        return np.empty((0, 0), dtype=np.float32)
+    return l2_normalize(np.concatenate(arrays) if len(arrays) > 1 else arrays[0])
+
+
+async def aembed_query(question: str) -> np.ndarray:
+    if query_embedding_cache is None:
+        return await aembed_and_normalize(question)
+    cached = query_embedding_cache.get(EMBED_MODEL, question)
+    if cached is not None:
+        return cached
+    return query_embedding_cache.set(EMBED_MODEL, question, await aembed_and_normalize(question))
+
+
+async def aingest_document(markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> IngestResult:
+    # The staged pipeline already overlaps embedding and upserts on its own threads.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, ingest_document, markdown, document_id, namespace)
+
+
+async def aingest_markdown(markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> List[str]:
+    return (await aingest_document(markdown, document_id=document_id, namespace=namespace)).chunk_ids
+
+
+async def aingest_documents(
+    documents: Iterable[Dict], namespace: Optional[str] = None, concurrency: Optional[int] = None
+) -> BulkIngestResult:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, ingest_documents, list(documents), namespace, concurrency)
+
+
+async def aquery_chunks(
+    question: str,
+    top_k: int = 5,
+    namespace: Optional[str] = None,
+    query_embedding: Optional[np.ndarray] = None,
+) -> List[Dict]:
+    if query_embedding is None:
+        query_embedding = await aembed_query(question)
+    if reranker is None:
+        matches = await _aretrieve(question, top_k, namespace, query_embedding)
+    else:
+        candidates = await _aretrieve(question, top_k * RERANK_CANDIDATES, namespace, query_embedding)
+        matches = await _run_in_index_executor(_rerank, question, candidates, top_k, namespace)
+    CHUNKS.inc("retrieved", amount=len(matches))
+    return matches
+
+
+async def _aretrieve(question: str, top_k: int, namespace: Optional[str], query_embedding: np.ndarray) -> List[Dict]:
+    # The first call may load the BM25 index from disk, so even this check stays off the event loop.
+    if not await _run_in_index_executor(_use_hybrid, namespace):
+        return await _run_in_index_executor(_search_index, query_embedding, top_k, namespace)
+
+    candidates = top_k * HYBRID_CANDIDATES
+    dense, sparse = await asyncio.gather(
+        _run_in_index_executor(_search_index, query_embedding, candidates, namespace),
+        _run_in_index_executor(_search_lexical, namespace, question, candidates),
+    )
+    return await _run_in_index_executor(_fuse_matches, dense, sparse, top_k, namespace)
+
+
+async def aanswer_question(question: str, top_k: int = 5, namespace: Optional[str] = None) -> Dict:
+    REQUESTS.inc("answer")
+    if async_answer_flight is None:
+        return await _aanswer_question(question, top_k, namespace)
+    result, shared = await async_answer_flight.do(
+        _flight_key(question, top_k, namespace), lambda: _aanswer_question(question, top_k, namespace)
+    )
+    return dict(result) if shared else result
+
+
+async def _aanswer_question(question: str, top_k: int, namespace: Optional[str]) -> Dict:
+    with collect_timings() as timings:
+        with span("answer"):
+            result = await _aanswer(question, top_k, namespace)
+    return {**result, "timings": rounded(timings)}
+
+
+async def _aanswer(question: str, top_k: int, namespace: Optional[str]) -> Dict:
+    query_embedding = await aembed_query(question)
+    matches = await aquery_chunks(question, top_k=top_k, namespace=namespace, query_embedding=query_embedding)
+    return await _agenerate_answer(question, namespace, query_embedding, matches)
+
+
+async def _agenerate_answer(question: str, namespace: Optional[str], query_embedding: np.ndarray, matches: List[Dict]) -> Dict:
+    # Content lookups (SQLite) and packing are blocking work.
+    context_text, context_stats = await _run_in_index_executor(build_context, question, matches, namespace)
+    cached = _cached_answer(question, namespace, query_embedding, matches, context_text, context_stats)
+    if cached is not None:
+        return cached
+
+    generation_started = time.perf_counter()
+    messages = build_messages(question, context_text)
+    with span("generate"):
+        response = await inference.acall(
+            GEN_MODELS,
+            "generate",
+            lambda model: get_async_hf_client().chat_completion(
+                messages=messages, model=model, max_tokens=GEN_MAX_TOKENS, temperature=0.7
+            ),
+        )
+    _record_usage(response)
+
     answer = response.choices[0].message.content
+    _remember_answer(namespace, query_embedding, matches, answer, time.perf_counter() - generation_started)
     logging.info("Generated answer for question '%s'", question)
-    return {"answer": answer, "context": context_text, "matches": matches}
+    return {"answer": answer, "context": context_text, "matches": matches, "context_stats": context_stats}
+
+
+async def aembed_queries(questions: List[str]) -> List[np.ndarray]:
+    # Cache misses are embedded together in a single feature_extraction call.
+    embeddings: List[Optional[np.ndarray]] = [
+        query_embedding_cache.get(EMBED_MODEL, question) if query_embedding_cache is not None else None
+        for question in questions
+    ]
+    missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        with span("embed"):
+            computed = await aembed_batch([questions[position] for position in missing], batch_size=len(missing))
+        for position, embedding in zip(missing, computed):
+            if query_embedding_cache is not None:
+                embedding = query_embedding_cache.set(EMBED_MODEL, questions[position], embedding)
+            embeddings[position] = embedding
+    return embeddings
+
+
+async def aanswer_questions(queries: List[Dict], concurrency: Optional[int] = None) -> Tuple[List[Dict], int]:
+    # Each query is {"question", "top_k"?, "namespace"?}. Returns one result per query, in order, with
+    # either the aanswer_question fields or {"error": ...}, plus how many queries were merged into
+    # an identical one earlier in the batch.
+    REQUESTS.inc("batch")
+    started = time.perf_counter()
+    unique: Dict[Tuple, int] = {}
+    # (question as first asked, top_k, namespace) per distinct query.
+    distinct: List[Tuple[str, int, Optional[str]]] = []
+    slots: List[Optional[int]] = []
+    results: List[Optional[Dict]] = [None] * len(queries)
+    for position, query in enumerate(queries):
+        question = (query.get("question") or "").strip()
+        if not question:
+            results[position] = {"error": "Question is required."}
+            slots.append(None)
+            continue
+        top_k, namespace = query.get("top_k", 5), query.get("namespace")
+        if not isinstance(top_k, int) or top_k < 1:
+            results[position] = {"error": "top_k must be at least 1."}
+            slots.append(None)
+            continue
+        key = (normalize_query_text(question), top_k, namespace)
+        if key not in unique:
+            unique[key] = len(distinct)
+            distinct.append((question, top_k, namespace))
+        slots.append(unique[key])
+
+    try:
+        embeddings = await aembed_queries([question for question, _, _ in distinct])
+    except Exception as exc:
+        logging.error("Embedding a batch of %d question(s) failed: %s", len(distinct), exc)
+        outcomes = [{"error": f"Embedding failed: {exc}"}] * len(distinct)
+    else:
+        retrievals = await asyncio.gather(
+            *(
+                aquery_chunks(question, top_k=top_k, namespace=namespace, query_embedding=embedding)
+                for (question, top_k, namespace), embedding in zip(distinct, embeddings)
+            ),
+            return_exceptions=True,
+        )
+        semaphore = asyncio.Semaphore(concurrency or QUERY_BATCH_CONCURRENCY)
+
+        async def generate(query: Tuple[str, int, Optional[str]], embedding: np.ndarray, matches) -> Dict:
+            question, _, namespace = query
+            if isinstance(matches, BaseException):
+                return {"error": f"Retrieval failed: {matches}"}
+            async with semaphore:
+                try:
+                    return await _agenerate_answer(question, namespace, embedding, matches)
+                except Exception as exc:
+                    logging.error("Generating an answer for '%s' failed: %s", question, exc)
+                    return {"error": f"Generation failed: {exc}"}
+
+        outcomes = await asyncio.gather(*(generate(*item) for item in zip(distinct, embeddings, retrievals)))
+
+    for position, slot in enumerate(slots):
+        if slot is not None:
+            results[position] = outcomes[slot]
+    merged = sum(slot is not None for slot in slots) - len(distinct)
+    logging.info(
+        "Answered a batch of %d question(s) (%d merged) in %.2fs", len(queries), merged, time.perf_counter() - started
+    )
+    return results, merged
+
+
+async def astream_answer(question: str, top_k: int = 5, namespace: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    # Yields ("sources", ...) once retrieval finishes, then ("delta", ...) per generated token, then ("done", ...).
+    REQUESTS.inc("stream")
+    query_embedding = await aembed_query(question)
+    matches = await aquery_chunks(question, top_k=top_k, namespace=namespace, query_embedding=query_embedding)
+    context_text, context_stats = await _run_in_index_executor(build_context, question, matches, namespace)
+    yield "sources", {"context": context_text, "sources": matches, "context_stats": context_stats}
+
+    cached = _cached_answer(question, namespace, query_embedding, matches, context_text, context_stats)
+    if cached is not None:
+        yield "delta", {"text": cached["answer"]}
+        yield "done", {"answer": cached["answer"], "cached": True}
+        return
+
+    generation_started = time.perf_counter()
+    messages = build_messages(question, context_text)
+    # Retries and fallback cover opening the stream; once tokens flow, a failure ends it.
+    stream = await inference.acall(
+        GEN_MODELS,
+        "generate_stream",
+        lambda model: get_async_hf_client().chat_completion(
+            messages=messages, model=model, max_tokens=GEN_MAX_TOKENS, temperature=0.7, stream=True
+        ),
+        hedge=False,
+    )
+    parts: List[str] = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            yield "delta", {"text": delta}
+
+    answer = "".join(parts)
+    record("generate", time.perf_counter() - generation_started)
+    _remember_answer(namespace, query_embedding, matches, answer, time.perf_counter() - generation_started)
+    logging.info("Streamed answer for question '%s'", question)
+    yield "done", {"answer": answer, "cached": False}
+
+
+async def awarm_up(probe_text: Optional[str] = None) -> Dict[str, float]:
+    # Builds the clients and opens the vector-store connection before the first request, and with
+    # probe_text also the Hugging Face one (its embedding lands in the query cache). Returns seconds per step.
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    await _run_in_index_executor(get_hf_client)
+    get_async_hf_client()
+    timings["clients"] = round(time.perf_counter() - started, 4)
+    started = time.perf_counter()
+    await _run_in_index_executor(lambda: get_vector_store().stats())
+    timings["vector_store"] = round(time.perf_counter() - started, 4)
+    if probe_text:
+        started = time.perf_counter()
+        await aembed_query(probe_text)
+        timings["probe_embed"] = round(time.perf_counter() - started, 4)
+    return timings
+
+
+def pool_stats() -> Dict[str, Optional[Dict]]:
+    return {
+        "hf": {kind: stats.as_dict() for kind, stats in hf_pool_stats.items()} or None,
+        "pinecone": urllib3_pool_stats(_pinecone_pool_manager) if _pinecone_pool_manager is not None else None,
+    }
+
+
+def admission_stats() -> Optional[Dict[str, Dict]]:
+    return admission.stats() if admission is not None else None
+
+
+def _bind_serving_loop() -> None:
+    global _serving_loop
+    try:
+        _serving_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+
+
+def start_ingest_jobs() -> int:
+    # Called from the API's startup; returns how many jobs from a previous process were re-queued.
+    ingest_jobs = get_ingest_jobs()
+    if ingest_jobs is None:
+        return 0
+    _bind_serving_loop()
+    return ingest_jobs.start()
+
+
+def submit_ingest_job(markdown: str, document_id: Optional[str] = None, namespace: Optional[str] = None) -> Tuple[str, bool]:
+    # Returns (job id, deduplicated); see IngestJobStore.submit.
+    ingest_jobs = get_ingest_jobs()
+    if ingest_jobs is None:
+        raise RuntimeError("Background ingest jobs are disabled (INGEST_JOBS_PATH is empty).")
+    REQUESTS.inc("ingest_job")
+    _bind_serving_loop()
+    return ingest_jobs.submit(markdown, document_id=document_id, namespace=namespace)
+
+
+def ingest_job_status(job_id: str) -> Optional[Dict]:
+    ingest_jobs = get_ingest_jobs()
+    return ingest_jobs.get(job_id) if ingest_jobs is not None else None
+
+
+def ingest_job_stats() -> Optional[Dict]:
+    ingest_jobs = get_ingest_jobs()
+    return ingest_jobs.stats() if ingest_jobs is not None else None
+
+
+def inference_stats() -> Dict[str, Dict]:
+    return inference.stats()
+
+
+def cache_stats() -> Dict[str, Optional[Dict]]:
+    content_store = get_content_store()
+    return {
+        "query_embedding": query_embedding_cache.stats() if query_embedding_cache is not None else None,
+        "answer": answer_cache.stats() if answer_cache is not None else None,
+        "content": content_store.stats() if content_store is not None else None,
+        "single_flight": {"sync": answer_flight.stats(), "async": async_answer_flight.stats()} if answer_flight is not None else None,
+    }
+
+
+def _cache_metrics() -> Iterable[MetricFamily]:
+    hits, misses = [], []
+    for name, cache in (("query_embedding", query_embedding_cache), ("answer", answer_cache), ("content", get_content_store())):
+        if cache is not None:
+            hits.append(({"cache": name}, cache.hits))
+            misses.append(({"cache": name}, cache.misses))
+    yield "rag_cache_hits_total", "counter", "Cache lookups that were hits.", hits
+    yield "rag_cache_misses_total", "counter", "Cache lookups that were misses.", misses
+    if answer_flight is not None:
+        coalesced = [({"mode": "sync"}, answer_flight.counters.coalesced), ({"mode": "async"}, async_answer_flight.counters.coalesced)]
+        yield "rag_coalesced_requests_total", "counter", "Questions answered by joining an identical in-flight one.", coalesced
+    pools = [(kind, stats.as_dict()) for kind, stats in hf_pool_stats.items()]
+    if pools:
+        for key, kind in (("requests", "counter"), ("new_connections", "counter"), ("pool_timeouts", "counter"), ("in_flight", "gauge")):
+            name = f"rag_hf_http_{key}" + ("_total" if kind == "counter" else "")
+            yield name, kind, f"Hugging Face HTTP pool: {key.replace('_', ' ')}.", [({"client": client}, values[key]) for client, values in pools]
+    pinecone_pool = urllib3_pool_stats(_pinecone_pool_manager) if _pinecone_pool_manager is not None else None
+    if pinecone_pool is not None:
+        yield "rag_pinecone_http_requests_total", "counter", "Pinecone HTTP pool: requests.", [({}, pinecone_pool["requests"])]
+        yield "rag_pinecone_http_new_connections_total", "counter", "Pinecone HTTP pool: new connections.", [({}, pinecone_pool["new_connections"])]
+
+
+def _inference_metrics() -> Iterable[MetricFamily]:
+    models = inference.stats()
+    for key in ("attempts", "failures", "retries", "hedges", "hedge_wins", "short_circuited", "fallbacks"):
+        samples = [({"model": model}, values[key]) for model, values in models.items()]
+        yield f"rag_inference_{key}_total", "counter", f"Inference calls: {key.replace('_', ' ')}.", samples
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    samples = [({"model": model}, states[values["circuit"]]) for model, values in models.items()]
+    yield "rag_inference_circuit_state", "gauge", "Circuit breaker per model: 0 closed, 1 half-open, 2 open.", samples
+
+
+def _admission_metrics() -> Iterable[MetricFamily]:
+    if admission is None:
+        return
+    classes = admission.stats()
+    yield "rag_admission_queue_depth", "gauge", "Requests waiting for an admission slot.", [
+        ({"class": name}, values["queued"]) for name, values in classes.items()
+    ]
+    yield "rag_admission_in_flight", "gauge", "Requests holding an admission slot.", [
+        ({"class": name}, values["in_flight"]) for name, values in classes.items()
+    ]
+    yield "rag_admission_rejected_total", "counter", "Requests rejected with 429, by reason.", [
+        ({"class": name, "reason": reason}, count)
+        for name, values in classes.items()
+        for reason, count in sorted(values["rejected"].items())
+    ]
+
+
+def _ingest_job_metrics() -> Iterable[MetricFamily]:
+    ingest_jobs = get_ingest_jobs()
+    if ingest_jobs is None:
+        return
+    counts = ingest_jobs.store.counts()
+    yield "rag_ingest_jobs", "gauge", "Background ingest jobs kept in the job store, by status.", [
+        ({"status": status}, count) for status, count in sorted(counts.items())
+    ]
+
 
+REGISTRY.add_collector(_cache_metrics)
+REGISTRY.add_collector(_inference_metrics)
+REGISTRY.add_collector(_admission_metrics)
+REGISTRY.add_collector(_ingest_job_metrics)
@@ -0,0 +1,108 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from bm25_index import tokenize
+
+
+class Scorer(Protocol):
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        ...
+
+
+class LexicalScorer:
+    """Cheap query/passage relevance: idf-weighted share of query terms present, plus a bonus for
+    query bigrams that appear verbatim. idf is taken over the batch being scored."""
+
+    def __init__(self, bigram_weight: float = 0.5):
+        self.bigram_weight = bigram_weight
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        query_terms = tokenize(query)
+        if not query_terms or not texts:
+            return [0.0] * len(texts)
+        documents = [tokenize(text) for text in texts]
+        term_sets = [set(document) for document in documents]
+        unique_terms = set(query_terms)
+        idf = {
+            term: math.log(1.0 + (len(texts) + 1) / (1 + sum(term in terms for terms in term_sets)))
+            for term in unique_terms
+        }
+        total = sum(idf.values()) or 1.0
+        query_bigrams = set(zip(query_terms, query_terms[1:]))
+        scores = []
+        for document, terms in zip(documents, term_sets):
+            coverage = sum(idf[term] for term in unique_terms & terms) / total
+            bonus = 0.0
+            if query_bigrams:
+                bonus = len(query_bigrams & set(zip(document, document[1:]))) / len(query_bigrams)
+            scores.append(coverage + self.bigram_weight * bonus)
+        return scores
+
+
+class CrossEncoderScorer:
+    """Local cross-encoder (sentence-transformers), e.g. cross-encoder/ms-marco-MiniLM-L-6-v2."""
+
+    def __init__(self, model_name: str, max_length: int = 512):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as exc:
+            raise RuntimeError("RERANKER=cross-encoder needs the sentence-transformers package installed.") from exc
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        return [float(value) for value in self.model.predict([(query, text) for text in texts], show_progress_bar=False)]
+
+
+class Reranker:
+    """Reorders over-fetched candidates by a Scorer and keeps the best top_k.
+
+    Candidates are scored batch_size at a time, small enough that a usual over-fetch takes several
+    batches. Before each batch after the first, scoring stops if the batch would probably end past
+    budget seconds, judging by how long the previous one took; the original retrieval order is
+    then kept.
+    """
+
+    def __init__(self, scorer: Scorer, batch_size: int = 8, budget: Optional[float] = 0.15):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.scorer = scorer
+        self.batch_size = batch_size
+        self.budget = budget
+        self.reranked = 0
+        self.fallbacks = 0
+
+    def rerank(self, query: str, matches: List[Dict], texts: List[str], top_k: int) -> Tuple[List[Dict], Dict]:
+        started = time.perf_counter()
+        scores: List[float] = []
+        batch_seconds = 0.0
+        for start in range(0, len(matches), self.batch_size):
+            if self.budget is not None and start and time.perf_counter() - started + batch_seconds > self.budget:
+                break
+            batch_started = time.perf_counter()
+            scores.extend(self.scorer.score(query, texts[start:start + self.batch_size]))
+            batch_seconds = time.perf_counter() - batch_started
+        seconds = time.perf_counter() - started
+        if len(scores) < len(matches):
+            self.fallbacks += 1
+            logging.warning(
+                "Reranking %d candidate(s) exceeded its %.0f ms budget (%.0f ms); keeping retrieval order",
+                len(matches),
+                (self.budget or 0) * 1000,
+                seconds * 1000,
+            )
+            return matches[:top_k], {"reranked": False, "candidates": len(matches), "seconds": round(seconds, 4)}
+
+        self.reranked += 1
+        # sorted() is stable, so equal scores keep their retrieval order.
+        order = sorted(range(len(matches)), key=lambda index: scores[index], reverse=True)[:top_k]
+        # "score" is what later stages (context packing) rank by, so it becomes the rerank score.
+        reranked = [
+            {**matches[index], "score": scores[index], "retrieval_score": matches[index].get("score"), "retrieval_rank": index + 1}
+            for index in order
+        ]
+        return reranked, {"reranked": True, "candidates": len(matches), "seconds": round(seconds, 4)}
+
+    def stats(self) -> Dict:
+        return {"reranked": self.reranked, "fallbacks": self.fallbacks}
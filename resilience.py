@@ -0,0 +1,348 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Sequence, Tuple
+
+# Rate limiting, timeouts and server-side failures; anything else (a bad request, an unknown model) is final.
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class InferenceUnavailableError(RuntimeError):
+    """Every allowed model failed or was short-circuited. retry_after is a hint in seconds, if known."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(InferenceUnavailableError):
+    pass
+
+
+_TRANSIENT_ERRORS = frozenset({"TransportError", "MaxRetryError", "ProtocolError"})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(exc, "status", None), int):
+        # Pinecone's ApiException carries the HTTP status itself.
+        status = exc.status
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    # httpx (and huggingface_hub's vendored copy) raise TransportError subclasses for connect/read
+    # failures; urllib3, under the Pinecone client, MaxRetryError and ProtocolError.
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        # Full jitter: spreads out retries from many callers that failed at the same moment.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+@dataclass
+class HedgePolicy:
+    """Sends a second, identical request when the first has not answered within the observed
+    quantile of recent latencies (never sooner than min_delay). Off unless enabled."""
+
+    enabled: bool = False
+    quantile: float = 0.95
+    min_delay: float = 0.05
+    min_samples: int = 20
+    window: int = 200
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and rejects calls for reset_timeout seconds.
+    Then one probe call is let through (half-open): success closes the breaker, failure reopens it."""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # A probe whose outcome never arrives (cancelled, abandoned) is replaced after another reset_timeout.
+            if time.monotonic() - self._changed_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._changed_at = time.monotonic()
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._changed_at))
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._changed_at = time.monotonic()
+
+
+class _ModelState:
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        # operation -> recent successful latencies, for the hedge delay.
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.counters = {
+            "attempts": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0,
+            "fallbacks": 0,
+        }
+
+
+class Resilience:
+    """Retries, hedging, a circuit breaker per model and fallback models around inference calls.
+
+    call()/acall() take the models to try in order and fn(model), which makes one request. A model
+    whose breaker is open is skipped; a model that exhausts its retries hands over to the next one.
+    Errors that are not retryable are raised straight away and do not count against the breaker.
+    """
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_workers: int = 16,
+    ):
+        self.retry = retry or RetryPolicy()
+        self.hedge = hedge or HedgePolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_workers = hedge_workers
+        self._models: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _state(self, model: str) -> _ModelState:
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                state = self._models[model] = _ModelState(CircuitBreaker(self.failure_threshold, self.reset_timeout))
+            return state
+
+    def _count(self, state: _ModelState, key: str, amount: int = 1) -> None:
+        with self._lock:
+            state.counters[key] += amount
+
+    def _observe(self, state: _ModelState, operation: str, seconds: float) -> None:
+        with self._lock:
+            window = state.latencies.get(operation)
+            if window is None:
+                window = state.latencies[operation] = deque(maxlen=self.hedge.window)
+            window.append(seconds)
+
+    def hedge_delay(self, model: str, operation: str) -> Optional[float]:
+        if not self.hedge.enabled:
+            return None
+        state = self._state(model)
+        with self._lock:
+            samples = sorted(state.latencies.get(operation, ()))
+        if len(samples) < self.hedge.min_samples:
+            return None
+        position = min(len(samples) - 1, int(self.hedge.quantile * len(samples)))
+        return max(self.hedge.min_delay, samples[position])
+
+    def _plan(self, models: Sequence[str]):
+        # Yields (model, state) for each model whose breaker lets a call through, counting the rest.
+        for position, model in enumerate(models):
+            state = self._state(model)
+            if not state.breaker.allow():
+                self._count(state, "short_circuited")
+                continue
+            if position:
+                self._count(state, "fallbacks")
+            yield model, state
+
+    def _unavailable(self, models: Sequence[str], last_error: Optional[BaseException]) -> InferenceUnavailableError:
+        retry_after = min((self._state(model).breaker.retry_after() for model in models), default=None)
+        if last_error is None:
+            return CircuitOpenError(f"Circuit open for {', '.join(models)}", retry_after=retry_after or None)
+        error = InferenceUnavailableError(
+            f"{', '.join(models)} unavailable after retries: {last_error}", retry_after=retry_after or None
+        )
+        error.__cause__ = last_error
+        return error
+
+    def _failed(self, state: _ModelState, model: str, operation: str, attempt: int, attempts: int, exc: BaseException) -> bool:
+        # Returns True when the call should be attempted again on the same model.
+        self._count(state, "failures")
+        state.breaker.failure()
+        if attempt + 1 >= attempts or state.breaker.state == CircuitBreaker.OPEN:
+            logging.warning("%s on %s failed (%s); giving up on this model", operation, model, exc)
+            return False
+        self._count(state, "retries")
+        logging.warning("%s on %s failed (%s); retry %d/%d", operation, model, exc, attempt + 1, attempts - 1)
+        return True
+
+    def call(
+        self, models: Sequence[str], operation: str, fn: Callable[[str], Any], hedge: bool = True, retry: bool = True
+    ) -> Any:
+        # retry=False makes one attempt per model, for callers that retry on their own.
+        attempts = self.retry.max_attempts if retry else 1
+        last_error: Optional[BaseException] = None
+        for model, state in self._plan(models):
+            for attempt in range(attempts):
+                self._count(state, "attempts")
+                started = time.perf_counter()
+                try:
+                    result = self._hedged(state, model, operation, fn) if hedge else fn(model)
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        raise
+                    last_error = exc
+                    if not self._failed(state, model, operation, attempt, attempts, exc):
+                        break
+                    time.sleep(self.retry.delay(attempt))
+                    continue
+                self._succeeded(state, operation, time.perf_counter() - started)
+                return result
+        raise self._unavailable(models, last_error)
+
+    async def acall(
+        self, models: Sequence[str], operation: str, fn: Callable[[str], Awaitable[Any]], hedge: bool = True, retry: bool = True
+    ) -> Any:
+        attempts = self.retry.max_attempts if retry else 1
+        last_error: Optional[BaseException] = None
+        for model, state in self._plan(models):
+            for attempt in range(attempts):
+                self._count(state, "attempts")
+                started = time.perf_counter()
+                try:
+                    result = await (self._ahedged(state, model, operation, fn) if hedge else fn(model))
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        raise
+                    last_error = exc
+                    if not self._failed(state, model, operation, attempt, attempts, exc):
+                        break
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+                self._succeeded(state, operation, time.perf_counter() - started)
+                return result
+        raise self._unavailable(models, last_error)
+
+    def _succeeded(self, state: _ModelState, operation: str, seconds: float) -> None:
+        self._count(state, "successes")
+        state.breaker.success()
+        self._observe(state, operation, seconds)
+
+    def _hedged(self, state: _ModelState, model: str, operation: str, fn: Callable[[str], Any]) -> Any:
+        delay = self.hedge_delay(model, operation)
+        if delay is None:
+            return fn(model)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="hedge")
+        # copy_context keeps the caller's timings; each attempt needs its own copy.
+        primary = self._executor.submit(contextvars.copy_context().run, fn, model)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        self._count(state, "hedges")
+        backup = self._executor.submit(contextvars.copy_context().run, fn, model)
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower request cannot be interrupted; its result is dropped when it arrives.
+                    if future is backup:
+                        self._count(state, "hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, state: _ModelState, model: str, operation: str, fn: Callable[[str], Awaitable[Any]]) -> Any:
+        delay = self.hedge_delay(model, operation)
+        if delay is None:
+            return await fn(model)
+        primary = asyncio.ensure_future(fn(model))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            self._count(state, "hedges")
+            backup = asyncio.ensure_future(fn(model))
+            tasks.add(backup)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count(state, "hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._models.items())
+        result = {}
+        for model, state in models:
+            with self._lock:
+                counters = dict(state.counters)
+                operations = list(state.latencies)
+            delays = {operation: self.hedge_delay(model, operation) for operation in operations}
+            breaker = state.breaker
+            result[model] = {
+                **counters,
+                "circuit": breaker.state,
+                "circuit_opened": breaker.opened,
+                "retry_after": round(breaker.retry_after(), 2),
+                "hedge_delay": {operation: round(delay, 4) for operation, delay in delays.items() if delay is not None},
+            }
+        return result
+
+
+def model_chain(*models: Optional[str]) -> Tuple[str, ...]:
+    # Drops unset and repeated models, keeping the order, e.g. (GEN_MODEL, GEN_FALLBACK_MODEL) with no fallback.
+    return tuple(dict.fromkeys(model for model in models if model))
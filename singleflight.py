@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Counters:
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self._lock = threading.Lock()
+
+    def record(self, leader: bool, waiters: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            if leader:
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, waiters)
+
+    def stats(self, in_flight: int) -> Dict[str, Any]:
+        with self._lock:
+            calls, coalesced = self.calls, self.coalesced
+            return {
+                "calls": calls,
+                "executions": self.executions,
+                "coalesced": coalesced,
+                "coalesced_rate": coalesced / calls if calls else 0.0,
+                "max_waiters": self.max_waiters,
+                "in_flight": in_flight,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-level request coalescing: concurrent calls with the same key share one execution of fn.
+
+    Only calls that overlap in time are merged; once the leader finishes, the next call runs fn again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.counters = _Counters()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        # Returns (result, shared); shared is True when this caller waited on another's execution.
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+        self.counters.record(leader, call.waiters)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return self.counters.stats(in_flight)
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for one event loop.
+
+    The shared work runs as its own task, so a caller that is cancelled (e.g. a client that
+    disconnects) stops waiting without cancelling it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.counters = _Counters()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: (self._tasks.pop(key, None), self._waiters.pop(key, None)))
+        else:
+            self._waiters[key] += 1
+        self.counters.record(leader, self._waiters.get(key, 0))
+        return await asyncio.shield(task), not leader
+
+    def stats(self) -> Dict[str, Any]:
+        return self.counters.stats(len(self._tasks))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep every local side store in memory so importing rag_pipeline leaves nothing on disk.
+os.environ.setdefault("INGEST_MANIFEST_DIR", "")
+os.environ.setdefault("LEXICAL_INDEX_PATH", "")
+os.environ.setdefault("CONTENT_STORE_PATH", ":memory:")
+os.environ.setdefault("INGEST_JOBS_PATH", ":memory:")
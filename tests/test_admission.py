@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, ClassLimits
+
+
+def _controller(**limits) -> AdmissionController:
+    settings = {"max_concurrency": 1, "max_queue": 4, "max_wait": 5.0, "rate": 0.001, "burst": 4.0} | limits
+    return AdmissionController([ClassLimits("ingest", **settings)], max_concurrency=1)
+
+
+def _tokens(controller: AdmissionController, namespace):
+    return controller._classes["ingest"].buckets[namespace].tokens
+
+
+def test_each_namespace_is_charged_its_share():
+    async def scenario():
+        controller = _controller()
+        async with controller.admit("ingest", costs={"a": 3, "b": 1}):
+            pass
+        assert _tokens(controller, "a") == pytest.approx(1, abs=0.01)
+        assert _tokens(controller, "b") == pytest.approx(3, abs=0.01)
+        # "a" is nearly empty again after this, so a request touching it charges neither namespace.
+        async with controller.admit("ingest", costs={"a": 1}):
+            pass
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("ingest", costs={"b": 1, "a": 1})
+        assert rejected.value.reason == "rate_limited"
+        assert _tokens(controller, "b") == pytest.approx(3, abs=0.01)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("reason", ["queue_full", "queue_timeout"])
+def test_queue_rejections_refund_tokens(reason):
+    async def scenario():
+        controller = _controller(max_queue=0 if reason == "queue_full" else 4, max_wait=0.05)
+        holder = await controller.acquire("ingest", "busy")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("ingest", "a", cost=2)
+        assert rejected.value.reason == reason
+        assert _tokens(controller, "a") == pytest.approx(4, abs=0.01)
+        holder.release()
+
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+import asyncio
+
+import httpx
+
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from vector_store import LocalVectorStore
+
+
+def test_top_k_below_one_is_rejected_by_single_and_batch_routes():
+    rag_pipeline = load_pipeline(hf_client=StubInferenceClient(embed_latency=0.0, chat_latency=0.0), vector_store=LocalVectorStore(path=None))
+    import main
+
+    async def post(path, body):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    assert asyncio.run(post("/query", {"question": "Who rules?", "top_k": 0})).status_code == 422
+    batch = {"queries": [{"question": "Who rules?"}, {"question": "Who rules?", "top_k": 0}]}
+    assert asyncio.run(post("/query/batch", batch)).status_code == 422
+
+    results, _ = asyncio.run(rag_pipeline.aanswer_questions([{"question": "Who rules?", "top_k": 0}]))
+    assert results == [{"error": "top_k must be at least 1."}]
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from vector_store import LocalVectorStore
+
+
+def test_context_and_hybrid_check_run_off_the_event_loop(monkeypatch):
+    client = StubInferenceClient(embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    monkeypatch.setattr(rag_pipeline, "ingest_manifest", None)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    rag_pipeline.ingest_document(lore(), document_id="lore", namespace="async")
+    threads = {}
+    for name in ("build_context", "_use_hybrid"):
+        original = getattr(rag_pipeline, name)
+
+        def traced(*args, _name=name, _original=original):
+            threads[_name] = threading.current_thread()
+            return _original(*args)
+
+        monkeypatch.setattr(rag_pipeline, name, traced)
+
+    async def answer():
+        result = await rag_pipeline.aanswer_question("Who rules Greenleaf?", namespace="async")
+        events = [event async for event, _ in rag_pipeline.astream_answer("Who rules Greenleaf?", namespace="async")]
+        return result, events
+
+    result, events = asyncio.run(answer())
+    assert result["context"] and events[0] == "sources" and events[-1] == "done"
+    assert "context" in result["timings"]
+    assert set(threads) == {"build_context", "_use_hybrid"}
+    assert threading.main_thread() not in threads.values()
@@ -0,0 +1,52 @@
+from bm25_index import BM25Index, LexicalIndex
+
+DOCUMENTS = {
+    "armies": "Armies need food supplies and morale to march across Greenleaf.",
+    "harbour": "The harbour guild taxes every ship that docks at the harbour.",
+    "farms": "Farms produce grain and food for the settlement granary.",
+}
+
+
+def _index() -> BM25Index:
+    index = BM25Index()
+    for doc_id, text in DOCUMENTS.items():
+        index.add(doc_id, text)
+    return index
+
+
+def test_search_ranks_matching_documents():
+    results = _index().search("harbour guild", top_k=2)
+    assert [doc_id for doc_id, _ in results] == ["harbour"]
+    assert {doc_id for doc_id, _ in _index().search("food", top_k=5)} == {"armies", "farms"}
+
+
+def test_deleted_documents_are_not_returned():
+    index = _index()
+    assert index.delete(["farms", "missing"]) == 1
+    assert [doc_id for doc_id, _ in index.search("food grain", top_k=5)] == ["armies"]
+
+
+def test_save_keeps_tombstones_and_reloads_the_same_scores(tmp_path):
+    index = _index()
+    index.add("armies", "Armies march on bread.")
+    index.delete(["farms"])
+    slots = len(index.doc_ids)
+    expected = index.search("food harbour bread", top_k=5)
+
+    index.save(str(tmp_path / "ns"))
+    assert len(index.doc_ids) == slots
+    reloaded = BM25Index.load(str(tmp_path / "ns"))
+    assert len(reloaded) == 2
+    assert reloaded.search("food harbour bread", top_k=5) == expected
+
+
+def test_lexical_index_saves_only_changed_namespaces(tmp_path):
+    lexical = LexicalIndex(str(tmp_path))
+    lexical.add("wiki", DOCUMENTS.items())
+    lexical.save("wiki")
+    written = (tmp_path / "ns_wiki.npz").stat().st_mtime_ns
+    lexical.delete("wiki", ["missing"])
+    lexical.add("wiki", [])
+    lexical.save("wiki")
+    assert (tmp_path / "ns_wiki.npz").stat().st_mtime_ns == written
+    assert LexicalIndex(str(tmp_path)).search("wiki", "harbour", top_k=1)[0][0] == "harbour"
@@ -0,0 +1,38 @@
+import base64
+
+from benchmarks.bench_chunking import lore
+from chunker import HierarchicalChunker, estimate_tokens
+
+
+def test_chunks_stay_within_max_tokens():
+    chunker = HierarchicalChunker(max_tokens=100, overlap_tokens=10)
+    chunks = list(chunker.chunk(lore()))
+    assert chunks
+    assert all(chunk.token_count <= 100 for chunk in chunks)
+    assert all(estimate_tokens(chunk.text) <= 100 for chunk in chunks)
+
+
+def test_chunks_do_not_span_h1_sections():
+    chunks = list(HierarchicalChunker(max_tokens=400).chunk("# One\n\nFirst.\n\n# Two\n\nSecond.\n"))
+    assert [chunk.heading_path for chunk in chunks] == [("One",), ("Two",)]
+    assert [chunk.text for chunk in chunks] == ["# One\n\nFirst.", "# Two\n\nSecond."]
+
+
+def test_long_token_without_spaces_is_split():
+    # A Google Docs export inlines images as base64 data URIs: one "word" of several hundred tokens.
+    image = "data:image/png;base64," + base64.b64encode(bytes(range(256)) * 12).decode()
+    assert estimate_tokens(image) > 400
+    markdown = f"# Gallery\n\nBefore the image.\n\n![map]({image})\n\nAfter the image.\n"
+    chunks = list(HierarchicalChunker(max_tokens=400, overlap_tokens=0).chunk(markdown))
+    assert len(chunks) > 1
+    assert all(chunk.token_count <= 400 for chunk in chunks)
+    bodies = [chunk.text.split("\n\n", 1)[1] if chunk.text.startswith("# Gallery\n\n") else chunk.text for chunk in chunks]
+    # Pieces of the image rejoin without any separator inserted into it.
+    assert image in "".join(bodies).replace("\n\n", "")
+
+
+def test_split_pieces_start_after_repeated_headings():
+    long_section = " ".join(f"Sentence number {position} about the harbour." for position in range(60))
+    chunks = list(HierarchicalChunker(max_tokens=64, overlap_tokens=0).chunk(f"# Port\n\n## Docks\n\n{long_section}\n"))
+    assert len(chunks) > 1
+    assert all(chunk.text.startswith("# Port\n\n## Docks\n\n") for chunk in chunks)
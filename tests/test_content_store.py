@@ -0,0 +1,24 @@
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from content_store import ContentStore
+from vector_store import LocalVectorStore
+
+
+def test_chunks_missing_from_the_store_are_counted_and_left_out(monkeypatch, caplog):
+    client = StubInferenceClient(embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    monkeypatch.setattr(rag_pipeline, "ingest_manifest", None)
+    monkeypatch.setattr(rag_pipeline, "content_store", ContentStore(":memory:"))
+    rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    matches = rag_pipeline.query_chunks("Who rules Greenleaf?", top_k=3, namespace="wiki")
+    assert all("content" not in match["metadata"] for match in matches)
+    context, stats = rag_pipeline.build_context("Who rules Greenleaf?", matches, "wiki")
+    assert stats["chunks"] == 3 and context
+
+    # A replica, or a redeploy on an ephemeral disk, with an empty store.
+    monkeypatch.setattr(rag_pipeline, "content_store", ContentStore(":memory:"))
+    missing_before = rag_pipeline.CHUNKS.value("content_missing")
+    context, stats = rag_pipeline.build_context("Who rules Greenleaf?", matches, "wiki")
+    assert context == "" and stats["chunks"] == 0
+    assert rag_pipeline.CHUNKS.value("content_missing") - missing_before == 3
+    assert "No content for 3 matched chunk(s)" in caplog.text
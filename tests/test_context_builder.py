@@ -0,0 +1,15 @@
+from context_builder import ContextBuilder
+
+# Every fourth sentence matches the question, so trimming keeps many separate runs joined by "…".
+SENTENCES = [
+    f"Ships sail {position}." if position % 4 == 0 else f"Cows graze quietly in field number {position} today."
+    for position in range(60)
+]
+MATCH = {"id": "fields", "score": 1.0, "metadata": {"content": "# Fields\n" + " ".join(SENTENCES)}}
+
+
+def test_trimmed_context_including_gap_markers_fits_the_budget():
+    for budget in range(30, 200, 10):
+        packed, stats = ContextBuilder(max_tokens=budget, min_chunk_tokens=8).pack("ships sail", [MATCH])
+        assert stats.trimmed_chunks == 1 and "…" in packed[0][1]
+        assert stats.as_dict()["tokens_out"] <= budget
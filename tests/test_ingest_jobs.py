@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+import time
+
+from ingest_jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, IngestJobQueue, IngestJobStore
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_deduplicates_unfinished_jobs_per_document():
+    store = IngestJobStore(":memory:")
+    job_id, deduplicated = store.submit("# A\n\nfirst", "doc", None)
+    assert not deduplicated
+    assert store.submit("# A\n\nfirst", "doc", None) == (job_id, True)
+    # New markdown replaces the payload of the queued job.
+    assert store.submit("# A\n\nsecond", "doc", None) == (job_id, True)
+    assert store.claim(job_id)["markdown"] == "# A\n\nsecond"
+    # Once it runs, new markdown needs a second job; other namespaces are separate documents.
+    second, deduplicated = store.submit("# A\n\nthird", "doc", None)
+    assert second != job_id and not deduplicated
+    assert not store.submit("# A\n\nfirst", "doc", "other")[1]
+
+
+def test_claim_holds_back_a_job_while_its_document_is_running():
+    store = IngestJobStore(":memory:")
+    first, _ = store.submit("one", "doc", "ns")
+    assert store.claim(first) is not None
+    second, _ = store.submit("two", "doc", "ns")
+    other, _ = store.submit("three", "other-doc", "ns")
+    assert store.claim(second) is None
+    assert store.get(second)["status"] == QUEUED
+    assert store.claim(other) is not None
+    store.finish(first, result={"deleted": 0})
+    assert store.claim(second)["markdown"] == "two"
+    assert store.claim(second) is None
+
+
+def test_progress_and_result_are_recorded():
+    store = IngestJobStore(":memory:")
+    job_id, _ = store.submit("markdown", "doc", None)
+    store.claim(job_id)
+    store.planned(job_id, total=4, skipped=1)
+    store.progressed(job_id, 2)
+    job = store.get(job_id)
+    assert (job["status"], job["chunks_done"], job["chunks_total"], job["progress"]) == (RUNNING, 2, 4, 0.5)
+    store.finish(job_id, result={"count": 4, "deleted": 3})
+    job = store.get(job_id)
+    assert (job["status"], job["chunks_deleted"], job["result"]["count"]) == (SUCCEEDED, 3, 4)
+
+
+def test_unfinished_jobs_are_recovered_after_a_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = IngestJobStore(path)
+    running, _ = store.submit("one", "a", None)
+    queued, _ = store.submit("two", "b", None)
+    done, _ = store.submit("three", "c", None)
+    store.claim(running)
+    store.progressed(running, 5)
+    store.claim(done)
+    store.finish(done, result={})
+    restarted = IngestJobStore(path)
+    assert restarted.recover() == [running, queued]
+    assert restarted.get(running)["chunks_done"] == 0
+    assert restarted.counts() == {QUEUED: 2, RUNNING: 0, SUCCEEDED: 1, FAILED: 0}
+
+
+def test_queue_runs_one_job_per_document_at_a_time():
+    running, overlaps, calls = set(), [], []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def run(markdown, document_id=None, namespace=None, on_planned=None, on_progress=None):
+        with lock:
+            overlaps.append(document_id in running)
+            running.add(document_id)
+            calls.append(markdown)
+        release.wait(5)
+        on_planned(1, 0)
+        on_progress(1)
+        with lock:
+            running.discard(document_id)
+        return {"deleted": 0}
+
+    queue = IngestJobQueue(IngestJobStore(":memory:"), run, workers=3)
+    first, _ = queue.submit("one", "doc")
+    _wait_for(lambda: calls == ["one"])
+    second, _ = queue.submit("two", "doc")
+    time.sleep(0.1)
+    assert calls == ["one"] and queue.get(second)["status"] == QUEUED
+    release.set()
+    _wait_for(lambda: queue.get(second)["status"] == SUCCEEDED)
+    assert calls == ["one", "two"] and not any(overlaps)
+    assert queue.get(first)["progress"] == 1.0
+
+
+def test_worker_survives_store_errors_and_failed_jobs():
+    def run(markdown, **kwargs):
+        if markdown == "bad":
+            raise ValueError("cannot ingest")
+        return {"deleted": 0}
+
+    store = IngestJobStore(":memory:")
+    queue = IngestJobQueue(store, run, workers=1)
+    claim = store.claim
+    attempts = []
+
+    def flaky_claim(job_id):
+        attempts.append(job_id)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim(job_id)
+
+    store.claim = flaky_claim
+    lost, _ = queue.submit("lost", "a")
+    bad, _ = queue.submit("bad", "b")
+    good, _ = queue.submit("good", "c")
+    _wait_for(lambda: queue.get(good)["status"] == SUCCEEDED)
+    assert queue.get(bad)["status"] == FAILED and queue.get(bad)["error"] == "cannot ingest"
+    # The job whose claim failed stays queued for the next restart.
+    assert queue.get(lost)["status"] == QUEUED
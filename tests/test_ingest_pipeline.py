@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ingest_pipeline import StagedIngestPipeline
+
+
+class Failing:
+    def __init__(self, exc, times):
+        self.exc = exc
+        self.times = times
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        if self.calls <= self.times:
+            raise self.exc
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def _pipeline(embed_fn):
+    return StagedIngestPipeline(embed_fn, lambda vectors, namespace: None, backoff_base=0.001, backoff_max=0.001)
+
+
+RECORDS = [("doc-chunk-0", "text", {})]
+
+
+@pytest.mark.parametrize("exc", [ConnectionError("reset"), HTTPError(503)])
+def test_transient_errors_are_retried(exc):
+    embed = Failing(exc, times=2)
+    result = _pipeline(embed).run(RECORDS)
+    assert result.chunk_ids == ["doc-chunk-0"]
+    assert (embed.calls, result.retries) == (3, 2)
+
+
+@pytest.mark.parametrize("exc", [ValueError("bad chunk"), HTTPError(422)])
+def test_other_errors_fail_without_retrying(exc):
+    embed = Failing(exc, times=1)
+    with pytest.raises(type(exc)):
+        _pipeline(embed).run(RECORDS)
+    assert embed.calls == 1
@@ -0,0 +1,112 @@
+import pytest
+
+from benchmarks.bench_chunking import lore
+from benchmarks.stubs import StubInferenceClient, load_pipeline
+from ingest_manifest import IngestManifest
+from vector_store import LocalVectorStore
+
+NEW_SECTION = "# Harbour Guild\n\nThe harbour guild taxes every ship that docks at Greenleaf and trains its pilots.\n\n"
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    client = StubInferenceClient(embed_latency=0.0, chat_latency=0.0)
+    rag_pipeline = load_pipeline(hf_client=client, vector_store=LocalVectorStore(path=None))
+    monkeypatch.setattr(rag_pipeline, "ingest_manifest", IngestManifest(str(tmp_path / "manifests")))
+    return rag_pipeline, client
+
+
+def _stored_ids(rag_pipeline, namespace="wiki"):
+    store = rag_pipeline.get_vector_store()
+    return set(store._partitions[namespace].ids)
+
+
+def test_unchanged_document_is_not_embedded_again(pipeline):
+    rag_pipeline, client = pipeline
+    first = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    embedded = client.embedded_texts
+    assert embedded == first.chunk_count
+
+    again = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    assert client.embedded_texts == embedded
+    assert again.skipped_chunk_ids == first.chunk_ids
+    assert again.deleted_chunk_ids == [] and again.reused_chunk_ids == []
+
+
+def test_inserted_section_only_embeds_new_chunks(pipeline):
+    rag_pipeline, client = pipeline
+    first = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    client.reset()
+
+    text = lore()
+    split = text.index("\n# ", 1) + 1
+    updated = text[:split] + NEW_SECTION + text[split:]
+    result = rag_pipeline.ingest_document(updated, document_id="lore", namespace="wiki")
+    assert result.chunk_count == first.chunk_count + 1
+    assert client.embedded_texts <= 2
+    assert len(result.reused_chunk_ids) >= first.chunk_count - 2
+    assert _stored_ids(rag_pipeline) == set(result.chunk_ids)
+    # A moved chunk is found under its new id by its own text.
+    moved = result.reused_chunk_ids[0]
+    records = rag_pipeline._chunk_records(rag_pipeline.chunk_markdown(updated), "lore")
+    moved_text = next(chunk_text for chunk_id, chunk_text, _ in records if chunk_id == moved)
+    vector = rag_pipeline.embed_and_normalize(moved_text)
+    assert rag_pipeline.get_vector_store().query(vector, top_k=1, namespace="wiki")[0]["id"] == moved
+
+
+def test_removed_sections_are_deleted(pipeline):
+    rag_pipeline, client = pipeline
+    first = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    client.reset()
+
+    text = lore()
+    shorter = text[: text.rindex("\n# ")]
+    result = rag_pipeline.ingest_document(shorter, document_id="lore", namespace="wiki")
+    assert result.deleted_chunk_ids
+    assert set(result.deleted_chunk_ids) == set(first.chunk_ids) - set(result.chunk_ids)
+    assert _stored_ids(rag_pipeline) == set(result.chunk_ids)
+    assert client.embedded_texts == 0
+
+
+def test_default_namespace_and_one_named_default_are_separate(pipeline):
+    rag_pipeline, client = pipeline
+    first = rag_pipeline.ingest_document(lore(), document_id="lore")
+    named = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="default")
+    assert named.skipped_chunk_ids == []
+    assert _stored_ids(rag_pipeline, "default") == set(first.chunk_ids)
+    assert rag_pipeline.ingest_document(lore(), document_id="lore").skipped_chunk_ids == first.chunk_ids
+
+
+def test_manifests_from_the_shared_default_directory_are_still_read(tmp_path):
+    manifest = IngestManifest(str(tmp_path))
+    legacy = tmp_path / "default" / "lore.json"
+    legacy.parent.mkdir()
+    legacy.write_text('{"document_id": "lore", "namespace": null, "chunks": {"lore-chunk-0": {"hash": "h"}}}')
+    assert manifest.load(None, "lore") == {"lore-chunk-0": {"hash": "h"}}
+    assert manifest.load("default", "lore") == {}
+    manifest.delete("default", "lore")
+    assert legacy.exists()
+    manifest.delete(None, "lore")
+    assert not legacy.exists()
+
+
+def test_chunks_missing_from_the_vector_store_are_upserted_again(pipeline):
+    rag_pipeline, client = pipeline
+    first = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    store = rag_pipeline.get_vector_store()
+    store.delete(first.chunk_ids[:3], namespace="wiki")
+    client.reset()
+
+    again = rag_pipeline.ingest_document(lore(), document_id="lore", namespace="wiki")
+    assert client.embedded_texts == 3
+    assert again.skipped_chunk_ids == first.chunk_ids[3:]
+    assert _stored_ids(rag_pipeline) == set(first.chunk_ids)
+
+
+def test_bulk_ingest_restores_a_wiped_vector_store(pipeline):
+    rag_pipeline, _ = pipeline
+    first = rag_pipeline.ingest_documents([{"markdown": lore(), "document_id": "lore", "namespace": "wiki"}])
+    rag_pipeline.get_vector_store().delete(list(_stored_ids(rag_pipeline)), namespace="wiki")
+    again = rag_pipeline.ingest_documents([{"markdown": lore(), "document_id": "lore", "namespace": "wiki"}])
+    assert again.skipped_chunks == 0
+    assert len(_stored_ids(rag_pipeline)) == first.chunk_count
@@ -0,0 +1,62 @@
+from context_builder import ContextBuilder
+from reranker import LexicalScorer, Reranker
+
+
+class FixedScorer:
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = 0
+
+    def score(self, query, texts):
+        self.calls += 1
+        return [self.scores[text] for text in texts]
+
+
+def _matches():
+    return [
+        {"id": "a", "score": 0.9, "metadata": {"content": "Alpha passage about armies."}},
+        {"id": "b", "score": 0.5, "metadata": {"content": "Beta passage about the harbour guild."}},
+    ]
+
+
+def test_rerank_order_survives_context_packing():
+    matches = _matches()
+    texts = [match["metadata"]["content"] for match in matches]
+    reranker = Reranker(FixedScorer({texts[0]: 0.1, texts[1]: 0.8}), budget=None)
+    reranked, info = reranker.rerank("harbour guild", matches, texts, top_k=2)
+    assert info["reranked"]
+    assert [match["id"] for match in reranked] == ["b", "a"]
+    assert [match["retrieval_score"] for match in reranked] == [0.5, 0.9]
+    assert [match["retrieval_rank"] for match in reranked] == [2, 1]
+
+    packed, _ = ContextBuilder(max_tokens=500).pack("harbour guild", reranked)
+    assert [match["id"] for match, _ in packed] == ["b", "a"]
+
+
+def test_lexical_scorer_prefers_passages_with_query_terms():
+    scores = LexicalScorer().score("harbour guild", ["Armies march.", "The harbour guild taxes ships."])
+    assert scores[1] > scores[0]
+
+
+class SlowScorer:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+
+    def score(self, query, texts):
+        import time
+
+        self.calls += 1
+        time.sleep(self.seconds)
+        return [1.0] * len(texts)
+
+
+def test_budget_applies_with_default_candidate_count():
+    # 20 candidates (top_k 5 * RERANK_CANDIDATES 4) with the default batch size.
+    matches = [{"id": str(position), "score": 1.0 - position / 100} for position in range(20)]
+    texts = [f"passage {position}" for position in range(20)]
+    scorer = SlowScorer(0.03)
+    reranked, info = Reranker(scorer, budget=0.05).rerank("question", matches, texts, top_k=5)
+    assert not info["reranked"]
+    assert scorer.calls == 1
+    assert [match["id"] for match in reranked] == ["0", "1", "2", "3", "4"]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from vector_store import LocalVectorStore
+
+
+def _vectors(count: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def _upsert(store: LocalVectorStore, prefix: str, values: np.ndarray, namespace=None) -> None:
+    store.upsert([{"id": f"{prefix}-{row}", "values": vector} for row, vector in enumerate(values)], namespace=namespace)
+
+
+def test_exact_query_returns_nearest_first():
+    store = LocalVectorStore(path=None)
+    values = _vectors(50)
+    _upsert(store, "v", values)
+    matches = store.query(values[7], top_k=3)
+    assert matches[0]["id"] == "v-7"
+    assert matches[0]["score"] > 0.999
+    assert [match["score"] for match in matches] == sorted((match["score"] for match in matches), reverse=True)
+
+
+def test_ivf_keeps_indexing_rows_after_namespace_shrinks():
+    store = LocalVectorStore(path=None, ann_min_vectors=1000, nlist=16)
+    _upsert(store, "old", _vectors(1000, seed=1))
+    assert store._partitions[""].ivf is not None
+    store.delete([f"old-{row}" for row in range(100)])
+    fresh = _vectors(50, seed=2)
+    _upsert(store, "new", fresh)
+    found = sum(store.query(vector, top_k=1, nprobe=1)[0]["id"] == f"new-{row}" for row, vector in enumerate(fresh))
+    assert found == len(fresh)
+
+
+def test_deleted_rows_are_not_returned():
+    store = LocalVectorStore(path=None, ann_min_vectors=200, nlist=8)
+    values = _vectors(300, seed=3)
+    _upsert(store, "v", values, namespace="ns")
+    store.delete(["v-5"], namespace="ns")
+    assert all(match["id"] != "v-5" for match in store.query(values[5], top_k=10, namespace="ns"))
+    assert store.stats()["namespaces"]["ns"]["vector_count"] == 299
+
+
+def test_saved_store_reloads(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path))
+    values = _vectors(20, seed=4)
+    _upsert(store, "v", values, namespace="ns")
+    store.update_metadata("v-3", {"title": "three"}, namespace="ns")
+    store.flush()
+    reloaded = LocalVectorStore(path=str(tmp_path))
+    match = reloaded.query(values[3], top_k=1, namespace="ns")[0]
+    assert (match["id"], match["metadata"]) == ("v-3", {"title": "three"})
+
+
+def test_writes_reach_disk_on_flush_only(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path))
+    _upsert(store, "a", _vectors(5, seed=5), namespace="a")
+    _upsert(store, "b", _vectors(5, seed=6), namespace="b")
+    assert not list(tmp_path.iterdir())
+    store.flush("a")
+    assert LocalVectorStore(path=str(tmp_path)).stats()["namespaces"] == {"a": {"vector_count": 5}}
+    store.flush()
+    assert set(LocalVectorStore(path=str(tmp_path)).stats()["namespaces"]) == {"a", "b"}
@@ -0,0 +1,347 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Protocol, Set, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from ann_index import IVFIndex
+
+
+class VectorStore(Protocol):
+    def upsert(self, vectors: List[Dict], namespace: Optional[str] = None) -> None:
+        ...
+
+    def query(self, vector, top_k: int = 5, namespace: Optional[str] = None, include_metadata: bool = True) -> List[Dict]:
+        ...
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        ...
+
+    def update_metadata(self, id: str, metadata: Dict, namespace: Optional[str] = None) -> None:
+        ...
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Dict]:
+        ...
+
+    def fetch_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, List[float]]:
+        ...
+
+    def stats(self) -> Dict:
+        ...
+
+    def flush(self, namespace: Optional[str] = None) -> None:
+        ...
+
+
+class PineconeVectorStore:
+    def __init__(self, index, request_timeout: Optional[Tuple[float, float]] = None):
+        self.index = index
+        # (connect, read) seconds, applied to every call.
+        self._call_kwargs = {"_request_timeout": request_timeout} if request_timeout else {}
+
+    def upsert(self, vectors: List[Dict], namespace: Optional[str] = None) -> None:
+        self.index.upsert(vectors=vectors, namespace=namespace, **self._call_kwargs)
+
+    def query(self, vector, top_k: int = 5, namespace: Optional[str] = None, include_metadata: bool = True) -> List[Dict]:
+        results = self.index.query(
+            namespace=namespace,
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
+            top_k=top_k,
+            include_metadata=include_metadata,
+            **self._call_kwargs,
+        )
+        if not results.matches:
+            return []
+        return [{"id": match.id, "score": match.score, "metadata": match.metadata or {}} for match in results.matches]
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        self.index.delete(ids=ids, namespace=namespace, **self._call_kwargs)
+
+    def update_metadata(self, id: str, metadata: Dict, namespace: Optional[str] = None) -> None:
+        self.index.update(id=id, set_metadata=metadata, namespace=namespace, **self._call_kwargs)
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Dict]:
+        response = self.index.fetch(ids=ids, namespace=namespace, **self._call_kwargs)
+        return {vector_id: vector.metadata or {} for vector_id, vector in response.vectors.items()}
+
+    def fetch_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, List[float]]:
+        response = self.index.fetch(ids=ids, namespace=namespace, **self._call_kwargs)
+        return {vector_id: list(vector.values) for vector_id, vector in response.vectors.items()}
+
+    def stats(self) -> Dict:
+        stats = self.index.describe_index_stats(**self._call_kwargs)
+        return stats.to_dict() if hasattr(stats, "to_dict") else dict(stats)
+
+    def flush(self, namespace: Optional[str] = None) -> None:
+        # Pinecone writes are durable once the call returns.
+        pass
+
+
+class _Partition:
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self.rows: Dict[str, int] = {}
+        self.ivf: Optional[IVFIndex] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def reserve(self, needed: int) -> None:
+        capacity = self.vectors.shape[0]
+        if needed <= capacity and self.vectors.flags.writeable:
+            return
+        # Doubling keeps upserts amortized O(1); this also turns a read-only memory map into a writable copy.
+        new_capacity = max(needed, capacity * 2 if needed > capacity else capacity, 64)
+        grown = np.zeros((new_capacity, self.vectors.shape[1]), dtype=np.float32)
+        grown[: self.count] = self.vectors[: self.count]
+        self.vectors = grown
+
+
+class LocalVectorStore:
+    """In-process cosine index: one NumPy matrix per namespace, persisted as .npy plus a JSON sidecar.
+
+    Writes stay in memory until flush(), which rewrites only the namespaces changed since the last
+    save; the pipeline flushes once per ingest rather than on every upsert, delete or metadata update.
+
+    Namespaces with at least ann_min_vectors rows are searched through an IVF index (see ann_index)
+    instead of brute force; ann_min_vectors=0 keeps every search exact.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ann_min_vectors: int = 0,
+        nprobe: int = 8,
+        nlist: Optional[int] = None,
+    ):
+        self.path = path
+        self.ann_min_vectors = ann_min_vectors
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self._partitions: Dict[str, _Partition] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        if path:
+            self.load()
+
+    def _file_stem(self, namespace: str) -> str:
+        # The "ns_" prefix keeps the default namespace ("") distinct from one literally named "default".
+        return os.path.join(self.path, "ns_" + quote(namespace, safe=""))
+
+    def load(self) -> None:
+        if not self.path or not os.path.isdir(self.path):
+            return
+        with self._lock:
+            for name in os.listdir(self.path):
+                if not (name.startswith("ns_") and name.endswith(".json")):
+                    continue
+                namespace = unquote(name[len("ns_"): -len(".json")])
+                stem = self._file_stem(namespace)
+                with open(f"{stem}.json", encoding="utf-8") as handle:
+                    sidecar = json.load(handle)
+                # Memory-mapped read-only until the first write touches this namespace.
+                vectors = np.load(f"{stem}.npy", mmap_mode="r")
+                partition = _Partition(dim=vectors.shape[1], capacity=0)
+                partition.vectors = vectors
+                partition.ids = sidecar["ids"]
+                partition.metadata = sidecar["metadata"]
+                partition.rows = {vector_id: row for row, vector_id in enumerate(partition.ids)}
+                if os.path.exists(f"{stem}.ivf.npz"):
+                    partition.ivf = self._new_ivf()
+                    with np.load(f"{stem}.ivf.npz") as state:
+                        partition.ivf.load_state(state)
+                self._partitions[namespace] = partition
+
+    def save(self, namespace: Optional[str] = None) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            namespaces = [namespace or ""] if namespace is not None else list(self._partitions)
+            for name in namespaces:
+                self._dirty.discard(name)
+                partition = self._partitions.get(name)
+                if partition is None:
+                    continue
+                stem = self._file_stem(name)
+                with open(f"{stem}.npy.tmp", "wb") as handle:
+                    np.save(handle, np.ascontiguousarray(partition.vectors[: partition.count]))
+                with open(f"{stem}.json.tmp", "w", encoding="utf-8") as handle:
+                    json.dump({"ids": partition.ids, "metadata": partition.metadata}, handle)
+                os.replace(f"{stem}.npy.tmp", f"{stem}.npy")
+                os.replace(f"{stem}.json.tmp", f"{stem}.json")
+                if partition.ivf is not None and partition.ivf.trained:
+                    with open(f"{stem}.ivf.npz.tmp", "wb") as handle:
+                        np.savez(handle, **partition.ivf.state(partition.count))
+                    os.replace(f"{stem}.ivf.npz.tmp", f"{stem}.ivf.npz")
+                elif os.path.exists(f"{stem}.ivf.npz"):
+                    # A dropped index must not be loaded again without the rows added since.
+                    os.remove(f"{stem}.ivf.npz")
+
+    def flush(self, namespace: Optional[str] = None) -> None:
+        # Saves the namespaces written since their last save: the given one, or all of them.
+        if not self.path:
+            return
+        with self._lock:
+            if namespace is not None:
+                if (namespace or "") in self._dirty:
+                    self.save(namespace)
+            else:
+                for name in list(self._dirty):
+                    self.save(name)
+
+    def upsert(self, vectors: List[Dict], namespace: Optional[str] = None) -> None:
+        if not vectors:
+            return
+        namespace = namespace or ""
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values /= np.where(norms == 0, np.float32(1.0), norms)
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            if partition is None:
+                partition = self._partitions[namespace] = _Partition(dim=values.shape[1])
+            if values.shape[1] != partition.vectors.shape[1]:
+                raise ValueError(
+                    f"Vector dimension {values.shape[1]} does not match namespace dimension {partition.vectors.shape[1]}."
+                )
+            partition.reserve(partition.count + len(vectors))
+            rows = np.empty(len(vectors), dtype=np.int64)
+            for position, (vector, row_values) in enumerate(zip(vectors, values)):
+                row = partition.rows.get(vector["id"])
+                if row is None:
+                    row = partition.count
+                    partition.rows[vector["id"]] = row
+                    partition.ids.append(vector["id"])
+                    partition.metadata.append(vector.get("metadata") or {})
+                else:
+                    partition.metadata[row] = vector.get("metadata") or {}
+                partition.vectors[row] = row_values
+                rows[position] = row
+            self._index_rows(partition, rows, values)
+            self._dirty.add(namespace)
+
+    def _new_ivf(self) -> IVFIndex:
+        return IVFIndex(nlist=self.nlist, nprobe=self.nprobe)
+
+    def _index_rows(self, partition: _Partition, rows: np.ndarray, values: np.ndarray) -> None:
+        ivf = partition.ivf
+        if self.ann_min_vectors and ivf is not None and ivf.trained and partition.count <= 4 * ivf.trained_count:
+            # Every row needs a bucket while the IVF serves queries, even after deletes took the
+            # namespace back under ann_min_vectors.
+            ivf.set_rows(rows, values)
+        elif self.ann_min_vectors and partition.count >= self.ann_min_vectors:
+            # Train once the namespace is big enough, and retrain after it has grown 4x so buckets stay balanced.
+            partition.ivf = self._new_ivf()
+            partition.ivf.train(partition.vectors[: partition.count])
+        else:
+            # No index that could hold these rows (ANN off, or never trained): search stays exact.
+            partition.ivf = None
+
+    def query(
+        self,
+        vector,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[Dict]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self._lock:
+            partition = self._partitions.get(namespace or "")
+            if partition is None or partition.count == 0 or top_k < 1:
+                return []
+            ranked = scores = None
+            if not exact and partition.ivf is not None and partition.ivf.trained:
+                ranked, scores = partition.ivf.search(partition.vectors, partition.count, query, top_k, nprobe=nprobe)
+            if ranked is None or len(ranked) < min(top_k, partition.count):
+                all_scores = partition.vectors[: partition.count] @ query
+                if top_k < partition.count:
+                    candidates = np.argpartition(-all_scores, top_k - 1)[:top_k]
+                else:
+                    candidates = np.arange(partition.count)
+                ranked = candidates[np.argsort(-all_scores[candidates], kind="stable")]
+                scores = all_scores[ranked]
+            return [
+                {
+                    "id": partition.ids[row],
+                    "score": float(score),
+                    "metadata": dict(partition.metadata[row]) if include_metadata else {},
+                }
+                for row, score in zip(ranked, scores)
+            ]
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        namespace = namespace or ""
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            if partition is None:
+                return
+            partition.reserve(partition.count)
+            for vector_id in ids:
+                row = partition.rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                # Swap the last row into the hole so the matrix stays dense.
+                last = partition.count - 1
+                if row != last:
+                    if partition.ivf is not None:
+                        partition.ivf.move_row(last, row)
+                    partition.vectors[row] = partition.vectors[last]
+                    partition.ids[row] = partition.ids[last]
+                    partition.metadata[row] = partition.metadata[last]
+                    partition.rows[partition.ids[row]] = row
+                partition.ids.pop()
+                partition.metadata.pop()
+            self._dirty.add(namespace)
+
+    def update_metadata(self, id: str, metadata: Dict, namespace: Optional[str] = None) -> None:
+        namespace = namespace or ""
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            row = partition.rows.get(id) if partition is not None else None
+            if row is None:
+                return
+            partition.metadata[row] = {**partition.metadata[row], **metadata}
+            self._dirty.add(namespace)
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Dict]:
+        with self._lock:
+            partition = self._partitions.get(namespace or "")
+            if partition is None:
+                return {}
+            return {
+                vector_id: dict(partition.metadata[partition.rows[vector_id]])
+                for vector_id in ids
+                if vector_id in partition.rows
+            }
+
+    def fetch_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, List[float]]:
+        with self._lock:
+            partition = self._partitions.get(namespace or "")
+            if partition is None:
+                return {}
+            return {
+                vector_id: partition.vectors[partition.rows[vector_id]].tolist()
+                for vector_id in ids
+                if vector_id in partition.rows
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            namespaces = {name: {"vector_count": partition.count} for name, partition in self._partitions.items()}
+            dimension = next((partition.vectors.shape[1] for partition in self._partitions.values()), None)
+        return {
+            "namespaces": namespaces,
+            "dimension": dimension,
+            "total_vector_count": sum(entry["vector_count"] for entry in namespaces.values()),
+        }